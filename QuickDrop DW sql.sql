@@ -46,7 +46,7 @@ CREATE TABLE dim_pago (
 
 -- 6. DIM_FECHA
 CREATE TABLE dim_fecha (
-    fecha_key SERIAL PRIMARY KEY,
+    fecha_key INT PRIMARY KEY, -- AAAAMMDD (ordenada como la fecha)
     fecha DATE UNIQUE,
     ano INT,
     mes INT,
@@ -56,9 +56,11 @@ CREATE TABLE dim_fecha (
 );
 
 
+-- Particionada por año de fecha_key (QuickDropApp/migrations/005 crea las
+-- particiones anuales y la función qd_asegurar_particion)
 CREATE TABLE hechos_ventas (
-    venta_key SERIAL PRIMARY KEY,
-    fecha_key INT REFERENCES dim_fecha(fecha_key),
+    venta_key SERIAL,
+    fecha_key INT NOT NULL REFERENCES dim_fecha(fecha_key),
     cliente_key INT REFERENCES dim_cliente(cliente_key),
     producto_key INT REFERENCES dim_producto(producto_key),
     tienda_key INT REFERENCES dim_tienda(tienda_key),
@@ -69,5 +71,30 @@ CREATE TABLE hechos_ventas (
     subtotal NUMERIC(8,2),
     total_pago NUMERIC(8,2),
     tiempo_entrega TEXT,
-    estado_entrega VARCHAR(30)
+    minutos_entrega INT, -- tiempo_entrega en minutos, calculado en la carga
+    estado_entrega VARCHAR(30),
+    id_pedido INT,  -- origen en el OLTP (carga incremental, QuickDropETL)
+    id_detalle INT,
+    PRIMARY KEY (venta_key, fecha_key)
+) PARTITION BY RANGE (fecha_key);
+
+CREATE TABLE hechos_ventas_default PARTITION OF hechos_ventas DEFAULT;
+
+-- Índices alineados con los filtros del tablero
+CREATE INDEX hechos_ventas_fecha_brin ON hechos_ventas USING brin (fecha_key) WITH (pages_per_range = 32);
+CREATE INDEX hechos_ventas_tienda_idx ON hechos_ventas (tienda_key);
+CREATE INDEX hechos_ventas_producto_idx ON hechos_ventas (producto_key);
+CREATE INDEX hechos_ventas_pago_idx ON hechos_ventas (pago_key);
+CREATE INDEX hechos_ventas_cliente_idx ON hechos_ventas (cliente_key);
+CREATE INDEX hechos_ventas_repartidor_idx ON hechos_ventas (repartidor_key);
+CREATE INDEX hechos_ventas_id_pedido_idx ON hechos_ventas (id_pedido);
+CREATE INDEX dim_tienda_ciudad_idx ON dim_tienda (ciudad) INCLUDE (tienda_key, nombre_tienda);
+CREATE INDEX dim_producto_categoria_idx ON dim_producto (categoria) INCLUDE (producto_key, nombre_producto);
+CREATE INDEX dim_pago_metodo_idx ON dim_pago (metodo_pago) INCLUDE (pago_key);
+
+-- Marca de agua por tabla fuente del OLTP (QuickDropETL/etl_incremental.py)
+CREATE TABLE etl_watermark (
+    fuente VARCHAR(50) PRIMARY KEY,
+    marca TIMESTAMPTZ NOT NULL,
+    actualizado_en TIMESTAMPTZ NOT NULL DEFAULT now()
 );
\ No newline at end of file
@@ -1,11 +1,10 @@
 # app.py
+import importlib
+import os
 from src.ui.theme import apply_global_theme
 import streamlit as st
 from src.config import test_connection
 from src.ui.filters import render_filters
-from src.ui.dashboards import render_dashboard
-from src.ui.operations import render_operations
-from src.ui.people import render_people
 
 st.set_page_config(
     page_title="QuickDrop DW – Analytics",
@@ -24,6 +23,11 @@ st.markdown(
     unsafe_allow_html=True
 )
 
+# Precalentamiento de caché tras cada carga (una vez por proceso, ver src/warmup.py)
+from src import warmup
+if warmup.ENABLED:
+    warmup.start()
+
 with st.sidebar:
     st.image("assets/logo.png", width=140)
     st.header("Conexión")
@@ -32,13 +36,23 @@ with st.sidebar:
 # Filtros globales (devuelve un dict)
 filters = render_filters()
 
-tab_dash, tab_ops, tab_people = st.tabs(["Dashboard", "Operaciones", "Clientes & Repartidores"])
-
-with tab_dash:
-    render_dashboard(filters)
-
-with tab_ops:
-    render_operations(filters)
-
-with tab_people:
-    render_people(filters)
+# Vistas: a diferencia de st.tabs, solo se ejecuta la vista activa en cada rerun, y
+# su módulo se importa recién cuando se abre (módulo, función).
+# La vista de rendimiento solo se muestra a administradores (QD_ADMIN=1)
+ADMIN = os.getenv("QD_ADMIN", "0") == "1"
+VIEWS = {
+    "Dashboard": ("src.ui.dashboards", "render_dashboard"),
+    "Operaciones": ("src.ui.operations", "render_operations"),
+    "Clientes & Repartidores": ("src.ui.people", "render_people"),
+}
+if ADMIN:
+    VIEWS["Rendimiento"] = ("src.ui.performance", "render_performance")
+
+# La vista elegida va en la URL (?vista=...) para poder compartir el enlace
+if "vista" not in st.session_state:
+    st.session_state["vista"] = st.query_params.get("vista") if st.query_params.get("vista") in VIEWS else "Dashboard"
+vista = st.radio("Vista", list(VIEWS), horizontal=True, key="vista", label_visibility="collapsed")
+st.query_params["vista"] = vista
+
+module, fn = VIEWS[vista]
+getattr(importlib.import_module(module), fn)(filters)
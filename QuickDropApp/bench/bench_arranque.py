@@ -0,0 +1,97 @@
+# bench/bench_arranque.py
+"""
+Tiempo de importación en frío de la app (python -X importtime).
+
+Importa en un intérprete nuevo lo mismo que app.py antes de dibujar la vista
+por defecto y suma el tiempo acumulado de los módulos de primer nivel (sin los
+que el intérprete ya carga al iniciar). Repite y se queda con el mínimo, que
+es el menos afectado por el ruido del sistema.
+
+Sale con 1 si el mínimo supera --presupuesto o si se cargó alguno de los
+módulos que deben importarse a pedido (ReportLab y kaleido solo al generar un
+PDF, Plotly recién con el primer gráfico). Lo que ya carga "import streamlit"
+(p. ej. plotly.graph_objects) no cuenta: la app no puede evitarlo.
+
+Uso (desde QuickDropApp/):
+    python -m bench.bench_arranque
+    python -m bench.bench_arranque --presupuesto 1500 --repeticiones 10
+    python -m bench.bench_arranque --modulos src.ui.operations --top 30
+"""
+from __future__ import annotations
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+# Lo que importa app.py antes de la vista por defecto (mantener en sincronía)
+COLD_START = ["streamlit", "src.ui.theme", "src.config", "src.ui.filters", "src.warmup", "src.ui.dashboards"]
+# Paquetes que no deben cargarse en el arranque (descontando lo que importa streamlit)
+LAZY = ["reportlab", "kaleido", "plotly"]
+BUDGET_MS = float(os.getenv("QD_IMPORT_BUDGET_MS", "2500"))
+
+def importtime(modules: list[str]) -> list[tuple[int, int, int, str]]:
+    """Filas (self_us, acumulado_us, nivel, módulo) de -X importtime al importar modules."""
+    code = "import " + ", ".join(modules) if modules else "pass"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=APP_DIR,
+                          capture_output=True, text=True)
+    if proc.returncode:
+        raise SystemExit(proc.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        own, cum, name = line[len("import time:"):].split("|", 2)
+        nombre = name.rstrip()
+        nivel = (len(nombre) - len(nombre.lstrip()) - 1) // 2
+        rows.append((int(own), int(cum), nivel, nombre.strip()))
+    return rows
+
+def measure(modules: list[str], base: set[str]) -> dict:
+    rows = importtime(modules)
+    total = sum(cum for _, cum, nivel, name in rows if nivel == 0 and name not in base)
+    # Tiempo propio por paquete raíz: streamlit cuenta como streamlit aunque lo importe src.config
+    por_paquete = defaultdict(int)
+    for own, _, _, name in rows:
+        if name not in base:
+            por_paquete[name.split(".")[0]] += own
+    return {"total_ms": total / 1000,
+            "paquetes": dict(por_paquete),
+            "cargados": {name for *_, name in rows}}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Tiempo de importación en frío de la app")
+    ap.add_argument("--modulos", nargs="*", default=COLD_START, help="módulos a importar (por defecto los de app.py)")
+    ap.add_argument("--repeticiones", type=int, default=5)
+    ap.add_argument("--presupuesto", type=float, default=BUDGET_MS, help="ms; 0 = solo informar")
+    ap.add_argument("--top", type=int, default=15, help="paquetes más pesados a listar")
+    args = ap.parse_args(argv)
+
+    # Lo que el intérprete ya importa al iniciar no cuenta
+    base = {name for *_, name in importtime([])}
+    corridas = [measure(args.modulos, base) for _ in range(args.repeticiones)]
+    mejor = min(corridas, key=lambda r: r["total_ms"])
+    tiempos = sorted(r["total_ms"] for r in corridas)
+
+    print(f"import {' '.join(args.modulos)}")
+    print(f"  mínimo {tiempos[0]:.0f} ms, mediana {tiempos[len(tiempos) // 2]:.0f} ms ({args.repeticiones} corridas)")
+    for paquete, us in sorted(mejor["paquetes"].items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {paquete:<28} {us / 1000:>8.1f} ms")
+
+    fallas = []
+    propios = mejor["cargados"] - {name for *_, name in importtime(["streamlit"])}
+    for paquete in LAZY:
+        if any(m == paquete or m.startswith(paquete + ".") for m in propios):
+            fallas.append(f"{paquete} se importa en el arranque (debe ser a pedido)")
+    if args.presupuesto and tiempos[0] > args.presupuesto:
+        fallas.append(f"{tiempos[0]:.0f} ms supera el presupuesto de {args.presupuesto:.0f} ms")
+    for f in fallas:
+        print(f"FALLA: {f}")
+    if fallas:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
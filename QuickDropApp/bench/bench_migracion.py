@@ -0,0 +1,58 @@
+# bench/bench_migracion.py
+"""
+Antes/después de aplicar las migraciones pendientes (p. ej. 005: particiones e
+índices de hechos_ventas), con la misma matriz de filtros de bench_queries.
+
+Corre el benchmark, aplica las migraciones, vuelve a correrlo y compara las
+dos corridas. Sale con 1 si alguna consulta empeora más que --umbral.
+
+Uso (desde QuickDropApp/):
+    python -m bench.bench_migracion
+    python -m bench.bench_migracion --solo trend city_store pay_mix --repeticiones 10
+    python -m bench.bench_migracion --sembrar 2000      # datos realistas antes de medir
+"""
+from __future__ import annotations
+import argparse
+import json
+import sys
+from datetime import datetime
+
+from bench.bench_queries import RESULTADOS, compare, print_compare, run_bench, seed
+from src.migrate import migrate
+
+def _guardar(doc: dict, nombre: str):
+    salida = RESULTADOS / nombre
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    salida.write_text(json.dumps(doc, indent=1, default=str), encoding="utf-8")
+    print(f"resultados: {salida}")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark antes/después de las migraciones pendientes")
+    ap.add_argument("--solo", nargs="*", help="consultas a medir (por defecto todas)")
+    ap.add_argument("--repeticiones", type=int, default=5)
+    ap.add_argument("--umbral", type=float, default=1.25)
+    ap.add_argument("--sembrar", type=float, metavar="ESCALA")
+    ap.add_argument("--perfil", default="realista")
+    ap.add_argument("--semilla", type=int, default=42)
+    args = ap.parse_args(argv)
+
+    if args.sembrar:
+        seed(args.sembrar, args.perfil, args.semilla)
+    sello = f"{datetime.now():%Y%m%d_%H%M%S}"
+
+    antes = run_bench(args.solo, args.repeticiones)
+    _guardar(antes, f"{sello}_antes.json")
+
+    aplicadas = migrate()
+    print("migraciones:", ", ".join(aplicadas) or "(nada pendiente)")
+
+    despues = run_bench(args.solo, args.repeticiones)
+    _guardar(despues, f"{sello}_despues.json")
+
+    filas = compare(antes, despues, args.umbral)
+    print_compare(filas)
+    if any(f["regresion"] for f in filas):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
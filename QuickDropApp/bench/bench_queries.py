@@ -0,0 +1,264 @@
+# bench/bench_queries.py
+"""
+Benchmark de las consultas de src/queries.py, fuera de Streamlit.
+
+Corre cada entrada de QUERIES (más el histograma de tiempos de entrega) contra
+una matriz de filtros, mide la latencia de punta a punta (ejecución + traída de
+filas), guarda el plan de EXPLAIN (ANALYZE, BUFFERS) y escribe un JSON que se
+puede comparar con otra corrida para detectar regresiones.
+
+Uso (desde QuickDropApp/):
+    python -m bench.bench_queries                          # bench/resultados/<fecha>.json
+    python -m bench.bench_queries --solo trend city_store --repeticiones 10
+    python -m bench.bench_queries --rollups                # también la variante ruteada a rollups
+    python -m bench.bench_queries --claves                 # también filtrando por clave (src/dimindex.py)
+    python -m bench.bench_queries --comparar bench/resultados/base.json
+    python -m bench.bench_queries --comparar base.json nuevo.json   # sin correr nada
+    python -m bench.bench_queries --sembrar 2000 --perfil realista  # genera, carga y corre el ETL antes
+
+La base es la de la app (variables PG_*); --sembrar usa además las OLTP_* de
+QuickDropInsertations/cargar_csv.py y QuickDropETL/etl_incremental.py.
+"""
+from __future__ import annotations
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import text
+from src.config import get_engine, pool_settings, statement_timeout
+from src.dimindex import build_index, resolve
+from src.queries import QUERIES, build_sql, build_hist_sql, rollup_needs
+from src.rollups import ROLLUPS, available_rollups
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT = BENCH_DIR.parent.parent
+RESULTADOS = BENCH_DIR / "resultados"
+HIST_BINS = 30
+LIMIT = 10
+
+# ---------------------------------------------------------------------------
+# Matriz de filtros (los valores concretos salen de los datos cargados)
+# ---------------------------------------------------------------------------
+def filter_matrix(conn) -> dict:
+    ciudades = conn.execute(text(
+        "SELECT ciudad FROM dim_tienda GROUP BY ciudad ORDER BY COUNT(*) DESC, ciudad LIMIT 1"
+    )).scalars().all()
+    categorias = conn.execute(text(
+        "SELECT categoria FROM dim_producto GROUP BY categoria ORDER BY COUNT(*) DESC, categoria LIMIT 3"
+    )).scalars().all()
+    ultima = conn.execute(text("SELECT MAX(fecha) FROM dim_fecha")).scalar() or date.today()
+    matriz = {
+        "sin_filtro": {},
+        "una_ciudad": {"ciudades": ciudades},
+        "multi_categoria": {"categorias": categorias},
+    }
+    for dias in (7, 30, 365):
+        matriz[f"ultimos_{dias}d"] = {"date_from": ultima - timedelta(days=dias - 1), "date_to": ultima}
+    return matriz
+
+def cases(keys, matriz: dict, rollups: list[str] | None, indice: dict | None = None):
+    """(consulta, filtro, variante, sql, params, timeout_ms) para cada combinación."""
+    for key in keys:
+        for fname, filters in matriz.items():
+            claves = resolve(filters, indice) if indice is not None else None
+            if key == "delivery_minutes_hist":
+                sql, params = build_hist_sql("delivery_minutes", filters, HIST_BINS)
+                yield key, fname, "hecho", sql, params, None
+                if claves:
+                    sql, params = build_hist_sql("delivery_minutes", filters, HIST_BINS, claves)
+                    yield key, fname, "claves", sql, params, None
+                continue
+            q = QUERIES[key]
+            extra = {"limit": LIMIT} if q.get("limit") else {}
+            sql, params = build_sql(key, filters)
+            yield key, fname, "hecho", sql, {**params, **extra}, q.get("timeout_ms")
+            if claves:
+                sql, params = build_sql(key, filters, keys=claves)
+                yield key, fname, "claves", sql, {**params, **extra}, q.get("timeout_ms")
+            needs = rollup_needs(key, filters) if rollups else None
+            tabla = next((r for r in rollups or [] if needs is not None and needs <= ROLLUPS[r]["attrs"]), None)
+            if tabla:
+                sql, params = build_sql(key, filters, tabla)
+                yield key, fname, f"rollup:{tabla}", sql, {**params, **extra}, q.get("timeout_ms")
+
+# ---------------------------------------------------------------------------
+# Medición
+# ---------------------------------------------------------------------------
+def _timed(conn, sql, params, timeout_ms) -> tuple[float, int]:
+    t0 = time.perf_counter()
+    with conn.begin():
+        statement_timeout(conn, timeout_ms)
+        filas = len(conn.execute(text(sql), params).fetchall())
+    return (time.perf_counter() - t0) * 1000, filas
+
+def _nodes(plan: dict) -> list[str]:
+    out = [plan["Node Type"]]
+    for p in plan.get("Plans", []):
+        out += _nodes(p)
+    return out
+
+def explain(conn, sql, params, timeout_ms) -> dict:
+    with conn.begin():
+        statement_timeout(conn, timeout_ms)
+        raw = conn.execute(text("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql.rstrip().rstrip(";")), params).scalar_one()
+    doc = (json.loads(raw) if isinstance(raw, str) else raw)[0]
+    root = doc["Plan"]
+    return {
+        "planning_ms":  doc.get("Planning Time"),
+        "execution_ms": doc.get("Execution Time"),
+        "shared_hit":   root.get("Shared Hit Blocks"),
+        "shared_read":  root.get("Shared Read Blocks"),
+        "temp_written": root.get("Temp Written Blocks"),
+        "nodos":        sorted(set(_nodes(root))),
+        "plan":         root,
+    }
+
+def run_bench(keys=None, repeticiones=5, calentar=1, rollups=False, planes=True, claves=False) -> dict:
+    keys = keys or [*(k for k, q in QUERIES.items() if not q.get("export_only")), "delivery_minutes_hist"]
+    engine = get_engine()
+    with engine.connect() as conn:
+        matriz = filter_matrix(conn)
+        meta = {
+            "fecha":      datetime.now().isoformat(timespec="seconds"),
+            "commit":     _git_commit(),
+            "postgres":   conn.execute(text("SHOW server_version")).scalar_one(),
+            "hechos_aprox": conn.execute(text(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = 'hechos_ventas'::regclass"
+            )).scalar_one(),
+            "pool":       pool_settings(),
+            "repeticiones": repeticiones,
+            "filtros":    matriz,
+        }
+        disponibles = available_rollups() if rollups else None
+        meta["rollups"] = disponibles
+        indice = build_index(conn) if claves else None
+        conn.commit()  # cada medición abre su propia transacción
+
+        resultados = []
+        for key, fname, variante, sql, params, timeout_ms in cases(keys, matriz, disponibles, indice):
+            try:
+                for _ in range(calentar):
+                    _timed(conn, sql, params, timeout_ms)
+                tiempos, filas = [], 0
+                for _ in range(repeticiones):
+                    ms, filas = _timed(conn, sql, params, timeout_ms)
+                    tiempos.append(ms)
+                res = {
+                    "consulta": key, "filtro": fname, "variante": variante, "filas": filas,
+                    "ms": {
+                        "p50": statistics.median(tiempos),
+                        "p95": sorted(tiempos)[max(0, round(0.95 * len(tiempos)) - 1)],
+                        "min": min(tiempos), "max": max(tiempos),
+                    },
+                }
+                if planes:
+                    res["explain"] = explain(conn, sql, params, timeout_ms)
+            except Exception as e:
+                res = {"consulta": key, "filtro": fname, "variante": variante, "error": str(e).splitlines()[0]}
+            resultados.append(res)
+            _print_row(res)
+    return {"meta": meta, "resultados": resultados}
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def _print_row(res: dict):
+    name = f"{res['consulta']:<24} {res['filtro']:<16} {res['variante']:<22}"
+    if "error" in res:
+        print(f"{name} ERROR {res['error']}")
+    else:
+        print(f"{name} p50 {res['ms']['p50']:9.1f} ms  p95 {res['ms']['p95']:9.1f} ms  {res['filas']:>8} filas")
+
+# ---------------------------------------------------------------------------
+# Comparación entre corridas
+# ---------------------------------------------------------------------------
+def compare(base: dict, nuevo: dict, umbral: float = 1.25, min_ms: float = 5.0) -> list[dict]:
+    """Filas (consulta, filtro, variante) con p50 base vs nuevo; regresion=True si empeora más que umbral."""
+    def index(doc):
+        return {(r["consulta"], r["filtro"], r["variante"]): r for r in doc["resultados"] if "ms" in r}
+    b, n = index(base), index(nuevo)
+    out = []
+    for k in sorted(b.keys() & n.keys()):
+        antes, ahora = b[k]["ms"]["p50"], n[k]["ms"]["p50"]
+        razon = ahora / antes if antes else float("inf")
+        out.append({
+            "consulta": k[0], "filtro": k[1], "variante": k[2], "antes": antes, "ahora": ahora,
+            "razon": razon, "regresion": razon > umbral and ahora - antes > min_ms,
+        })
+    return out
+
+def print_compare(filas: list[dict]):
+    for f in filas:
+        marca = "  <-- REGRESIÓN" if f["regresion"] else ""
+        print(f"{f['consulta']:<24} {f['filtro']:<16} {f['variante']:<22} "
+              f"{f['antes']:9.1f} -> {f['ahora']:9.1f} ms  x{f['razon']:.2f}{marca}")
+
+# ---------------------------------------------------------------------------
+# Siembra: generador -> carga COPY -> ETL -> rollups
+# ---------------------------------------------------------------------------
+def seed(escala: float, perfil: str, semilla: int):
+    with tempfile.TemporaryDirectory(prefix="qd_bench_") as tmp:
+        pasos = [
+            (ROOT / "QuickDropInsertations", ["generar_datos_csv.py", "--escala", str(escala),
+                                              "--perfil", perfil, "--semilla", str(semilla), "--salida", tmp]),
+            (ROOT / "QuickDropInsertations", ["cargar_csv.py", "--dir", tmp, "--truncar"]),
+            (ROOT / "QuickDropETL", ["etl_incremental.py", "--completo", "--rollups"]),
+        ]
+        for cwd, args in pasos:
+            print(f"$ {' '.join(args)}")
+            subprocess.run([sys.executable, *args], cwd=cwd, check=True)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark de consultas QuickDrop")
+    ap.add_argument("--solo", nargs="*", help="consultas a medir (por defecto todas)")
+    ap.add_argument("--repeticiones", type=int, default=5)
+    ap.add_argument("--calentar", type=int, default=1, help="corridas previas descartadas")
+    ap.add_argument("--rollups", action="store_true", help="mide también la variante ruteada a rollups")
+    ap.add_argument("--claves", action="store_true", help="mide también la variante filtrada por clave")
+    ap.add_argument("--sin-planes", action="store_true", help="omite EXPLAIN ANALYZE")
+    ap.add_argument("--salida", help="archivo JSON de resultados")
+    ap.add_argument("--comparar", nargs="+", metavar="JSON",
+                    help="base.json (compara contra esta corrida) o base.json nuevo.json (solo compara)")
+    ap.add_argument("--umbral", type=float, default=1.25, help="razón p50 nuevo/base que cuenta como regresión")
+    ap.add_argument("--sembrar", type=float, metavar="ESCALA", help="genera y carga datos a esta escala antes de medir")
+    ap.add_argument("--perfil", default="realista")
+    ap.add_argument("--semilla", type=int, default=42)
+    args = ap.parse_args(argv)
+
+    validas = {*QUERIES, "delivery_minutes_hist"}
+    desconocidas = set(args.solo or []) - validas
+    if desconocidas:
+        ap.error(f"consulta desconocida: {', '.join(sorted(desconocidas))}")
+    if args.comparar and len(args.comparar) > 2:
+        ap.error("--comparar acepta uno o dos archivos")
+
+    if args.comparar and len(args.comparar) == 2:
+        base, nuevo = (json.loads(Path(p).read_text(encoding="utf-8")) for p in args.comparar)
+    else:
+        if args.sembrar:
+            seed(args.sembrar, args.perfil, args.semilla)
+        nuevo = run_bench(args.solo, args.repeticiones, args.calentar, args.rollups, not args.sin_planes, args.claves)
+        salida = Path(args.salida) if args.salida else RESULTADOS / f"{datetime.now():%Y%m%d_%H%M%S}.json"
+        salida.parent.mkdir(parents=True, exist_ok=True)
+        salida.write_text(json.dumps(nuevo, indent=1, default=str), encoding="utf-8")
+        print(f"resultados: {salida}")
+        base = json.loads(Path(args.comparar[0]).read_text(encoding="utf-8")) if args.comparar else None
+
+    if base is not None:
+        filas = compare(base, nuevo, args.umbral)
+        print_compare(filas)
+        if any(f["regresion"] for f in filas):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
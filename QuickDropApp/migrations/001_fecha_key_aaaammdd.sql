@@ -0,0 +1,20 @@
+-- 001: dim_fecha.fecha_key pasa de SERIAL a clave inteligente AAAAMMDD.
+-- Con la clave ordenada como la fecha, los filtros de rango se aplican
+-- directamente sobre hechos_ventas.fecha_key sin unir dim_fecha.
+-- Después de aplicarla: python -m src.rollups refresh
+
+ALTER TABLE hechos_ventas DROP CONSTRAINT IF EXISTS hechos_ventas_fecha_key_fkey;
+
+UPDATE hechos_ventas hv
+SET fecha_key = TO_CHAR(df.fecha, 'YYYYMMDD')::int
+FROM dim_fecha df
+WHERE hv.fecha_key = df.fecha_key;
+
+-- Las claves SERIAL previas son pequeñas: no chocan con las nuevas (>= 19000101)
+UPDATE dim_fecha SET fecha_key = TO_CHAR(fecha, 'YYYYMMDD')::int;
+
+ALTER TABLE dim_fecha ALTER COLUMN fecha_key DROP DEFAULT;
+DROP SEQUENCE IF EXISTS dim_fecha_fecha_key_seq;
+
+ALTER TABLE hechos_ventas
+    ADD CONSTRAINT hechos_ventas_fecha_key_fkey FOREIGN KEY (fecha_key) REFERENCES dim_fecha(fecha_key);
@@ -0,0 +1,18 @@
+-- 002: medida numérica minutos_entrega en hechos_ventas.
+-- La carga (Hechos.ktr) ya la calcula; aquí se agrega la columna y se
+-- rellena para las filas existentes a partir del texto de tiempo_entrega.
+
+ALTER TABLE hechos_ventas ADD COLUMN IF NOT EXISTS minutos_entrega INT;
+
+-- Convierte el texto del intervalo (p. ej. '3 days 04:12:10') a minutos; NULL si no se puede
+CREATE OR REPLACE FUNCTION minutos_desde_texto(t TEXT) RETURNS INT AS $$
+BEGIN
+    RETURN CAST(EXTRACT(EPOCH FROM t::interval) / 60 AS INTEGER);
+EXCEPTION WHEN others THEN
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+UPDATE hechos_ventas
+SET minutos_entrega = minutos_desde_texto(tiempo_entrega)
+WHERE minutos_entrega IS NULL AND tiempo_entrega IS NOT NULL;
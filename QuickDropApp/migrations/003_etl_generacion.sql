@@ -0,0 +1,12 @@
+-- 003: marcador de "generación de carga" del DW.
+-- Cada carga (ETL o refresco de rollups) lo incrementa; las cachés de la app
+-- (src/cache.py) lo incluyen en sus claves en lugar de expirar por TTL.
+-- Tras una carga con Pentaho: python -m src.cache bump
+
+CREATE TABLE IF NOT EXISTS etl_generacion (
+    id             SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    generacion     BIGINT NOT NULL DEFAULT 0,
+    actualizado_en TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO etl_generacion (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
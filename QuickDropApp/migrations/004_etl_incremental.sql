@@ -0,0 +1,21 @@
+-- 004: soporte para la carga incremental (QuickDropETL/etl_incremental.py).
+-- Cada hecho guarda su origen en el OLTP para poder reemplazar solo los
+-- pedidos que cambiaron, y etl_watermark guarda la marca de agua por tabla fuente.
+-- Las filas cargadas antes por Pentaho quedan con id_pedido NULL; la primera
+-- corrida del ETL hace una carga completa y las reemplaza.
+
+ALTER TABLE hechos_ventas ADD COLUMN IF NOT EXISTS id_pedido INT;
+ALTER TABLE hechos_ventas ADD COLUMN IF NOT EXISTS id_detalle INT;
+CREATE INDEX IF NOT EXISTS hechos_ventas_id_pedido_idx ON hechos_ventas (id_pedido);
+
+-- Búsquedas por clave natural al sincronizar dimensiones
+CREATE INDEX IF NOT EXISTS dim_cliente_id_cliente_idx ON dim_cliente (id_cliente);
+CREATE INDEX IF NOT EXISTS dim_tienda_id_tienda_idx ON dim_tienda (id_tienda);
+CREATE INDEX IF NOT EXISTS dim_producto_id_producto_idx ON dim_producto (id_producto);
+CREATE INDEX IF NOT EXISTS dim_repartidor_id_repartidor_idx ON dim_repartidor (id_repartidor);
+
+CREATE TABLE IF NOT EXISTS etl_watermark (
+    fuente         VARCHAR(50) PRIMARY KEY,   -- tabla del OLTP
+    marca          TIMESTAMPTZ NOT NULL,      -- mayor actualizado_en ya cargado
+    actualizado_en TIMESTAMPTZ NOT NULL DEFAULT now()
+);
@@ -0,0 +1,104 @@
+-- 005: hechos_ventas particionada por rango de fecha_key (una partición por año
+-- + DEFAULT) e índices alineados con los filtros del tablero (where_and_params):
+--   - BRIN sobre fecha_key: los rangos de fecha leen solo los bloques del rango
+--     (las filas llegan en orden de fecha, así que el BRIN es chico y selectivo).
+--   - B-tree sobre las claves de dimensión que filtran (tienda, producto, pago)
+--     y las que se agrupan en Clientes & Repartidores.
+--   - Índices "covering" en las dimensiones: ciudad/categoría/método -> clave
+--     sin visitar la tabla.
+-- Mide antes/después con: python -m bench.bench_migracion
+
+-- 1) Crea (si falta) la partición de un año. Si la DEFAULT ya tiene filas de ese
+-- año, se mueven antes de adjuntar. La usa también QuickDropETL al cargar fechas nuevas.
+CREATE OR REPLACE FUNCTION qd_asegurar_particion(p_ano INT) RETURNS TEXT AS $$
+DECLARE
+    nombre TEXT := format('hechos_ventas_%s', p_ano);
+    desde  INT  := p_ano * 10000 + 101;
+    hasta  INT  := (p_ano + 1) * 10000 + 101;
+BEGIN
+    IF to_regclass(nombre) IS NOT NULL THEN
+        RETURN nombre;
+    END IF;
+    EXECUTE format('CREATE TABLE %I (LIKE hechos_ventas INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', nombre);
+    EXECUTE format('WITH movidas AS (DELETE FROM hechos_ventas_default WHERE fecha_key >= %s AND fecha_key < %s RETURNING *)
+                    INSERT INTO %I SELECT * FROM movidas', desde, hasta, nombre);
+    EXECUTE format('ALTER TABLE hechos_ventas ATTACH PARTITION %I FOR VALUES FROM (%s) TO (%s)', nombre, desde, hasta);
+    RETURN nombre;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 2) Conversión de la tabla existente (en un DW creado con el script actual ya
+-- viene particionada y este bloque no hace nada)
+DO $$
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'hechos_ventas'::regclass) = 'p' THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE hechos_ventas RENAME TO hechos_ventas_antigua;
+    ALTER TABLE hechos_ventas_antigua RENAME CONSTRAINT hechos_ventas_pkey TO hechos_ventas_antigua_pkey;
+    ALTER INDEX IF EXISTS hechos_ventas_id_pedido_idx RENAME TO hechos_ventas_antigua_id_pedido_idx;
+
+    CREATE TABLE hechos_ventas (
+        venta_key       INT NOT NULL DEFAULT nextval('hechos_ventas_venta_key_seq'),
+        fecha_key       INT NOT NULL REFERENCES dim_fecha(fecha_key),
+        cliente_key     INT REFERENCES dim_cliente(cliente_key),
+        producto_key    INT REFERENCES dim_producto(producto_key),
+        tienda_key      INT REFERENCES dim_tienda(tienda_key),
+        repartidor_key  INT REFERENCES dim_repartidor(repartidor_key),
+        pago_key        INT REFERENCES dim_pago(pago_key),
+        cantidad        INT,
+        precio_unitario NUMERIC(6,2),
+        subtotal        NUMERIC(8,2),
+        total_pago      NUMERIC(8,2),
+        tiempo_entrega  TEXT,
+        minutos_entrega INT,
+        estado_entrega  VARCHAR(30),
+        id_pedido       INT,
+        id_detalle      INT,
+        PRIMARY KEY (venta_key, fecha_key)  -- la clave de partición debe ser parte de la PK
+    ) PARTITION BY RANGE (fecha_key);
+
+    -- La secuencia sigue viva al borrar la tabla vieja
+    ALTER SEQUENCE hechos_ventas_venta_key_seq OWNED BY hechos_ventas.venta_key;
+    CREATE TABLE hechos_ventas_default PARTITION OF hechos_ventas DEFAULT;
+
+    -- Años con datos (la copia entra directo en su partición)
+    PERFORM qd_asegurar_particion(a)
+    FROM generate_series((SELECT MIN(fecha_key) / 10000 FROM hechos_ventas_antigua),
+                         (SELECT MAX(fecha_key) / 10000 FROM hechos_ventas_antigua)) AS a;
+
+    -- En orden de fecha: favorece al BRIN
+    INSERT INTO hechos_ventas
+    SELECT venta_key, fecha_key, cliente_key, producto_key, tienda_key, repartidor_key, pago_key,
+           cantidad, precio_unitario, subtotal, total_pago, tiempo_entrega, minutos_entrega,
+           estado_entrega, id_pedido, id_detalle
+    FROM hechos_ventas_antigua
+    ORDER BY fecha_key, venta_key;
+
+    DROP TABLE hechos_ventas_antigua;
+END;
+$$;
+
+-- 3) Año en curso y el siguiente, para que las cargas nuevas no caigan en DEFAULT
+SELECT qd_asegurar_particion(EXTRACT(YEAR FROM now())::int);
+SELECT qd_asegurar_particion(EXTRACT(YEAR FROM now())::int + 1);
+
+-- 4) Índices del hecho (se crean en cada partición, también en las futuras)
+CREATE INDEX IF NOT EXISTS hechos_ventas_fecha_brin      ON hechos_ventas USING brin (fecha_key) WITH (pages_per_range = 32);
+CREATE INDEX IF NOT EXISTS hechos_ventas_tienda_idx      ON hechos_ventas (tienda_key);
+CREATE INDEX IF NOT EXISTS hechos_ventas_producto_idx    ON hechos_ventas (producto_key);
+CREATE INDEX IF NOT EXISTS hechos_ventas_pago_idx        ON hechos_ventas (pago_key);
+CREATE INDEX IF NOT EXISTS hechos_ventas_cliente_idx     ON hechos_ventas (cliente_key);
+CREATE INDEX IF NOT EXISTS hechos_ventas_repartidor_idx  ON hechos_ventas (repartidor_key);
+CREATE INDEX IF NOT EXISTS hechos_ventas_id_pedido_idx   ON hechos_ventas (id_pedido);
+
+-- 5) Dimensiones: atributo de filtro -> clave (y la etiqueta que se proyecta)
+CREATE INDEX IF NOT EXISTS dim_tienda_ciudad_idx     ON dim_tienda (ciudad) INCLUDE (tienda_key, nombre_tienda);
+CREATE INDEX IF NOT EXISTS dim_producto_categoria_idx ON dim_producto (categoria) INCLUDE (producto_key, nombre_producto);
+CREATE INDEX IF NOT EXISTS dim_pago_metodo_idx       ON dim_pago (metodo_pago) INCLUDE (pago_key);
+
+ANALYZE hechos_ventas;
+ANALYZE dim_tienda;
+ANALYZE dim_producto;
+ANALYZE dim_pago;
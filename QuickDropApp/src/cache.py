@@ -0,0 +1,330 @@
+# src/cache.py
+"""
+Caché de resultados compartida entre sesiones y procesos.
+
+- Los filtros se normalizan (listas ordenadas, vacío == None) antes de armar la clave.
+- Los DataFrames se guardan como bytes Parquet; el resto con pickle.
+- Backends: LRU en memoria acotado por bytes y/o almacén en disco compartido
+  entre los workers de Streamlit (QD_CACHE_BACKEND = memory | disk | tiered).
+- No hay TTL: la clave incluye la "generación de carga" del ETL (tabla
+  etl_generacion), así que una carga nueva invalida todo de una vez. Con
+  QD_BACKEND=duckdb la generación es la del snapshot Parquet (src/duck.py).
+
+Uso (desde QuickDropApp/):
+    python -m src.cache generation   # generación actual
+    python -m src.cache bump         # nueva generación (correr tras cada carga del DW)
+    python -m src.cache clear        # vacía los backends locales
+"""
+from __future__ import annotations
+import argparse
+import functools
+import hashlib
+import inspect
+import io
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import text
+from src import duck, metrics
+from src.config import get_engine
+
+BACKEND = os.getenv("QD_CACHE_BACKEND", "tiered")
+MEM_BYTES = int(float(os.getenv("QD_CACHE_MEM_MB", "256")) * 2**20)
+DISK_BYTES = int(float(os.getenv("QD_CACHE_DISK_MB", "2048")) * 2**20)
+DISK_DIR = Path(os.getenv("QD_CACHE_DIR", Path(tempfile.gettempdir()) / "quickdrop_cache"))
+# Cada cuántos segundos se vuelve a consultar la generación en la base
+GENERATION_POLL = float(os.getenv("QD_GENERATION_POLL", "10"))
+
+# ---------------------------------------------------------------------------
+# Normalización de filtros y claves
+# ---------------------------------------------------------------------------
+def canonical_filters(filters: dict | None) -> dict:
+    """Filtros equivalentes -> mismo dict: sin vacíos, listas ordenadas y sin duplicados."""
+    out = {}
+    for k, v in sorted((filters or {}).items()):
+        if v is None or v == "" or (isinstance(v, (list, tuple, set)) and not v):
+            continue
+        if isinstance(v, (list, tuple, set)):
+            v = sorted(set(v), key=str)
+        elif isinstance(v, datetime):
+            v = v.date()
+        out[k] = v
+    return out
+
+def _jsonable(v):
+    if isinstance(v, (date, datetime)):
+        return v.isoformat()
+    return str(v)
+
+@functools.lru_cache(maxsize=None)
+def _signature(fn) -> inspect.Signature:
+    return inspect.signature(fn)
+
+def make_key(name: str, args: tuple, kwargs: dict, generation: int, fn=None) -> str:
+    """
+    Con fn, los argumentos se normalizan por su firma: f(x, 10), f(x, n=10) y
+    f(x) (con n=10 por defecto) dan la misma clave.
+    """
+    if fn is not None:
+        bound = _signature(fn).bind(*args, **kwargs)
+        bound.apply_defaults()
+        args, kwargs = (), dict(bound.arguments)
+    raw = json.dumps([name, args, sorted(kwargs.items()), generation], default=_jsonable, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+# ---------------------------------------------------------------------------
+# Serialización
+# ---------------------------------------------------------------------------
+def dumps(value) -> bytes:
+    if isinstance(value, pd.DataFrame):
+        try:
+            buf = io.BytesIO()
+            value.to_parquet(buf, index=False)
+            return b"PQ" + buf.getvalue()
+        except Exception:
+            pass  # tipos que Arrow no sabe mapear -> pickle
+    return b"PK" + pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+def loads(blob: bytes):
+    if blob[:2] == b"PQ":
+        return pd.read_parquet(io.BytesIO(blob[2:]))
+    return pickle.loads(blob[2:])
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+class MemoryLRU:
+    """LRU en memoria del proceso, acotado por tamaño total en bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._data: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            blob = self._data.get(key)
+            if blob is not None:
+                self._data.move_to_end(key)
+            return blob
+
+    def put(self, key, blob):
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._data[key] = blob
+            self._size += len(blob)
+            while self._size > self.max_bytes:
+                _, ev = self._data.popitem(last=False)
+                self._size -= len(ev)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+class DiskStore:
+    """Un archivo por clave; escritura atómica, visible para todos los procesos del host."""
+
+    PRUNE_EVERY = 200
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._puts = 0
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key):
+        return self.root / key[:2] / f"{key}.bin"
+
+    def get(self, key):
+        p = self._path(key)
+        try:
+            blob = p.read_bytes()
+            os.utime(p)  # para que el recorte por antigüedad respete el uso
+        except OSError:
+            return None
+        return blob
+
+    def put(self, key, blob):
+        p = self._path(key)
+        p.parent.mkdir(exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=p.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(blob)
+        os.replace(tmp, p)
+        self._puts += 1
+        if self._puts % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self):
+        """Borra los archivos menos usados hasta quedar bajo max_bytes."""
+        files = []
+        for p in self.root.glob("*/*.bin"):
+            try:
+                st_ = p.stat()
+            except OSError:
+                continue
+            files.append((st_.st_mtime, st_.st_size, p))
+        total = sum(s for _, s, _ in files)
+        for _, size, p in sorted(files):
+            if total <= self.max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        for p in self.root.glob("*/*.bin"):
+            p.unlink(missing_ok=True)
+
+class Tiered:
+    """Memoria delante de disco: lo leído de disco se promueve a memoria."""
+
+    def __init__(self, *layers):
+        self.layers = layers
+
+    def get(self, key):
+        for i, layer in enumerate(self.layers):
+            blob = layer.get(key)
+            if blob is not None:
+                for upper in self.layers[:i]:
+                    upper.put(key, blob)
+                return blob
+        return None
+
+    def put(self, key, blob):
+        for layer in self.layers:
+            layer.put(key, blob)
+
+    def clear(self):
+        for layer in self.layers:
+            layer.clear()
+
+_store = None
+_store_lock = threading.Lock()
+
+def store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            if BACKEND == "memory":
+                _store = MemoryLRU(MEM_BYTES)
+            elif BACKEND == "disk":
+                _store = DiskStore(DISK_DIR, DISK_BYTES)
+            else:
+                _store = Tiered(MemoryLRU(MEM_BYTES), DiskStore(DISK_DIR, DISK_BYTES))
+        return _store
+
+# ---------------------------------------------------------------------------
+# Generación de carga
+# ---------------------------------------------------------------------------
+_generation = (0, 0.0)  # (valor, monotonic de la última lectura)
+_gen_lock = threading.Lock()
+
+def read_generation(conn) -> int:
+    if conn.execute(text("SELECT to_regclass('etl_generacion')")).scalar_one() is None:
+        return 0
+    return conn.execute(text("SELECT generacion FROM etl_generacion WHERE id = 1")).scalar() or 0
+
+def bump_generation(conn) -> int:
+    """Abre una generación nueva (invalida todas las entradas de caché). 0 si falta migrations/003."""
+    if conn.execute(text("SELECT to_regclass('etl_generacion')")).scalar_one() is None:
+        return 0
+    return conn.execute(text("""
+        UPDATE etl_generacion SET generacion = generacion + 1, actualizado_en = now()
+        WHERE id = 1 RETURNING generacion
+    """)).scalar_one()
+
+def load_generation() -> int:
+    """Generación actual; se consulta a la base como mucho cada GENERATION_POLL segundos."""
+    global _generation
+    with _gen_lock:
+        value, ts = _generation
+        if ts and time.monotonic() - ts < GENERATION_POLL:
+            return value
+        try:
+            if duck.ENABLED:
+                value = duck.generation()  # la del snapshot: no se consulta el DW
+            else:
+                with get_engine().connect() as conn:
+                    value = read_generation(conn)
+        except Exception:
+            pass  # sin base: seguimos con la última conocida
+        _generation = (value, time.monotonic())
+        return value
+
+# ---------------------------------------------------------------------------
+# Decorador
+# ---------------------------------------------------------------------------
+_key_locks: dict[str, threading.Lock] = {}
+_key_locks_guard = threading.Lock()
+
+def _key_lock(key):
+    with _key_locks_guard:
+        return _key_locks.setdefault(key, threading.Lock())
+
+def cached(fn):
+    """
+    Cachea fn en store(). Los dict se tratan como filtros y se normalizan; fn
+    recibe la forma canónica. La clave no depende de cómo se pasen los
+    argumentos (posición, nombre o valor por defecto, ver make_key).
+    """
+    name = f"{fn.__module__}.{fn.__qualname__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        args = tuple(canonical_filters(a) if isinstance(a, dict) else a for a in args)
+        kwargs = {k: canonical_filters(v) if isinstance(v, dict) else v for k, v in kwargs.items()}
+        key = make_key(name, args, kwargs, load_generation(), fn)
+        filters = next((a for a in (*args, *kwargs.values()) if isinstance(a, dict)), None)
+        t0 = time.perf_counter()
+        blob = store().get(key)
+        if blob is None:
+            # Un solo cálculo por clave dentro del proceso
+            with _key_lock(key):
+                blob = store().get(key)
+                if blob is None:
+                    try:
+                        value = fn(*args, **kwargs)
+                        store().put(key, dumps(value))
+                    finally:
+                        # También si fn falla: si no, el candado de la clave queda en _key_locks
+                        with _key_locks_guard:
+                            _key_locks.pop(key, None)
+                    metrics.cache_event(name, False, (time.perf_counter() - t0) * 1000, filters)
+                    return value
+        value = loads(blob)
+        metrics.cache_event(name, True, (time.perf_counter() - t0) * 1000, filters)
+        return value
+
+    wrapper.uncached = fn
+    return wrapper
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Caché de resultados QuickDrop")
+    ap.add_argument("accion", choices=["generation", "bump", "clear"])
+    args = ap.parse_args(argv)
+    if args.accion == "generation":
+        with get_engine().connect() as conn:
+            print(read_generation(conn))
+    elif args.accion == "bump":
+        with get_engine().begin() as conn:
+            print(bump_generation(conn))
+    else:
+        store().clear()
+        print(f"caché vaciada ({BACKEND})")
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ from dotenv import load_dotenv
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 import streamlit as st
+from src import metrics
 
 load_dotenv()
 
@@ -17,19 +18,69 @@ def _db_url() -> str:
     pwd  = os.getenv("PG_PASS", "")
     return f"postgresql+psycopg://{user}:{quote_plus(pwd)}@{host}:{port}/{db}"
 
+def _int_env(name: str, default: int | None) -> int | None:
+    v = os.getenv(name)
+    return default if v in (None, "") else int(v)
+
+def pool_settings() -> dict:
+    """Parámetros del pool y de sesión, configurables por entorno."""
+    return {
+        "pool_size":         _int_env("QD_POOL_SIZE", 5),
+        "max_overflow":      _int_env("QD_POOL_MAX_OVERFLOW", 10),
+        "pool_recycle":      _int_env("QD_POOL_RECYCLE", 1800),       # s; evita conexiones viejas
+        "pool_timeout":      _int_env("QD_POOL_TIMEOUT", 30),         # s esperando una conexión libre
+        "statement_timeout": _int_env("QD_STATEMENT_TIMEOUT_MS", 30000),  # 0 = sin límite
+        "search_path":       os.getenv("PG_SCHEMA"),                  # ej. "dw"
+        "application_name":  os.getenv("QD_APP_NAME", "quickdrop-dashboard"),
+        # psycopg prepara en el servidor una consulta tras N ejecuciones; vacío/-1 = nunca
+        "prepare_threshold": _int_env("QD_PREPARE_THRESHOLD", 5),
+    }
+
+def _connect_args(cfg: dict) -> dict:
+    # Las opciones van en el arranque de cada conexión física: toda conexión
+    # que entrega el pool ya las trae, sin un SET extra por checkout.
+    opts = []
+    if cfg["statement_timeout"]:
+        opts.append(f"-c statement_timeout={cfg['statement_timeout']}")
+    if cfg["search_path"]:
+        opts.append(f"-c search_path={cfg['search_path']}")
+    args = {"application_name": cfg["application_name"]}
+    if opts:
+        args["options"] = " ".join(opts)
+    pt = cfg["prepare_threshold"]
+    args["prepare_threshold"] = None if pt is None or pt < 0 else pt
+    return args
+
 @st.cache_resource(show_spinner=False)
 def get_engine():
-    return create_engine(_db_url(), pool_pre_ping=True)
+    cfg = pool_settings()
+    engine = create_engine(
+        _db_url(),
+        pool_pre_ping=True,
+        pool_size=cfg["pool_size"],
+        max_overflow=cfg["max_overflow"],
+        pool_recycle=cfg["pool_recycle"],
+        pool_timeout=cfg["pool_timeout"],
+        connect_args=_connect_args(cfg),
+    )
+    metrics.install(engine)
+    return engine
 
 @st.cache_resource(show_spinner=False)
+def _session_factory():
+    return sessionmaker(bind=get_engine())
+
 def get_session():
-    engine = get_engine()
-    schema = os.getenv("PG_SCHEMA")
-    if schema:
-        with engine.connect() as conn:
-            conn.execute(text(f"SET search_path TO {schema}"))
-    return sessionmaker(bind=engine)()
+    # search_path ya viene fijado en cada conexión del pool (ver _connect_args)
+    return _session_factory()()
+
+def statement_timeout(conn, ms: int | None):
+    """Límite de tiempo solo para la transacción en curso de conn (SET LOCAL)."""
+    if ms:
+        conn.execute(text("SELECT set_config('statement_timeout', :v, true)"), {"v": f"{int(ms)}ms"})
 
+# Estado de la conexión para la barra lateral: un "select version()" por minuto, no por rerun
+@st.cache_data(ttl=int(os.getenv("QD_CONN_STATUS_TTL", "60")), show_spinner=False)
 def test_connection() -> str:
     try:
         with get_engine().connect() as conn:
@@ -0,0 +1,79 @@
+# src/dimindex.py
+"""
+Índice de dimensiones en memoria.
+
+Traduce los filtros por atributo a listas de claves sustitutas del hecho:
+ciudad -> tienda_key, categoría -> producto_key, método de pago -> pago_key y
+año/mes -> fecha_key. Con eso build_sql filtra hechos_ventas directo por
+hv.*_key y no une la dimensión solo para filtrar. El rango de fechas ya va por
+fecha_key (ver queries.fecha_key), así que no necesita el índice.
+
+Las dimensiones son chicas: se leen una vez por proceso y se vuelven a leer
+cuando cambia la generación de carga del ETL (src.cache.load_generation).
+"""
+from __future__ import annotations
+import os
+import threading
+from sqlalchemy import text
+from src import duck
+from src.cache import load_generation
+from src.config import get_engine
+
+# Se puede apagar para comparar contra el filtro por atributo con JOIN
+ENABLED = os.getenv("QD_KEY_FILTERS", "1") == "1"
+
+# Filtro -> (valor, clave) de su dimensión
+SOURCES = {
+    "ciudades":   "SELECT ciudad, tienda_key FROM dim_tienda WHERE ciudad IS NOT NULL",
+    "categorias": "SELECT categoria, producto_key FROM dim_producto WHERE categoria IS NOT NULL",
+    "metodos":    "SELECT metodo_pago, pago_key FROM dim_pago WHERE metodo_pago IS NOT NULL",
+}
+
+_index: tuple[int, dict] | None = None  # (generación, índice)
+_lock = threading.Lock()
+
+def build_index(conn) -> dict:
+    """{filtro: {valor: [claves]}} y "fechas": [(fecha_key, ano, mes)]."""
+    idx = {}
+    for name, sql in SOURCES.items():
+        m: dict = {}
+        for value, key in conn.execute(text(sql)):
+            m.setdefault(value, []).append(key)
+        idx[name] = m
+    idx["fechas"] = conn.execute(text("SELECT fecha_key, ano, mes FROM dim_fecha")).all()
+    return idx
+
+def load_index() -> dict:
+    global _index
+    generation = load_generation()
+    with _lock:
+        if _index is None or _index[0] != generation:
+            with get_engine().connect() as conn:
+                _index = (generation, build_index(conn))
+        return _index[1]
+
+def resolve(filters: dict, idx: dict | None = None) -> dict:
+    """
+    {filtro: [claves]} para los filtros por atributo activos (ver queries.KEY_COLS).
+    Un valor que no está en la dimensión no aporta claves: igual que con el JOIN,
+    el filtro no deja pasar ninguna fila.
+    """
+    idx = idx if idx is not None else load_index()
+    keys = {}
+    for name in SOURCES:
+        if filters.get(name):
+            keys[name] = sorted({k for v in filters[name] for k in idx[name].get(v, ())})
+    years, months = filters.get("years"), filters.get("months")
+    if years or months:
+        keys["fechas"] = [k for k, a, m in idx["fechas"]
+                          if (not years or a in years) and (not months or m in months)]
+    return keys
+
+def safe_resolve(filters: dict) -> dict | None:
+    """resolve() para services: None (filtrar con JOIN) si está apagado o falla la carga."""
+    if not ENABLED or duck.ENABLED:  # en DuckDB los JOIN con dimensiones son baratos
+        return None
+    try:
+        return resolve(filters)
+    except Exception:
+        return None
@@ -0,0 +1,252 @@
+# src/duck.py
+"""
+Backend columnar en proceso: DuckDB sobre un snapshot Parquet del DW.
+
+Con QD_BACKEND=duckdb, services responde el mismo catálogo de src/queries.py
+con DuckDB leyendo Parquet local. Los cambios de filtros ya no consultan el
+servidor Postgres. El snapshot (hechos_ventas + dimensiones) se toma después
+de cada carga del ETL y lleva la generación de carga, que también usa la caché
+en este modo.
+
+- Tipos: se copian los de Postgres (numeric(p,s) -> decimal, date -> date, ...),
+  así los agregados redondean igual que en el servidor.
+- Dialecto: ":param" -> "$param" y "col = ANY(:lista)" -> "col IN (...)".
+- Los rollups no se copian: DuckDB agrega el hecho directamente.
+
+Uso (desde QuickDropApp/):
+    python -m src.duck snapshot          # exporta el DW a QD_DUCKDB_DIR
+    python -m src.duck estado            # generación y tablas del snapshot vigente
+    python -m src.duck comparar          # mismo catálogo en Postgres y DuckDB, diferencias
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from src import metrics
+
+ENABLED = os.getenv("QD_BACKEND", "postgres") == "duckdb"
+DIR = Path(os.getenv("QD_DUCKDB_DIR", Path(tempfile.gettempdir()) / "quickdrop_parquet"))
+THREADS = int(os.getenv("QD_DUCKDB_THREADS", "0"))  # 0 = lo que decida DuckDB
+BATCH = 100_000
+KEEP = 2  # snapshots que se conservan (el vigente + el anterior, por lectores en curso)
+
+TABLES = ["hechos_ventas", "dim_fecha", "dim_tienda", "dim_producto", "dim_pago", "dim_cliente", "dim_repartidor"]
+MANIFEST = "actual.json"
+
+# ---------------------------------------------------------------------------
+# Snapshot: Postgres -> Parquet
+# ---------------------------------------------------------------------------
+def _arrow_type(pa, data_type: str, precision, scale):
+    return {
+        "smallint": pa.int16(), "integer": pa.int32(), "bigint": pa.int64(),
+        "numeric": pa.decimal128(precision or 38, scale or 0) if precision else pa.float64(),
+        "real": pa.float32(), "double precision": pa.float64(), "boolean": pa.bool_(),
+        "date": pa.date32(), "timestamp without time zone": pa.timestamp("us"),
+        "timestamp with time zone": pa.timestamp("us", tz="UTC"),
+    }.get(data_type, pa.string())
+
+def _schema(cur, pa, table: str):
+    cur.execute("""
+        SELECT column_name, data_type, numeric_precision, numeric_scale
+        FROM information_schema.columns
+        WHERE table_name = %s AND table_schema = ANY(current_schemas(false))
+        ORDER BY ordinal_position
+    """, (table,))
+    return pa.schema([(c, _arrow_type(pa, t, p, s)) for c, t, p, s in cur.fetchall()])
+
+def export_table(conn, table: str, path: Path) -> int:
+    """Copia una tabla a Parquet por lotes con un cursor del lado servidor."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    with conn.cursor() as cur:
+        schema = _schema(cur, pa, table)
+    cols = ", ".join(schema.names)
+    order = " ORDER BY fecha_key" if table == "hechos_ventas" else ""  # grupos de filas por fecha
+    filas = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as w, \
+            conn.cursor(name=f"qd_snapshot_{table}") as cur:
+        cur.itersize = BATCH
+        cur.execute(f"SELECT {cols} FROM {table}{order}")
+        while rows := cur.fetchmany(BATCH):
+            columnas = list(zip(*rows))
+            w.write_batch(pa.record_batch(
+                [pa.array(c, type=f.type) for c, f in zip(columnas, schema)], schema=schema))
+            filas += len(rows)
+    return filas
+
+def snapshot() -> dict:
+    """Exporta TABLES en una transacción (vista consistente) y publica el snapshot."""
+    from src.cache import read_generation
+    from src.config import get_engine
+    DIR.mkdir(parents=True, exist_ok=True)
+    t0 = time.perf_counter()
+    tmp = Path(tempfile.mkdtemp(prefix=".tmp_", dir=DIR))
+    try:
+        # REPEATABLE READ: la generación y todas las tablas del mismo instante
+        with get_engine().connect().execution_options(isolation_level="REPEATABLE READ") as sa_conn, \
+                sa_conn.begin():
+            generation = read_generation(sa_conn)
+            conn = sa_conn.connection.driver_connection
+            filas = {t: export_table(conn, t, tmp / f"{t}.parquet") for t in TABLES}
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    destino = DIR / f"g{generation}_{int(time.time())}"
+    tmp.rename(destino)
+    info = {"generacion": generation, "dir": destino.name, "filas": filas,
+            "segundos": round(time.perf_counter() - t0, 1)}
+    _publish(info)
+    _prune()
+    return info
+
+def _publish(info: dict):
+    fd, tmp = tempfile.mkstemp(dir=DIR, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        json.dump(info, fh)
+    os.replace(tmp, DIR / MANIFEST)
+
+def _prune():
+    snaps = sorted((p for p in DIR.glob("g*_*") if p.is_dir()), key=lambda p: p.stat().st_mtime)
+    for p in snaps[:-KEEP]:
+        shutil.rmtree(p, ignore_errors=True)
+
+def manifest() -> dict | None:
+    try:
+        return json.loads((DIR / MANIFEST).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+def generation() -> int:
+    """Generación de carga del snapshot vigente (reemplaza a la del DW en este modo)."""
+    m = manifest()
+    return m["generacion"] if m else 0
+
+# ---------------------------------------------------------------------------
+# Consulta
+# ---------------------------------------------------------------------------
+_db = None  # (nombre del snapshot, conexión DuckDB)
+_db_lock = threading.Lock()
+_local = threading.local()
+
+def _database():
+    """Conexión con vistas sobre el snapshot vigente; se rehace cuando se publica otro."""
+    global _db
+    m = manifest()
+    if m is None:
+        raise RuntimeError(f"No hay snapshot en {DIR}: corre `python -m src.duck snapshot`")
+    with _db_lock:
+        if _db is None or _db[0] != m["dir"]:
+            import duckdb
+            con = duckdb.connect(":memory:")
+            if THREADS:
+                con.execute(f"SET threads = {THREADS}")
+            for t in TABLES:
+                path = (DIR / m["dir"] / f"{t}.parquet").as_posix().replace("'", "''")
+                con.execute(f"CREATE VIEW {t} AS SELECT * FROM read_parquet('{path}')")
+            _db = (m["dir"], con)
+        return _db
+
+def _cursor():
+    name, con = _database()
+    # Un cursor por hilo (prefetch consulta en paralelo)
+    if getattr(_local, "snap", None) != name:
+        _local.snap, _local.cur = name, con.cursor()
+    return _local.cur
+
+_ANY = re.compile(r"([\w.]+) = ANY\(:(\w+)\)")
+_PARAM = re.compile(r"(?<![:\w]):(\w+)")
+
+def to_duckdb(sql: str, params: dict) -> tuple[str, dict]:
+    """SQL del catálogo (estilo SQLAlchemy/Postgres) -> SQL + parámetros de DuckDB."""
+    params = dict(params)
+
+    def expand(m):
+        col, name = m.groups()
+        values = params.pop(name)
+        if not values:
+            return "FALSE"  # = ANY('{}') no deja pasar ninguna fila
+        for i, v in enumerate(values):
+            params[f"{name}_{i}"] = v
+        return f"{col} IN (" + ", ".join(f":{name}_{i}" for i in range(len(values))) + ")"
+
+    sql = _ANY.sub(expand, sql)
+    # DuckDB rechaza parámetros que la consulta no usa
+    used = set(_PARAM.findall(sql))
+    return _PARAM.sub(r"$\1", sql).strip().rstrip(";"), {k: v for k, v in params.items() if k in used}
+
+def query(sql: str, params: dict):
+    """Como pd.read_sql(text(sql), conn, params) contra el snapshot."""
+    import pyarrow as pa
+    sql, params = to_duckdb(sql, params)
+    t0 = time.perf_counter()
+    table = _cursor().execute(sql, params).fetch_arrow_table()
+    metrics.add_db_time((time.perf_counter() - t0) * 1000, table.nbytes)
+    # Mismos dtypes que pd.read_sql sobre Postgres: numeric -> float64 y
+    # SUM(int) (HUGEINT en DuckDB, llega como decimal(38,0)) -> int64 como el bigint
+    for i, f in enumerate(table.schema):
+        if pa.types.is_decimal(f.type):
+            entero = f.type.scale == 0 and table.column(i).null_count == 0
+            table = table.set_column(i, f.name, table.column(i).cast(pa.int64() if entero else pa.float64()))
+    return table.to_pandas()
+
+def query_batches(sql: str, params: dict, rows: int):
+    """Resultado como pyarrow.RecordBatchReader (lotes de rows filas), para exportar."""
+    sql, params = to_duckdb(sql, params)
+    return _cursor().execute(sql, params).fetch_record_batch(rows)
+
+# ---------------------------------------------------------------------------
+# Verificación contra Postgres
+# ---------------------------------------------------------------------------
+def compare(filters_list: list[dict]) -> list[str]:
+    """Corre cada consulta del catálogo en ambos motores; devuelve las diferencias."""
+    import pandas as pd
+    from sqlalchemy import text
+    from src.config import get_engine
+    from src.queries import QUERIES, build_sql
+    diffs = []
+    with get_engine().connect() as conn:
+        for key, q in QUERIES.items():
+            if q.get("export_only"):
+                continue
+            extra = {"limit": 1_000_000} if q.get("limit") else {}
+            for filters in filters_list:
+                sql, params = build_sql(key, filters)
+                params = {**params, **extra}
+                pg = pd.read_sql(text(sql), conn, params=params)
+                dk = query(sql, params)
+                pg, dk = (d.sort_values(list(d.columns), kind="stable", na_position="last")
+                          .reset_index(drop=True) for d in (pg, dk))
+                try:
+                    pd.testing.assert_frame_equal(pg, dk, check_dtype=False, rtol=1e-9)
+                except AssertionError as e:
+                    diffs.append(f"{key} {filters}: {str(e).splitlines()[0]}")
+    return diffs
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Snapshot Parquet + DuckDB para QuickDrop")
+    ap.add_argument("accion", choices=["snapshot", "estado", "comparar"])
+    args = ap.parse_args(argv)
+    if args.accion == "snapshot":
+        info = snapshot()
+        print(f"snapshot {info['dir']} (generación {info['generacion']}) en {info['segundos']} s")
+        for t, n in info["filas"].items():
+            print(f"  {t:<15} {n:>10} filas")
+    elif args.accion == "estado":
+        print(json.dumps(manifest(), indent=1) if manifest() else f"sin snapshot en {DIR}")
+    else:
+        from datetime import date, timedelta
+        hoy = date.today()
+        diffs = compare([{}, {"date_from": hoy - timedelta(days=29), "date_to": hoy}])
+        print("\n".join(diffs) or "sin diferencias")
+        if diffs:
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
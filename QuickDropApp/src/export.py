@@ -0,0 +1,199 @@
+# src/export.py
+"""
+Exportación de resultados grandes a archivo, sin armar un DataFrame.
+
+El servidor serializa la consulta con COPY ... TO STDOUT y los bloques van
+directo a un CSV comprimido (gzip) o, pasando por el lector incremental de
+Arrow, a un Parquet escrito por grupos de filas. La memoria del worker queda
+acotada por el tamaño de bloque, no por la cantidad de filas.
+
+Los archivos quedan en QD_EXPORT_DIR con un nombre derivado de la consulta,
+los filtros y la generación de carga: exportar dos veces lo mismo reutiliza
+el archivo. Los de más de QD_EXPORT_TTL_H horas se borran en la siguiente
+exportación.
+
+Por defecto QD_EXPORT_DIR es static/exports de la app: con el servidor de
+archivos estáticos de Streamlit (.streamlit/config.toml) la descarga es un
+enlace que Tornado sirve por bloques desde disco, sin pasar el archivo por la
+memoria del proceso. El nombre (hash de 24 hex) es la única protección: quien
+tenga el enlace puede descargarlo hasta que se borre.
+
+Uso (desde QuickDropApp/):
+    python -m src.export raw_facts --formato parquet --desde 2024-01-01
+    python -m src.export city_store --ciudad Quito --ciudad Loja
+"""
+from __future__ import annotations
+import argparse
+import gzip
+import io
+import os
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+from sqlalchemy import text
+from src import dimindex, duck, metrics
+from src.cache import canonical_filters, load_generation, make_key
+from src.config import get_engine, statement_timeout
+from src.queries import QUERIES, build_sql
+from src.transport import arrow_types
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"  # servido en app/static/
+DIR = Path(os.getenv("QD_EXPORT_DIR", STATIC_DIR / "exports")).resolve()
+TTL_H = float(os.getenv("QD_EXPORT_TTL_H", "24"))
+# Las exportaciones completas tardan más que un panel: límite propio
+TIMEOUT_MS = int(os.getenv("QD_EXPORT_TIMEOUT_MS", "600000"))
+BLOCK = 1 << 20        # bytes por lectura del COPY / bloque del lector CSV de Arrow
+BATCH_ROWS = 100_000   # filas por lote en el backend DuckDB
+
+FORMATS = {
+    "csv":     {"ext": ".csv.gz",  "mime": "application/gzip"},
+    "parquet": {"ext": ".parquet", "mime": "application/vnd.apache.parquet"},
+}
+
+# ---------------------------------------------------------------------------
+# Postgres: COPY -> gzip / Arrow -> Parquet
+# ---------------------------------------------------------------------------
+class _CopyReader(io.RawIOBase):
+    """Archivo de solo lectura sobre los bloques de un COPY ... TO STDOUT."""
+
+    def __init__(self, copy):
+        self._it = iter(copy)
+        self._buf = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buf:
+            try:
+                self._buf = memoryview(bytes(next(self._it)))
+            except StopIteration:
+                return 0
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+def _copy_to_file(conn, sql: str, params: dict, fmt: str, path: Path) -> int:
+    compiled = text(sql.strip().rstrip(";")).compile(dialect=conn.dialect)
+    inner, bound = compiled.string, compiled.construct_params(params)
+    with conn.connection.driver_connection.cursor() as cur:
+        types = arrow_types(cur, inner, bound, decimal=True) if fmt == "parquet" else None
+        with cur.copy(f"COPY ({inner}) TO STDOUT (FORMAT CSV, HEADER)", bound) as copy:
+            if fmt == "csv":
+                with gzip.open(path, "wb", compresslevel=6) as fh:
+                    for chunk in copy:
+                        fh.write(chunk)
+            else:
+                import pyarrow.csv as pacsv
+                import pyarrow.parquet as pq
+                reader = pacsv.open_csv(
+                    io.BufferedReader(_CopyReader(copy), BLOCK),
+                    read_options=pacsv.ReadOptions(block_size=BLOCK),
+                    convert_options=pacsv.ConvertOptions(
+                        column_types=types, true_values=["t"], false_values=["f"],
+                        strings_can_be_null=True, quoted_strings_can_be_null=False),
+                )
+                with pq.ParquetWriter(path, reader.schema, compression="zstd") as w:
+                    for batch in reader:
+                        w.write_batch(batch)
+        return cur.rowcount
+
+def _duck_to_file(sql: str, params: dict, fmt: str, path: Path) -> int:
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+    reader = duck.query_batches(sql, params, BATCH_ROWS)
+    filas = 0
+    if fmt == "csv":
+        with gzip.open(path, "wb", compresslevel=6) as fh, pacsv.CSVWriter(fh, reader.schema) as w:
+            for batch in reader:
+                w.write_batch(batch)
+                filas += batch.num_rows
+    else:
+        with pq.ParquetWriter(path, reader.schema, compression="zstd") as w:
+            for batch in reader:
+                w.write_batch(batch)
+                filas += batch.num_rows
+    return filas
+
+# ---------------------------------------------------------------------------
+# API
+# ---------------------------------------------------------------------------
+def _prune():
+    limite = time.time() - TTL_H * 3600
+    for p in DIR.glob("*"):
+        try:
+            if p.is_file() and p.stat().st_mtime < limite:
+                p.unlink()
+        except OSError:
+            pass
+
+def export_query(key: str, filters: dict, fmt: str = "csv") -> dict:
+    """
+    Exporta QUERIES[key] con filtros, sin LIMIT, a un archivo. Devuelve
+    {"path", "filas", "bytes", "segundos", "mime"}; filas es None si se reutilizó.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"formato desconocido: {fmt}")
+    filters = canonical_filters(filters)
+    DIR.mkdir(parents=True, exist_ok=True)
+    path = DIR / (make_key(f"export.{key}", (filters,), {"fmt": fmt}, load_generation())[:24] + FORMATS[fmt]["ext"])
+    info = {"path": path, "mime": FORMATS[fmt]["mime"], "filas": None, "segundos": 0.0}
+    if not path.exists():
+        _prune()
+        # La exportación va completa: sin el LIMIT de los paneles
+        sql, params = build_sql(key, filters, keys=dimindex.safe_resolve(filters), limit=False)
+        fd, tmp = tempfile.mkstemp(dir=DIR, suffix=".tmp")
+        os.close(fd)
+        tmp = Path(tmp)
+        t0 = time.perf_counter()
+        with metrics.query_scope(f"export:{key}", filters, transporte=fmt) as ev:
+            try:
+                if duck.ENABLED:
+                    filas = _duck_to_file(sql, params, fmt, tmp)
+                else:
+                    with get_engine().connect() as conn:
+                        statement_timeout(conn, TIMEOUT_MS)
+                        filas = _copy_to_file(conn, sql, params, fmt, tmp)
+            except Exception:
+                tmp.unlink(missing_ok=True)
+                raise
+            ev["filas"] = filas
+            ev["bytes"] = tmp.stat().st_size
+        os.replace(tmp, path)
+        info.update(filas=filas, segundos=round(time.perf_counter() - t0, 1))
+    info["bytes"] = path.stat().st_size
+    return info
+
+def static_url(path: Path) -> str | None:
+    """URL relativa para descargar path vía el servidor estático, o None si está fuera de static/."""
+    try:
+        rel = Path(path).resolve().relative_to(STATIC_DIR)
+    except ValueError:
+        return None
+    return "app/static/" + rel.as_posix()
+
+def export_facts(filters: dict, fmt: str = "csv") -> dict:
+    """Todas las ventas (nivel detalle de pedido) que cumplen los filtros."""
+    return export_query("raw_facts", filters, fmt)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Exporta una consulta del catálogo a CSV.gz o Parquet")
+    ap.add_argument("consulta", choices=[k for k in QUERIES if k != "cube"])
+    ap.add_argument("--formato", choices=list(FORMATS), default="csv")
+    ap.add_argument("--desde", type=date.fromisoformat)
+    ap.add_argument("--hasta", type=date.fromisoformat)
+    ap.add_argument("--ciudad", action="append")
+    ap.add_argument("--categoria", action="append")
+    ap.add_argument("--metodo", action="append")
+    args = ap.parse_args(argv)
+    filters = {"date_from": args.desde, "date_to": args.hasta, "ciudades": args.ciudad,
+               "categorias": args.categoria, "metodos": args.metodo}
+    info = export_query(args.consulta, filters, args.formato)
+    filas = "reutilizado" if info["filas"] is None else f"{info['filas']} filas en {info['segundos']} s"
+    print(f"{info['path']} ({info['bytes'] / 2**20:.1f} MB, {filas})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+# src/metrics.py
+"""
+Instrumentación de consultas y caché.
+
+- Cada consulta de services._query deja un evento con: clave, rollup usado,
+  tiempo total, tiempo en la base, espera por el pool, filas, bytes y la firma
+  de los filtros normalizados. Cada llamada a una función @cached deja un
+  evento de hit/miss.
+- Los eventos van a un ring buffer en memoria del proceso (QD_METRICS_SIZE);
+  la pestaña "Rendimiento" (QD_ADMIN=1) y el export los leen de ahí.
+- Export opcional: texto Prometheus en http://<host>:QD_METRICS_PORT/metrics y
+  spans OpenTelemetry con QD_OTEL=1 (si el paquete está instalado).
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+ENABLED = os.getenv("QD_METRICS", "1") == "1"
+SIZE = int(os.getenv("QD_METRICS_SIZE", "2000"))
+PORT = os.getenv("QD_METRICS_PORT")
+OTEL = os.getenv("QD_OTEL", "0") == "1"
+
+_ring: deque[dict] = deque(maxlen=SIZE)
+_totals: Counter = Counter()  # contadores monótonos para Prometheus
+_lock = threading.Lock()
+_scope: ContextVar[dict | None] = ContextVar("qd_metrics_scope", default=None)
+
+def signature(filters) -> str:
+    """Firma corta de los filtros (ya normalizados por src.cache.canonical_filters)."""
+    raw = json.dumps(filters or {}, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:10]
+
+# ---------------------------------------------------------------------------
+# Registro
+# ---------------------------------------------------------------------------
+def record(event: dict, start_ns: int | None = None):
+    if not ENABLED:
+        return
+    event.setdefault("ts", time.time())
+    with _lock:
+        _ring.append(event)
+        if event["tipo"] == "consulta":
+            _totals[("consulta", event["clave"], "error" if event.get("error") else "ok")] += 1
+        else:
+            _totals[("cache", event["clave"], "hit" if event["hit"] else "miss")] += 1
+    if OTEL:
+        _span(event, start_ns)
+
+@contextmanager
+def query_scope(key: str, filters=None, **attrs):
+    """Mide una consulta; db_ms/pool_wait_ms/bytes los suman los hooks mientras dura."""
+    ev = {"tipo": "consulta", "clave": key, "firma": signature(filters),
+          "db_ms": 0.0, "pool_wait_ms": 0.0, "filas": None, "bytes": None, **attrs}
+    token = _scope.set(ev)
+    start_ns, t0 = time.time_ns(), time.perf_counter()
+    try:
+        yield ev
+    except Exception as e:
+        ev["error"] = type(e).__name__
+        raise
+    finally:
+        ev["wall_ms"] = (time.perf_counter() - t0) * 1000
+        _scope.reset(token)
+        record(ev, start_ns)
+
+def add_db_time(ms: float, nbytes: int | None = None):
+    ev = _scope.get()
+    if ev is not None:
+        ev["db_ms"] += ms
+        if nbytes is not None:
+            ev["bytes"] = (ev["bytes"] or 0) + nbytes
+
+def add_pool_wait(ms: float):
+    ev = _scope.get()
+    if ev is not None:
+        ev["pool_wait_ms"] += ms
+
+def cache_event(name: str, hit: bool, ms: float, filters=None):
+    record({"tipo": "cache", "clave": name, "hit": hit, "wall_ms": ms, "firma": signature(filters)})
+
+def install(engine):
+    """Hooks del engine: tiempo de cada execute dentro de la consulta en curso."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("qd_t0", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("qd_t0")
+        if stack:
+            add_db_time((time.perf_counter() - stack.pop()) * 1000)
+
+    if PORT:
+        start_exporter(int(PORT))
+
+# ---------------------------------------------------------------------------
+# Lectura
+# ---------------------------------------------------------------------------
+def snapshot() -> list[dict]:
+    with _lock:
+        return list(_ring)
+
+def clear():
+    with _lock:
+        _ring.clear()
+
+def _pct(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+def query_summary(events: list[dict] | None = None) -> list[dict]:
+    """p50/p95 por clave de consulta (sobre la ventana del ring buffer)."""
+    by_key: dict[str, list[dict]] = {}
+    for ev in events if events is not None else snapshot():
+        if ev["tipo"] == "consulta":
+            by_key.setdefault(ev["clave"], []).append(ev)
+    out = []
+    for key, evs in sorted(by_key.items()):
+        wall = [e["wall_ms"] for e in evs]
+        db = [e["db_ms"] for e in evs]
+        wait = [e["pool_wait_ms"] for e in evs]
+        out.append({
+            "clave": key, "n": len(evs), "errores": sum(1 for e in evs if e.get("error")),
+            "p50_ms": _pct(wall, 0.5), "p95_ms": _pct(wall, 0.95),
+            "db_p50_ms": _pct(db, 0.5), "db_p95_ms": _pct(db, 0.95),
+            "pool_p95_ms": _pct(wait, 0.95),
+            "filas_p50": _pct([e["filas"] for e in evs if e["filas"] is not None], 0.5),
+            "bytes_p50": _pct([e["bytes"] for e in evs if e["bytes"] is not None], 0.5),
+            "rollups": sum(1 for e in evs if e.get("tabla")),
+        })
+    return out
+
+def cache_summary(events: list[dict] | None = None) -> list[dict]:
+    by_fn: dict[str, list[dict]] = {}
+    for ev in events if events is not None else snapshot():
+        if ev["tipo"] == "cache":
+            by_fn.setdefault(ev["clave"], []).append(ev)
+    out = []
+    for name, evs in sorted(by_fn.items()):
+        hits = [e["wall_ms"] for e in evs if e["hit"]]
+        misses = [e["wall_ms"] for e in evs if not e["hit"]]
+        out.append({
+            "funcion": name, "n": len(evs), "hit_ratio": len(hits) / len(evs),
+            "hit_p50_ms": _pct(hits, 0.5), "miss_p50_ms": _pct(misses, 0.5), "miss_p95_ms": _pct(misses, 0.95),
+        })
+    return out
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+def _labels(**kw) -> str:
+    return "{" + ",".join(f'{k}="{str(v).replace(chr(34), "")}"' for k, v in kw.items()) + "}"
+
+def prometheus_text() -> str:
+    lines = []
+    summaries = query_summary()
+    events = [e for e in snapshot() if e["tipo"] == "consulta"]
+    for metric, field, desc in [
+        ("qd_query_wall_ms", "wall_ms", "Latencia total por consulta (ventana reciente)"),
+        ("qd_query_db_ms", "db_ms", "Tiempo en la base por consulta (ventana reciente)"),
+        ("qd_query_pool_wait_ms", "pool_wait_ms", "Espera por una conexión del pool (ventana reciente)"),
+    ]:
+        lines += [f"# HELP {metric} {desc}", f"# TYPE {metric} summary"]
+        for s in summaries:
+            vals = [e[field] for e in events if e["clave"] == s["clave"]]
+            for q in (0.5, 0.95):
+                lines.append(f"{metric}{_labels(clave=s['clave'], quantile=q)} {_pct(vals, q):.3f}")
+            lines.append(f"{metric}_sum{_labels(clave=s['clave'])} {sum(vals):.3f}")
+            lines.append(f"{metric}_count{_labels(clave=s['clave'])} {len(vals)}")
+    with _lock:
+        totals = dict(_totals)
+    lines += ["# HELP qd_queries_total Consultas ejecutadas", "# TYPE qd_queries_total counter"]
+    lines += [f"qd_queries_total{_labels(clave=k, resultado=r)} {n}" for (t, k, r), n in totals.items() if t == "consulta"]
+    lines += ["# HELP qd_cache_requests_total Llamadas a funciones cacheadas", "# TYPE qd_cache_requests_total counter"]
+    lines += [f"qd_cache_requests_total{_labels(funcion=k, resultado=r)} {n}" for (t, k, r), n in totals.items() if t == "cache"]
+    return "\n".join(lines) + "\n"
+
+_exporter = None
+
+def start_exporter(port: int):
+    """Sirve prometheus_text() en /metrics desde un hilo del proceso de la app."""
+    global _exporter
+    if _exporter is not None:
+        return
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = prometheus_text().encode("utf-8")
+            self.send_response(200 if self.path.startswith("/metrics") else 404)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    try:
+        _exporter = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    except OSError:
+        return  # otro proceso/worker ya ocupa el puerto
+    threading.Thread(target=_exporter.serve_forever, name="qd-metrics", daemon=True).start()
+
+_tracer = None
+
+def _span(event: dict, start_ns: int | None):
+    global _tracer
+    try:
+        if _tracer is None:
+            from opentelemetry import trace
+            _tracer = trace.get_tracer("quickdrop")
+    except ImportError:
+        return
+    start = start_ns or time.time_ns() - int(event["wall_ms"] * 1e6)
+    span = _tracer.start_span(f"qd.{event['tipo']}.{event['clave']}", start_time=start)
+    for k, v in event.items():
+        if v is not None and isinstance(v, (str, bool, int, float)):
+            span.set_attribute(f"qd.{k}", v)
+    span.end(end_time=start + int(event["wall_ms"] * 1e6))
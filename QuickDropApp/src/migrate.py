@@ -0,0 +1,61 @@
+# src/migrate.py
+"""
+Aplica las migraciones DDL de QuickDropApp/migrations/ sobre el DW.
+
+Uso (desde QuickDropApp/):
+    python -m src.migrate            # aplica las pendientes
+    python -m src.migrate --status   # lista aplicadas / pendientes
+"""
+from __future__ import annotations
+import argparse
+from pathlib import Path
+from sqlalchemy import text
+from src.config import get_engine
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+LOG_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version     VARCHAR(100) PRIMARY KEY,
+        aplicado_en TIMESTAMPTZ DEFAULT now()
+    );
+"""
+
+def _files():
+    return sorted(MIGRATIONS_DIR.glob("*.sql"))
+
+def applied(conn) -> set[str]:
+    conn.execute(text(LOG_DDL))
+    return set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+def migrate() -> list[str]:
+    """Aplica cada migración pendiente en su propia transacción."""
+    done = []
+    engine = get_engine()
+    with engine.begin() as conn:
+        ya = applied(conn)
+    for f in _files():
+        if f.stem in ya:
+            continue
+        with engine.begin() as conn:
+            # Cursor DBAPI directo: el archivo trae varias sentencias y no usa parámetros
+            conn.connection.cursor().execute(f.read_text(encoding="utf-8"))
+            conn.execute(text("INSERT INTO schema_migrations (version) VALUES (:v)"), {"v": f.stem})
+        done.append(f.stem)
+    return done
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Migraciones DDL del DW")
+    ap.add_argument("--status", action="store_true")
+    args = ap.parse_args(argv)
+    if args.status:
+        with get_engine().begin() as conn:
+            ya = applied(conn)
+        for f in _files():
+            print(f"{'[x]' if f.stem in ya else '[ ]'} {f.stem}")
+        return
+    for v in migrate() or ["(nada pendiente)"]:
+        print(v)
+
+if __name__ == "__main__":
+    main()
@@ -1,128 +1,385 @@
 # src/queries.py
+"""
+Constructor de SQL para los paneles.
+
+Cada consulta se describe con atributos y medidas lógicas (QUERIES); build_sql
+arma el SELECT uniendo solo las dimensiones que piden las columnas proyectadas
+o los filtros activos. El rango de fechas va directo contra hv.fecha_key
+(clave AAAAMMDD, ver migrations/001), así que dim_fecha también se omite.
+Con las claves ya resueltas (src/dimindex.py) los filtros por ciudad, categoría,
+método de pago y año/mes tampoco unen su dimensión: van contra hv.*_key.
+Tienda, producto y pago se unían siempre con JOIN interno; si se omiten, la
+clave del hecho se exige NOT NULL para no sumar ventas que esas uniones
+descartaban (y coincidir con los rollups, que las unen igual).
+"""
 from __future__ import annotations
+import re
+from datetime import date
+
+# Dimensiones: alias -> (tabla, condición de unión con hechos_ventas)
+JOINS = {
+    "df":  ("dim_fecha",      "hv.fecha_key = df.fecha_key"),
+    "dt":  ("dim_tienda",     "hv.tienda_key = dt.tienda_key"),
+    "dp":  ("dim_producto",   "hv.producto_key = dp.producto_key"),
+    "dpg": ("dim_pago",       "hv.pago_key = dpg.pago_key"),
+    "dc":  ("dim_cliente",    "hv.cliente_key = dc.cliente_key"),
+    "dr":  ("dim_repartidor", "hv.repartidor_key = dr.repartidor_key"),
+}
+
+# Dimensiones con JOIN interno en toda consulta (como en los rollups): alias -> clave del hecho
+INNER_KEYS = {"dt": "hv.tienda_key", "dp": "hv.producto_key", "dpg": "hv.pago_key"}
+
+# Atributos lógicos -> expresión sobre hechos_ventas (el alias indica la dimensión a unir)
+ATTRS = {
+    "fecha":             "df.fecha",
+    "semana":            "date_trunc('week', df.fecha)::date",  # lunes de la semana
+    "ano":               "df.ano",
+    "mes":               "df.mes",
+    "ciudad":            "dt.ciudad",
+    "nombre_tienda":     "dt.nombre_tienda",
+    "categoria":         "dp.categoria",
+    "nombre_producto":   "dp.nombre_producto",
+    "metodo_pago":       "dpg.metodo_pago",
+    "estado_entrega":    "hv.estado_entrega",
+    "minutos_entrega":   "hv.minutos_entrega",
+    "nombre_cliente":    "dc.nombre_cliente",
+    "ciudad_cliente":    "dc.ciudad",
+    "nombre_repartidor": "dr.nombre_repartidor",
+    "zona":              "dr.zona",
+    "placa_moto":        "dr.placa_moto",
+    # Columnas del hecho (exportación a nivel detalle)
+    "id_pedido":         "hv.id_pedido",
+    "cantidad":          "hv.cantidad",
+    "precio_unitario":   "hv.precio_unitario",
+    "subtotal":          "hv.subtotal",
+    "total_pago":        "hv.total_pago",
+}
+
+# Atributos derivados: de qué atributo salen en un rollup y con qué expresión
+DERIVED = {"semana": "fecha"}
+ROLLUP_ATTRS = {"semana": "date_trunc('week', r.fecha)::date"}
+
+# Medidas: nombre -> (expresión sobre el hecho, expresión sobre un rollup o None si no se puede)
+MEASURES = {
+    "ingreso":         ("SUM(hv.total_pago)::numeric(14,2)", "SUM(r.ingreso)::numeric(14,2)"),
+    "unidades":        ("SUM(hv.cantidad)",                  "SUM(r.cantidad)::bigint"),
+    "transacciones":   ("COUNT(*)",                          "SUM(r.transacciones)::bigint"),
+    "clientes_unicos": ("COUNT(DISTINCT hv.cliente_key)",    None),
+    # Tiempos de entrega (minutos_entrega, calculado en la carga)
+    "minutos_n":       ("COUNT(hv.minutos_entrega)",                   None),
+    "minutos_prom":    ("AVG(hv.minutos_entrega)::numeric(10,1)",      None),
+    "minutos_mediana": ("percentile_cont(0.5) WITHIN GROUP (ORDER BY hv.minutos_entrega)",  None),
+    "minutos_p90":     ("percentile_cont(0.9) WITHIN GROUP (ORDER BY hv.minutos_entrega)",  None),
+    "minutos_p95":     ("percentile_cont(0.95) WITHIN GROUP (ORDER BY hv.minutos_entrega)", None),
+    "minutos_min":     ("MIN(hv.minutos_entrega)",                     None),
+    "minutos_max":     ("MAX(hv.minutos_entrega)",                     None),
+}
+
+# Columna que filtra cada criterio sobre hechos_ventas
+FILTER_COLS = {
+    "years":      "df.ano",
+    "months":     "df.mes",
+    "ciudades":   "dt.ciudad",
+    "categorias": "dp.categoria",
+    "metodos":    "dpg.metodo_pago",
+    "fecha":      "hv.fecha_key",
+}
+
+# Filtros por atributo resueltos a claves del hecho: filtro -> (columna, parámetro).
+# "fechas" reemplaza a years + months.
+KEY_COLS = {
+    "ciudades":   ("hv.tienda_key",   "tienda_keys"),
+    "categorias": ("hv.producto_key", "producto_keys"),
+    "metodos":    ("hv.pago_key",     "pago_keys"),
+    "fechas":     ("hv.fecha_key",    "fecha_keys"),
+}
+
+# Atributo que exige cada filtro (para decidir si un rollup puede responder)
+FILTER_ATTRS = {
+    "years": "ano", "months": "mes", "ciudades": "ciudad", "categorias": "categoria",
+    "metodos": "metodo_pago", "date_from": "fecha", "date_to": "fecha",
+}
+
+# Los rollups exponen los atributos con el mismo nombre (alias r)
+ROLLUP_COLS = {k: f"r.{v.split('.')[1]}" for k, v in FILTER_COLS.items()}
 
-def where_and_params(years, months, ciudades, categorias, metodos, date_from=None, date_to=None):
+def fecha_key(d) -> int:
+    """Clave AAAAMMDD de dim_fecha para una fecha (date o 'YYYY-MM-DD')."""
+    if isinstance(d, str):
+        d = date.fromisoformat(d[:10])
+    return d.year * 10000 + d.month * 100 + d.day
+
+def where_and_params(years, months, ciudades, categorias, metodos, date_from=None, date_to=None, cols=None,
+                     keys=None):
     # Nota: dejamos years/months por compatibilidad (puedes retirarlos luego si no los usas)
+    # cols permite sobreescribir columnas (p. ej. para consultar un rollup)
+    # keys = {filtro: [claves]} (dimindex.resolve): esos filtros van contra KEY_COLS
+    c = {**FILTER_COLS, **(cols or {})}
+    keys = keys or {}
     where, params = [], {}
-    if years:      where.append("df.ano = ANY(:years)");              params["years"] = years
-    if months:     where.append("df.mes = ANY(:months)");             params["months"] = months
-    if ciudades:   where.append("dt.ciudad = ANY(:ciudades)");        params["ciudades"] = ciudades
-    if categorias: where.append("dp.categoria = ANY(:categorias)");   params["categorias"] = categorias
-    if metodos:    where.append("dpg.metodo_pago = ANY(:metodos)");   params["metodos"]  = metodos
-    if date_from:  where.append("df.fecha >= :date_from");            params["date_from"] = date_from
-    if date_to:    where.append("df.fecha <= :date_to");              params["date_to"]   = date_to
+    for name, value in (("fechas", None), ("years", years), ("months", months), ("ciudades", ciudades),
+                        ("categorias", categorias), ("metodos", metodos)):
+        if name in keys:
+            col, p = KEY_COLS[name]
+            where.append(f"{col} = ANY(:{p})"); params[p] = keys[name]
+        elif value and not (name in ("years", "months") and "fechas" in keys):
+            where.append(f"{c[name]} = ANY(:{name})"); params[name] = value
+    if date_from:  where.append(f"{c['fecha']} >= :date_from");           params["date_from"] = fecha_key(date_from)
+    if date_to:    where.append(f"{c['fecha']} <= :date_to");             params["date_to"]   = fecha_key(date_to)
     return ("WHERE " + " AND ".join(where)) if where else "", params
 
-SQL = {
-    "trend": """
-        SELECT df.ano, df.mes,
-               SUM(hv.total_pago)::numeric(14,2) AS ingreso_total,
-               SUM(hv.cantidad)                  AS cantidad_total,
-               COUNT(*)                           AS transacciones
-        FROM hechos_ventas hv
-        JOIN dim_fecha df   ON hv.fecha_key   = df.fecha_key
-        JOIN dim_tienda dt  ON hv.tienda_key  = dt.tienda_key
-        JOIN dim_producto dp ON hv.producto_key = dp.producto_key
-        JOIN dim_pago dpg   ON hv.pago_key    = dpg.pago_key
-        {where}
-        GROUP BY df.ano, df.mes
-        ORDER BY df.ano, df.mes;
-    """,
-    "top_products": """
-        SELECT dp.categoria, dp.nombre_producto,
-               SUM(hv.cantidad)                  AS unidades,
-               SUM(hv.total_pago)::numeric(14,2) AS ingreso
-        FROM hechos_ventas hv
-        JOIN dim_producto dp ON hv.producto_key = dp.producto_key
-        JOIN dim_fecha df    ON hv.fecha_key    = df.fecha_key
-        JOIN dim_tienda dt   ON hv.tienda_key   = dt.tienda_key
-        JOIN dim_pago dpg    ON hv.pago_key     = dpg.pago_key
-        {where}
-        GROUP BY dp.categoria, dp.nombre_producto
-        ORDER BY ingreso DESC
-        LIMIT :limit;
-    """,
-    "city_store": """
-        SELECT dt.ciudad, dt.nombre_tienda,
-               SUM(hv.total_pago)::numeric(14,2) AS ingreso,
-               SUM(hv.cantidad)                  AS unidades
-        FROM hechos_ventas hv
-        JOIN dim_tienda dt ON hv.tienda_key = dt.tienda_key
-        JOIN dim_fecha  df ON hv.fecha_key  = df.fecha_key
-        JOIN dim_producto dp ON hv.producto_key = dp.producto_key
-        JOIN dim_pago dpg ON hv.pago_key = dpg.pago_key
-        {where}
-        GROUP BY dt.ciudad, dt.nombre_tienda
-        ORDER BY dt.ciudad, ingreso DESC;
-    """,
-    "pay_mix": """
-        SELECT dpg.metodo_pago,
-               SUM(hv.total_pago)::numeric(14,2) AS ingreso,
-               COUNT(*) AS transacciones
-        FROM hechos_ventas hv
-        JOIN dim_pago dpg ON hv.pago_key = dpg.pago_key
-        JOIN dim_fecha df ON hv.fecha_key = df.fecha_key
-        JOIN dim_tienda dt ON hv.tienda_key = dt.tienda_key
-        JOIN dim_producto dp ON hv.producto_key = dp.producto_key
-        {where}
-        GROUP BY dpg.metodo_pago
-        ORDER BY ingreso DESC;
-    """,
-    "delivery_status": """
-        SELECT hv.estado_entrega,
-               COUNT(*) AS entregas,
-               SUM(hv.total_pago)::numeric(14,2) AS ingreso
-        FROM hechos_ventas hv
-        JOIN dim_fecha df ON hv.fecha_key = df.fecha_key
-        JOIN dim_tienda dt ON hv.tienda_key = dt.tienda_key
-        JOIN dim_producto dp ON hv.producto_key = dp.producto_key
-        JOIN dim_pago dpg ON hv.pago_key = dpg.pago_key
-        {where}
-        GROUP BY hv.estado_entrega
-        ORDER BY entregas DESC;
-    """,
-    "top_clients": """
-        SELECT dc.nombre_cliente, dc.ciudad,
-               COUNT(*) AS pedidos,
-               SUM(hv.total_pago)::numeric(14,2) AS ingreso
-        FROM hechos_ventas hv
-        JOIN dim_cliente dc ON hv.cliente_key = dc.cliente_key
-        JOIN dim_fecha df   ON hv.fecha_key   = df.fecha_key
-        JOIN dim_tienda dt  ON hv.tienda_key  = dt.tienda_key
-        JOIN dim_producto dp ON hv.producto_key = dp.producto_key
-        JOIN dim_pago dpg   ON hv.pago_key    = dpg.pago_key
-        {where}
-        GROUP BY dc.nombre_cliente, dc.ciudad
-        ORDER BY ingreso DESC
-        LIMIT :limit;
-    """,
-    "top_couriers": """
-        SELECT dr.nombre_repartidor, dr.zona, dr.placa_moto,
-               COUNT(*) AS entregas,
-               SUM(hv.total_pago)::numeric(14,2) AS ingreso
-        FROM hechos_ventas hv
-        JOIN dim_repartidor dr ON hv.repartidor_key = dr.repartidor_key
-        JOIN dim_fecha df   ON hv.fecha_key   = df.fecha_key
-        JOIN dim_tienda dt  ON hv.tienda_key  = dt.tienda_key
-        JOIN dim_producto dp ON hv.producto_key = dp.producto_key
-        JOIN dim_pago dpg   ON hv.pago_key    = dpg.pago_key
-        {where}
-        GROUP BY dr.nombre_repartidor, dr.zona, dr.placa_moto
-        ORDER BY entregas DESC, ingreso DESC
-        LIMIT :limit;
-    """,
-    "clients_by_city": """
-        SELECT dc.ciudad,
-               COUNT(DISTINCT dc.cliente_key) as clientes_unicos,
-               SUM(hv.total_pago)::numeric(14,2) as ingreso
-        FROM hechos_ventas hv
-        JOIN dim_cliente dc ON hv.cliente_key = dc.cliente_key
-        JOIN dim_fecha df   ON hv.fecha_key   = df.fecha_key
-        JOIN dim_tienda dt  ON hv.tienda_key  = dt.tienda_key
-        JOIN dim_producto dp ON hv.producto_key = dp.producto_key
-        JOIN dim_pago dpg   ON hv.pago_key    = dpg.pago_key
-        {where}
-        GROUP BY dc.ciudad
-        ORDER BY ingreso DESC;
-    """,
+def _filters_where(filters: dict, cols=None, keys=None):
+    return where_and_params(
+        filters.get("years"),      # opcional
+        filters.get("months"),     # opcional
+        filters.get("ciudades"),
+        filters.get("categorias"),
+        filters.get("metodos"),
+        filters.get("date_from"),
+        filters.get("date_to"),
+        cols=cols,
+        keys=keys,
+    )
+
+# ---------------------------------------------------------------------------
+# Catálogo: dims = [(atributo, nombre de salida)], measures = [(medida, nombre de salida)]
+# Opcionales: order, limit, where (condiciones extra), sets (GROUPING SETS),
+# left (alias con LEFT JOIN), timeout_ms (statement_timeout propio de la consulta),
+# fetch ("arrow" para traer el resultado vía COPY -> Arrow, ver src/transport.py),
+# export_only (solo para src/export.py: ni paneles ni benchmark)
+# ---------------------------------------------------------------------------
+QUERIES = {
+    "trend": {
+        "dims": [("ano", "ano"), ("mes", "mes")],
+        "measures": [("ingreso", "ingreso_total"), ("unidades", "cantidad_total"), ("transacciones", "transacciones")],
+        "order": "ano, mes",
+    },
+    # La misma tendencia por día y por semana (periodo = inicio del intervalo; ver src/timeseries.py)
+    "trend_dia": {
+        "dims": [("fecha", "periodo")],
+        "measures": [("ingreso", "ingreso_total"), ("unidades", "cantidad_total"), ("transacciones", "transacciones")],
+        "order": "periodo",
+    },
+    "trend_semana": {
+        "dims": [("semana", "periodo")],
+        "measures": [("ingreso", "ingreso_total"), ("unidades", "cantidad_total"), ("transacciones", "transacciones")],
+        "order": "periodo",
+    },
+    "top_products": {
+        "dims": [("categoria", "categoria"), ("nombre_producto", "nombre_producto")],
+        "measures": [("unidades", "unidades"), ("ingreso", "ingreso")],
+        "order": "ingreso DESC",
+        "limit": True,
+    },
+    "city_store": {
+        "dims": [("ciudad", "ciudad"), ("nombre_tienda", "nombre_tienda")],
+        "measures": [("ingreso", "ingreso"), ("unidades", "unidades")],
+        "order": "ciudad, ingreso DESC",
+        "fetch": "arrow",  # una fila por tienda: el resultado más grande del tablero
+    },
+    "pay_mix": {
+        "dims": [("metodo_pago", "metodo_pago")],
+        "measures": [("ingreso", "ingreso"), ("transacciones", "transacciones")],
+        "order": "ingreso DESC",
+    },
+    "delivery_status": {
+        "dims": [("estado_entrega", "estado_entrega")],
+        "measures": [("transacciones", "entregas"), ("ingreso", "ingreso")],
+        "order": "entregas DESC",
+    },
+    "top_clients": {
+        "dims": [("nombre_cliente", "nombre_cliente"), ("ciudad_cliente", "ciudad")],
+        "measures": [("transacciones", "pedidos"), ("ingreso", "ingreso")],
+        "order": "ingreso DESC",
+        "limit": True,
+    },
+    "top_couriers": {
+        "dims": [("nombre_repartidor", "nombre_repartidor"), ("zona", "zona"), ("placa_moto", "placa_moto")],
+        "measures": [("transacciones", "entregas"), ("ingreso", "ingreso")],
+        "order": "entregas DESC, ingreso DESC",
+        "limit": True,
+    },
+    "clients_by_city": {
+        "dims": [("ciudad_cliente", "ciudad")],
+        "measures": [("clientes_unicos", "clientes_unicos"), ("ingreso", "ingreso")],
+        "order": "ingreso DESC",
+    },
+    # Tiempos de entrega: solo valores válidos (entrega posterior al pedido)
+    "delivery_minutes": {
+        "dims": [("minutos_entrega", "m")],
+        "measures": [],
+        "where": ["hv.minutos_entrega >= 0"],
+    },
+    # Detalle sin agregar para exportar (src/export.py); sin LIMIT ni orden: se transmite tal cual
+    "raw_facts": {
+        "dims": [("fecha", "fecha"), ("id_pedido", "id_pedido"), ("ciudad", "ciudad"),
+                 ("nombre_tienda", "tienda"), ("categoria", "categoria"), ("nombre_producto", "producto"),
+                 ("cantidad", "cantidad"), ("precio_unitario", "precio_unitario"), ("subtotal", "subtotal"),
+                 ("total_pago", "total_pago"), ("metodo_pago", "metodo_pago"), ("nombre_cliente", "cliente"),
+                 ("nombre_repartidor", "repartidor"), ("estado_entrega", "estado_entrega"),
+                 ("minutos_entrega", "minutos_entrega")],
+        "measures": [],
+        "left": {"dc", "dr"},
+        "export_only": True,
+    },
+    "delivery_minutes_stats": {
+        "dims": [],
+        "measures": [("minutos_n", "entregas"), ("minutos_prom", "promedio"), ("minutos_mediana", "mediana"),
+                     ("minutos_p90", "p90"), ("minutos_p95", "p95"), ("minutos_min", "minimo"),
+                     ("minutos_max", "maximo")],
+        "where": ["hv.minutos_entrega >= 0"],
+    },
+}
+
+def _alias(expr: str) -> str:
+    # Primer "alias.columna" de la expresión (también dentro de funciones: date_trunc(..., df.fecha))
+    return re.search(r"\b(\w+)\.\w", expr).group(1)
+
+def rollup_needs(key: str, filters: dict) -> set | None:
+    """Atributos que un rollup debe tener para responder key con filters (None = no apto)."""
+    q = QUERIES[key]
+    if not q["measures"] or any(MEASURES[m][1] is None for m, _ in q["measures"]):
+        return None
+    needs = {DERIVED.get(a, a) for a, _ in q["dims"]}
+    return needs | {FILTER_ATTRS[k] for k, v in filters.items() if v and k in FILTER_ATTRS}
+
+def build_sql(key: str, filters: dict, table: str | None = None, keys: dict | None = None,
+              limit: bool = True) -> tuple[str, dict]:
+    """
+    SQL + parámetros para QUERIES[key]. Con table se consulta ese rollup en vez
+    del hecho; con keys (dimindex.resolve) los filtros por atributo van por clave.
+    limit=False omite el "LIMIT :limit" de las consultas que lo llevan (exportaciones).
+    """
+    q = QUERIES[key]
+    if table:
+        where_sql, params = _filters_where(filters, cols=ROLLUP_COLS)
+        dims = [(ROLLUP_ATTRS.get(a, f"r.{a}"), out) for a, out in q["dims"]]
+        measures = [(MEASURES[m][1], out) for m, out in q["measures"]]
+        source = f"{table} r"
+    else:
+        where_sql, params = _filters_where(filters, keys=keys)
+        dims = [(ATTRS[a], out) for a, out in q["dims"]]
+        measures = [(MEASURES[m][0], out) for m, out in q["measures"]]
+        used = {_alias(e) for e, _ in dims} | {_alias(c) for c in FILTER_COLS.values() if c in where_sql}
+        left = q.get("left", set())
+        joins = [
+            f"{'LEFT JOIN' if a in left else 'JOIN'} {tbl} {a} ON {on}"
+            for a, (tbl, on) in JOINS.items() if a in used
+        ]
+        source = "\n        ".join(["hechos_ventas hv"] + joins)
+        # Unión omitida: la condición que imponía el JOIN interno queda como filtro
+        pruned = " AND ".join(f"{k} IS NOT NULL" for a, k in INNER_KEYS.items() if a not in used)
+        if pruned:
+            where_sql = f"{where_sql} AND {pruned}" if where_sql else f"WHERE {pruned}"
+
+    if q.get("sets"):
+        # Identifica el conjunto de agrupación de cada fila
+        measures = [("GROUPING(" + ", ".join(e for e, _ in dims) + ")", "grupo")] + measures
+    select = ",\n               ".join(
+        [f"{e} AS {out}" for e, out in dims] + [f"{e} AS {out}" for e, out in measures]
+    )
+    if q.get("where"):
+        extra = " AND ".join(q["where"])
+        where_sql = f"{where_sql} AND {extra}" if where_sql else f"WHERE {extra}"
+    parts = [f"SELECT {select}", f"FROM {source}", where_sql]
+    if q.get("sets"):
+        sets = ", ".join("(" + ", ".join(ATTRS[a] for a in s) + ")" for s in q["sets"])
+        parts.append(f"GROUP BY GROUPING SETS ({sets})")
+    elif q["measures"] and dims:
+        parts.append("GROUP BY " + ", ".join(e for e, _ in dims))
+    if q.get("order"):
+        parts.append(f"ORDER BY {q['order']}")
+    if q.get("limit") and limit:
+        parts.append("LIMIT :limit")
+    return "\n        ".join(p for p in parts if p) + ";", params
+
+def build_hist_sql(key: str, filters: dict, bins: int, keys: dict | None = None) -> tuple[str, dict]:
+    """Histograma en el servidor de la columna m de QUERIES[key]: bins de igual ancho entre min y max."""
+    inner, params = build_sql(key, filters, keys=keys)
+    sql = f"""
+        WITH base AS (
+        {inner.rstrip(";")}
+        ),
+        lim AS (SELECT MIN(m) AS lo, GREATEST(MAX(m) - MIN(m), 1)::numeric AS ancho FROM base)
+        SELECT x.bin,
+               (x.lo + x.bin * x.ancho / :bins)::numeric(10,1)       AS desde,
+               (x.lo + (x.bin + 1) * x.ancho / :bins)::numeric(10,1) AS hasta,
+               COUNT(*)                                               AS entregas
+        FROM (
+            SELECT LEAST(FLOOR((b.m - l.lo) * :bins / l.ancho)::int, :bins - 1) AS bin, l.lo, l.ancho
+            FROM base b CROSS JOIN lim l
+        ) x
+        GROUP BY x.bin, x.lo, x.ancho
+        ORDER BY x.bin;
+    """
+    return sql, {**params, "bins": bins}
+
+def build_top_k_sql(key: str, filters: dict, group: str, label: str, value: str,
+                    table: str | None = None, keys: dict | None = None) -> tuple[str, dict]:
+    """
+    Top-K de label dentro de cada group (por value) sobre el resultado de QUERIES[key];
+    el resto de cada grupo se suma en una fila "Otros". Columnas extra: n (filas
+    sumadas) y otros. K va en el parámetro :top_k.
+    """
+    inner, params = build_sql(key, filters, table, keys)
+    sums = ",\n               ".join(f"SUM({out}) AS {out}" for _, out in QUERIES[key]["measures"])
+    sql = f"""
+        WITH base AS (
+        {inner.rstrip(";")}
+        ),
+        rk AS (
+            SELECT b.*, LEAST(ROW_NUMBER() OVER (PARTITION BY {group} ORDER BY {value} DESC, {label}),
+                              :top_k + 1) AS rn
+            FROM base b
+        )
+        SELECT {group},
+               COALESCE(MIN(CASE WHEN rn <= :top_k THEN {label} END), 'Otros') AS {label},
+               {sums},
+               COUNT(*) AS n,
+               rn > :top_k AS otros
+        FROM rk
+        GROUP BY {group}, rn
+        ORDER BY {group}, otros, {value} DESC;
+    """
+    return sql, params
+
+# ---------------------------------------------------------------------------
+# Cubo: una sola pasada sobre hechos_ventas con GROUPING SETS.
+# Cada panel es un conjunto de agrupación; la columna "grupo" (GROUPING(...))
+# identifica a qué conjunto pertenece cada fila. Cliente y repartidor van con
+# LEFT JOIN para no perder ventas sin entrega en los demás paneles.
+# ---------------------------------------------------------------------------
+CUBE_COLUMNS = [
+    "ano", "mes", "ciudad", "nombre_tienda", "categoria", "nombre_producto", "metodo_pago",
+    "estado_entrega", "nombre_cliente", "ciudad_cliente", "nombre_repartidor", "zona", "placa_moto",
+]
+
+# Paneles que en su SQL original usan JOIN interno con dim_cliente/dim_repartidor
+CUBE_INNER = {"top_clients", "top_couriers", "clients_by_city"}
+
+CUBE_SETS = {
+    "trend":           ("ano", "mes"),
+    "top_products":    ("categoria", "nombre_producto"),
+    "city_store":      ("ciudad", "nombre_tienda"),
+    "pay_mix":         ("metodo_pago",),
+    "delivery_status": ("estado_entrega",),
+    "top_clients":     ("nombre_cliente", "ciudad_cliente"),
+    "top_couriers":    ("nombre_repartidor", "zona", "placa_moto"),
+    "clients_by_city": ("ciudad_cliente",),
+}
+
+def cube_mask(cols) -> int:
+    """Valor de GROUPING(<todas las columnas>) para un conjunto: bit a 1 = columna no agrupada."""
+    n = len(CUBE_COLUMNS)
+    return sum(1 << (n - 1 - i) for i, c in enumerate(CUBE_COLUMNS) if c not in cols)
+
+QUERIES["cube"] = {
+    "dims": [(c, c) for c in CUBE_COLUMNS],
+    "measures": [("ingreso", "ingreso"), ("unidades", "unidades"),
+                 ("transacciones", "transacciones"), ("clientes_unicos", "clientes_unicos")],
+    "sets": list(CUBE_SETS.values()),
+    "left": {"dc", "dr"},
+    # Recorre todo el hecho una vez para todos los paneles: más margen que el global
+    "timeout_ms": 120_000,
+    "fetch": "arrow",
 }
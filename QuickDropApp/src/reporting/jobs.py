@@ -0,0 +1,135 @@
+# src/reporting/jobs.py
+"""
+Cola local de reportes PDF.
+
+Los reportes se construyen en un pool de procesos fuera de la ejecución del
+script de Streamlit. Cada trabajo se identifica por (filtros normalizados,
+generación de carga), así que pedir dos veces el mismo reporte, desde la misma
+u otra sesión, reutiliza el trabajo en curso o el PDF ya generado.
+
+Estado en disco (QD_JOBS_DIR): <id>.json con estado/progreso y <id>.pdf con el resultado.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+JOBS_DIR = Path(os.getenv("QD_JOBS_DIR", Path(tempfile.gettempdir()) / "quickdrop_jobs"))
+REPORT_WORKERS = int(os.getenv("QD_REPORT_WORKERS", "2"))
+# Un trabajo "en curso" sin novedades en este tiempo se da por perdido (worker caído)
+STALE_SECS = int(os.getenv("QD_JOB_STALE_SECS", "600"))
+# Antigüedad a partir de la cual se borran reportes viejos
+KEEP_SECS = int(os.getenv("QD_JOB_KEEP_SECS", str(24 * 3600)))
+
+PENDING = ("en_cola", "ejecutando")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=REPORT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def _status_path(job_id):
+    return JOBS_DIR / f"{job_id}.json"
+
+def _pdf_path(job_id):
+    return JOBS_DIR / f"{job_id}.pdf"
+
+def _write_atomic(path: Path, data: bytes):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+def _save_status(job_id: str, **fields):
+    info = status(job_id) or {"id": job_id, "creado": time.time()}
+    info.update(fields, actualizado=time.time())
+    _write_atomic(_status_path(job_id), json.dumps(info, default=str).encode("utf-8"))
+
+def job_id(filters: dict) -> str:
+    from src.cache import canonical_filters, load_generation
+    raw = json.dumps([canonical_filters(filters), load_generation()], default=str, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:20]
+
+def status(job_id: str) -> dict | None:
+    try:
+        return json.loads(_status_path(job_id).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+def result(job_id: str) -> bytes | None:
+    try:
+        return _pdf_path(job_id).read_bytes()
+    except OSError:
+        return None
+
+def _run_job(job_id: str, filters: dict):
+    # Corre en el proceso worker: el import pesado (ReportLab, kaleido) ocurre aquí
+    try:
+        _save_status(job_id, estado="ejecutando", progreso=0.0, etapa="Iniciando")
+        from src.reporting.pdf import build_dashboard_pdf
+        pdf = build_dashboard_pdf(
+            filters, progress=lambda frac, etapa: _save_status(job_id, progreso=frac, etapa=etapa)
+        )
+        _write_atomic(_pdf_path(job_id), pdf)
+        _save_status(job_id, estado="listo", progreso=1.0, etapa="Listo")
+    except Exception as e:
+        _save_status(job_id, estado="error", error=str(e))
+
+def _prune():
+    limit = time.time() - KEEP_SECS
+    for p in JOBS_DIR.glob("*.*"):
+        try:
+            if p.stat().st_mtime < limit:
+                p.unlink()
+        except OSError:
+            pass
+
+def submit(filters: dict) -> str:
+    """Encola el reporte para filters (o reutiliza uno en curso/terminado) y devuelve su id."""
+    from src.cache import canonical_filters
+
+    JOBS_DIR.mkdir(parents=True, exist_ok=True)
+    jid = job_id(filters)
+    info = status(jid)
+    if info:
+        fresh = time.time() - info.get("actualizado", 0) < STALE_SECS
+        if info["estado"] == "listo" and _pdf_path(jid).exists():
+            return jid
+        if info["estado"] in PENDING and fresh:
+            return jid
+    # Reclamo exclusivo: si dos sesiones piden a la vez, solo una encola
+    claim = JOBS_DIR / f"{jid}.claim"
+    for _ in range(3):
+        try:
+            fd = os.open(claim, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.close(fd)
+            break
+        except FileExistsError:
+            try:
+                edad = time.time() - claim.stat().st_mtime
+            except FileNotFoundError:
+                continue  # otro proceso lo soltó entre el open y el stat: se reintenta
+            if edad < STALE_SECS:
+                return jid
+            claim.touch()
+            break
+    else:
+        return jid  # el reclamo cambia de manos sin parar: alguien más está encolando
+    try:
+        _save_status(jid, estado="en_cola", progreso=0.0, etapa="En cola", error=None)
+        _executor().submit(_run_job, jid, canonical_filters(filters))
+    finally:
+        claim.unlink(missing_ok=True)
+    _prune()
+    return jid
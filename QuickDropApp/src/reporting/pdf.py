@@ -12,8 +12,11 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
 
-from src.services import trend, city_store, top_products
-from src.ui.components.charts import line_ingreso_por_mes, bar_unidades_por_mes, treemap_city_store_numbers_on_deep
+from src.timeseries import downsample, grain_for, rebucket
+from src.services import trend, city_store_top_k, top_products
+from src.reporting.render import render_images
+from src.ui.components.charts import (line_ingreso_por_mes, bar_unidades_por_mes,
+                                      treemap_city_store_numbers_on_deep, TREEMAP_TOP_K)
 
 TZ = ZoneInfo("America/Guayaquil")
 
@@ -56,11 +59,10 @@ def _df_to_table(df: pd.DataFrame, max_rows: int = 15):
     ]))
     return tbl
 
-def _fig_png(fig, scale: int = 2, width_cm: float | None = None):
-    """Convierte un fig de Plotly a Image de ReportLab."""
-    if fig is None:
+def _png_image(png_bytes: bytes | None, width_cm: float | None = None):
+    """Convierte bytes PNG (ver render_images) a Image de ReportLab."""
+    if png_bytes is None:
         return None
-    png_bytes = fig.to_image(format="png", scale=scale)
     bio = io.BytesIO(png_bytes)
     img = Image(bio)
     if width_cm:
@@ -68,17 +70,21 @@ def _fig_png(fig, scale: int = 2, width_cm: float | None = None):
         img.drawHeight = img.imageHeight * (img.drawWidth / img.imageWidth)
     return img
 
-def build_dashboard_pdf(filters: dict) -> bytes:
+def build_dashboard_pdf(filters: dict, progress=None) -> bytes:
     """
     Genera un PDF (bytes) con:
       - Encabezado con fecha + filtros
       - KPIs (Ingreso, Unidades, Transacciones, Ticket)
       - Gráficos: línea, barras, treemap
       - Tabla: Top productos
+    progress(fracción, etapa) se llama al avanzar (lo usa la cola de src/reporting/jobs.py).
     """
+    report = progress or (lambda frac, etapa: None)
+
     # ------- Datos -------
+    report(0.1, "Consultando datos")
     df_trend = trend(filters)
-    df_ct = city_store(filters)
+    df_ct = city_store_top_k(filters, TREEMAP_TOP_K)  # ya plegado por ciudad: figura acotada para kaleido
     df_top = top_products(filters, n=10)
 
     total_ingreso  = float(df_trend["ingreso_total"].sum()) if not df_trend.empty else 0.0
@@ -87,15 +93,21 @@ def build_dashboard_pdf(filters: dict) -> bytes:
     ticket         = (total_ingreso / total_unidades) if total_unidades else 0.0
 
     # ------- Figuras -------
-    fig_line = line_ingreso_por_mes(df_trend)
-    fig_bar  = bar_unidades_por_mes(df_trend)
+    report(0.4, "Generando gráficos")
+    grano = grain_for(filters.get("date_from"), filters.get("date_to"))
+    df_plot = downsample(df_trend, "ingreso_total")
+    fig_line = line_ingreso_por_mes(df_plot, grano)
+    fig_bar  = bar_unidades_por_mes(rebucket(df_trend, ["cantidad_total"]), grano)
     fig_tree = treemap_city_store_numbers_on_deep(df_ct)
 
-    img_line = _fig_png(fig_line, scale=2, width_cm=17)
-    img_bar  = _fig_png(fig_bar,  scale=2, width_cm=17)
-    img_tree = _fig_png(fig_tree, scale=2, width_cm=17)
+    # Las tres en paralelo; las ya renderizadas con los mismos datos salen de caché
+    png_line, png_bar, png_tree = render_images([fig_line, fig_bar, fig_tree], scale=2)
+    img_line = _png_image(png_line, width_cm=17)
+    img_bar  = _png_image(png_bar,  width_cm=17)
+    img_tree = _png_image(png_tree, width_cm=17)
 
     # ------- Documento -------
+    report(0.8, "Armando documento")
     buf = io.BytesIO()
     doc = SimpleDocTemplate(
         buf,
@@ -0,0 +1,78 @@
+# src/reporting/render.py
+"""
+Rasterización de figuras Plotly a PNG para el PDF.
+
+- Las figuras se renderizan en paralelo en un pool de procesos reutilizable:
+  cada worker mantiene vivo su kaleido/Chromium entre reportes.
+- El pool vive dentro de cada worker de reportes (src/reporting/jobs.py), así
+  que QD_RENDER_WORKERS es el total del host: cada uno de los
+  QD_REPORT_WORKERS procesos arranca su parte (al menos 1 renderizador).
+- Los PNG se cachean (src/cache.store) con clave = hash del JSON de la figura,
+  así que un reporte con los mismos datos no vuelve a pasar por kaleido.
+"""
+from __future__ import annotations
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+RENDER_WORKERS = int(os.getenv("QD_RENDER_WORKERS", "3"))
+
+def pool_size() -> int:
+    """Renderizadores de este proceso: QD_RENDER_WORKERS repartido entre los workers de reportes."""
+    from src.reporting.jobs import REPORT_WORKERS
+    return max(1, RENDER_WORKERS // max(1, REPORT_WORKERS))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _init_worker():
+    # kaleido >= 1 puede dejar un navegador residente para todas las llamadas del proceso
+    try:
+        import kaleido
+        start = getattr(kaleido, "start_sync_server", None)
+        if start:
+            start(silence_warnings=True)
+    except Exception:
+        pass
+
+def _render(fig_json: str, scale: float, fmt: str) -> bytes:
+    import plotly.io as pio
+    return pio.to_image(pio.from_json(fig_json), format=fmt, scale=scale)
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: no heredar los hilos del servidor de Streamlit
+            _pool = ProcessPoolExecutor(
+                max_workers=pool_size(),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _pool
+
+def figure_key(fig_json: str, scale: float, fmt: str) -> str:
+    return hashlib.sha256(f"{fmt}|{scale}|{fig_json}".encode("utf-8")).hexdigest()
+
+def render_images(figs, scale: float = 2, fmt: str = "png") -> list[bytes | None]:
+    """Bytes de imagen para cada figura (None se mantiene). Los aciertos de caché no se renderizan."""
+    from src.cache import store
+
+    out: list[bytes | None] = [None] * len(figs)
+    pending = {}
+    for i, fig in enumerate(figs):
+        if fig is None:
+            continue
+        fig_json = fig.to_json()
+        key = figure_key(fig_json, scale, fmt)
+        hit = store().get(key)
+        if hit is not None:
+            out[i] = hit
+        else:
+            pending[i] = (key, _executor().submit(_render, fig_json, scale, fmt))
+    for i, (key, fut) in pending.items():
+        out[i] = fut.result()
+        store().put(key, out[i])
+    return out
@@ -0,0 +1,133 @@
+# src/rollups.py
+"""
+Tablas de agregados (rollups) sobre hechos_ventas.
+
+Uso (desde QuickDropApp/):
+    python -m src.rollups refresh            # crea o reconstruye todas
+    python -m src.rollups refresh agg_ventas_dia
+    python -m src.rollups status
+"""
+from __future__ import annotations
+import argparse
+import time
+from sqlalchemy import text
+from src.config import get_engine
+from src.cache import bump_generation, read_generation
+
+# Del grano más grueso al más fino. "attrs" = atributos con los que el rollup
+# puede filtrar/agrupar; el router de services elige el más pequeño que los cubra.
+ROLLUPS = {
+    "agg_ventas_dia": {
+        "attrs": {"fecha", "ano", "mes", "ciudad", "nombre_tienda", "categoria", "metodo_pago", "estado_entrega"},
+        "select": """
+            SELECT hv.fecha_key, df.fecha, df.ano, df.mes,
+                   hv.tienda_key, dt.ciudad, dt.nombre_tienda,
+                   dp.categoria, dpg.metodo_pago, hv.estado_entrega,
+                   SUM(hv.total_pago)::numeric(14,2) AS ingreso,
+                   SUM(hv.cantidad)::bigint          AS cantidad,
+                   COUNT(*)                          AS transacciones
+            FROM hechos_ventas hv
+            JOIN dim_fecha df    ON hv.fecha_key    = df.fecha_key
+            JOIN dim_tienda dt   ON hv.tienda_key   = dt.tienda_key
+            JOIN dim_producto dp ON hv.producto_key = dp.producto_key
+            JOIN dim_pago dpg    ON hv.pago_key     = dpg.pago_key
+            GROUP BY hv.fecha_key, df.fecha, df.ano, df.mes, hv.tienda_key, dt.ciudad,
+                     dt.nombre_tienda, dp.categoria, dpg.metodo_pago, hv.estado_entrega
+        """,
+        "indexes": ["(fecha)", "(ciudad)"],
+    },
+    "agg_ventas_mes": {
+        "attrs": {"ano", "mes", "ciudad", "categoria", "metodo_pago", "estado_entrega"},
+        # Se construye a partir del diario (mucho más barato que volver al hecho)
+        "select": """
+            SELECT ano, mes, ciudad, categoria, metodo_pago, estado_entrega,
+                   SUM(ingreso)::numeric(14,2) AS ingreso,
+                   SUM(cantidad)::bigint       AS cantidad,
+                   SUM(transacciones)::bigint  AS transacciones
+            FROM agg_ventas_dia
+            GROUP BY ano, mes, ciudad, categoria, metodo_pago, estado_entrega
+        """,
+        "indexes": ["(ano, mes)"],
+    },
+}
+
+META_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS agg_refresco (
+        tabla         VARCHAR(63) PRIMARY KEY,
+        filas         BIGINT,
+        refrescado_en TIMESTAMPTZ DEFAULT now()
+    )
+    """,
+    "ALTER TABLE agg_refresco ADD COLUMN IF NOT EXISTS generacion BIGINT",
+]
+
+def refresh_rollup(conn, name: str, generation: int) -> int:
+    """Reconstruye un rollup en una tabla nueva y la intercambia en la misma transacción."""
+    spec = ROLLUPS[name]
+    tmp = f"{name}__nuevo"
+    conn.execute(text(f"DROP TABLE IF EXISTS {tmp}"))
+    conn.execute(text(f"CREATE TABLE {tmp} AS {spec['select']}"))
+    for i, cols in enumerate(spec["indexes"]):
+        conn.execute(text(f"CREATE INDEX {tmp}_ix{i} ON {tmp} {cols}"))
+    conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+    conn.execute(text(f"ALTER TABLE {tmp} RENAME TO {name}"))
+    for i, _ in enumerate(spec["indexes"]):
+        conn.execute(text(f"ALTER INDEX {tmp}_ix{i} RENAME TO {name}_ix{i}"))
+    conn.execute(text(f"ANALYZE {name}"))
+    filas = conn.execute(text(f"SELECT COUNT(*) FROM {name}")).scalar_one()
+    conn.execute(text("""
+        INSERT INTO agg_refresco (tabla, filas, generacion, refrescado_en) VALUES (:t, :f, :g, now())
+        ON CONFLICT (tabla) DO UPDATE
+        SET filas = EXCLUDED.filas, generacion = EXCLUDED.generacion, refrescado_en = EXCLUDED.refrescado_en
+    """), {"t": name, "f": filas, "g": generation})
+    return filas
+
+def refresh_all(names=None) -> dict:
+    names = [n for n in ROLLUPS if n in names] if names else list(ROLLUPS)
+    out = {}
+    with get_engine().begin() as conn:
+        for ddl in META_DDL:
+            conn.execute(text(ddl))
+        # Generación nueva: los rollups quedan marcados con ella y las cachés se renuevan.
+        # Los que no se reconstruyen pero estaban al día siguen válidos.
+        prev = read_generation(conn)
+        gen = bump_generation(conn)
+        conn.execute(text("UPDATE agg_refresco SET generacion = :g WHERE generacion = :p"), {"g": gen, "p": prev})
+        for name in names:  # el orden del dict respeta dependencias (mes sale de dia)
+            t0 = time.perf_counter()
+            out[name] = (refresh_rollup(conn, name, gen), time.perf_counter() - t0)
+    return out
+
+def available_rollups() -> list[str]:
+    """
+    Rollups al día, del más pequeño al más grande (según filas). Un rollup construido
+    en una generación anterior a la actual (hubo carga después) no se usa.
+    """
+    with get_engine().connect() as conn:
+        if conn.execute(text("SELECT to_regclass('agg_refresco')")).scalar_one() is None:
+            return []
+        rows = conn.execute(
+            text("SELECT tabla FROM agg_refresco WHERE COALESCE(generacion, 0) = :g ORDER BY filas"),
+            {"g": read_generation(conn)},
+        ).scalars().all()
+    return [r for r in rows if r in ROLLUPS]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Rollups de hechos_ventas")
+    ap.add_argument("accion", choices=["refresh", "status"])
+    ap.add_argument("tablas", nargs="*", help=f"por defecto todas: {', '.join(ROLLUPS)}")
+    args = ap.parse_args(argv)
+    desconocidas = set(args.tablas) - set(ROLLUPS)
+    if desconocidas:
+        ap.error(f"rollup desconocido: {', '.join(sorted(desconocidas))}")
+    if args.accion == "refresh":
+        for name, (filas, secs) in refresh_all(args.tablas or None).items():
+            print(f"{name}: {filas:,} filas en {secs:.1f}s")
+    else:
+        with get_engine().connect() as conn:
+            for row in conn.execute(text("SELECT tabla, filas, refrescado_en FROM agg_refresco ORDER BY filas")):
+                print(f"{row.tabla}: {row.filas:,} filas (refrescado {row.refrescado_en:%Y-%m-%d %H:%M})")
+
+if __name__ == "__main__":
+    main()
@@ -1,73 +1,250 @@
 # src/services.py
 from __future__ import annotations
-import re
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-import streamlit as st
 from sqlalchemy import text
-from src.config import get_engine
-from src.queries import where_and_params, SQL
-
-engine = get_engine()
-
-def _apply_filters(filters):
-    # Compat con antiguos keys years/months; ahora enfocamos en rango real:
-    return where_and_params(
-        filters.get("years"),      # opcional
-        filters.get("months"),     # opcional
-        filters.get("ciudades"),
-        filters.get("categorias"),
-        filters.get("metodos"),
-        filters.get("date_from"),
-        filters.get("date_to"),
-    )
-
-def _run(sql_key: str, filters: dict, extra_params: dict | None = None):
-    where_sql, params = _apply_filters(filters)
-    sql = SQL[sql_key].format(where=where_sql)
+from src import dimindex, duck, metrics
+from src.config import get_engine, statement_timeout
+from src.cache import cached
+from src.transport import read_sql_arrow
+from src.queries import (QUERIES, build_sql, build_hist_sql, build_top_k_sql, rollup_needs,
+                         CUBE_SETS, CUBE_INNER, cube_mask)
+from src.rollups import ROLLUPS, available_rollups
+from src.timeseries import grain_for, with_period
+
+log = logging.getLogger(__name__)
+
+# Modo cubo: una sola consulta (GROUPING SETS) por juego de filtros alimenta todos los paneles
+CUBE_MODE = os.getenv("QD_CUBE_MODE", "0") == "1"
+# Router de rollups: se puede apagar para comparar contra el hecho base
+ROLLUPS_ENABLED = os.getenv("QD_ROLLUPS", "1") == "1"
+# Hilos para prefetch(); conviene que no supere el tamaño del pool de conexiones
+PREFETCH_WORKERS = int(os.getenv("QD_PREFETCH_WORKERS", "4"))
+# Transporte por defecto: "pandas" (pd.read_sql) o "arrow" (COPY -> Arrow); cada
+# consulta puede fijar el suyo con "fetch" en QUERIES
+FETCH_DEFAULT = os.getenv("QD_FETCH", "pandas")
+
+# Cómo se deriva cada panel del cubo: columnas (origen, salida), orden y si admite LIMIT
+CUBE_PANELS = {
+    "trend": {
+        "cols": [("ano", "ano"), ("mes", "mes"), ("ingreso", "ingreso_total"),
+                 ("unidades", "cantidad_total"), ("transacciones", "transacciones")],
+        "sort": [("ano", True), ("mes", True)],
+    },
+    "top_products": {
+        "cols": [("categoria", "categoria"), ("nombre_producto", "nombre_producto"),
+                 ("unidades", "unidades"), ("ingreso", "ingreso")],
+        "sort": [("ingreso", False)],
+    },
+    "city_store": {
+        "cols": [("ciudad", "ciudad"), ("nombre_tienda", "nombre_tienda"),
+                 ("ingreso", "ingreso"), ("unidades", "unidades")],
+        "sort": [("ciudad", True), ("ingreso", False)],
+    },
+    "pay_mix": {
+        "cols": [("metodo_pago", "metodo_pago"), ("ingreso", "ingreso"), ("transacciones", "transacciones")],
+        "sort": [("ingreso", False)],
+    },
+    "delivery_status": {
+        "cols": [("estado_entrega", "estado_entrega"), ("transacciones", "entregas"), ("ingreso", "ingreso")],
+        "sort": [("entregas", False)],
+    },
+    "top_clients": {
+        "cols": [("nombre_cliente", "nombre_cliente"), ("ciudad_cliente", "ciudad"),
+                 ("transacciones", "pedidos"), ("ingreso", "ingreso")],
+        "sort": [("ingreso", False)],
+    },
+    "top_couriers": {
+        "cols": [("nombre_repartidor", "nombre_repartidor"), ("zona", "zona"), ("placa_moto", "placa_moto"),
+                 ("transacciones", "entregas"), ("ingreso", "ingreso")],
+        "sort": [("entregas", False), ("ingreso", False)],
+    },
+    "clients_by_city": {
+        "cols": [("ciudad_cliente", "ciudad"), ("clientes_unicos", "clientes_unicos"), ("ingreso", "ingreso")],
+        "sort": [("ingreso", False)],
+    },
+}
+
+@cached
+def _rollups():
+    # Sin try: un error no se cachea y la próxima consulta vuelve a intentar (ver _route)
+    return available_rollups()
+
+def _route(sql_key: str, filters: dict) -> str | None:
+    """Rollup más pequeño capaz de responder la consulta con estos filtros (None = hecho base)."""
+    # El snapshot de DuckDB no trae rollups
+    needs = rollup_needs(sql_key, filters) if ROLLUPS_ENABLED and not duck.ENABLED else None
+    if needs is None:
+        return None
+    try:
+        rollups = _rollups()
+    except Exception:
+        # Falla transitoria: esta consulta va al hecho base, sin apagar el ruteo de la generación
+        log.warning("no se pudo leer los rollups disponibles; se consulta el hecho", exc_info=True)
+        return None
+    for name in rollups:
+        if needs <= ROLLUPS[name]["attrs"]:
+            return name
+    return None
+
+def _query(sql: str, params: dict, timeout_ms: int | None = None, fetch: str | None = None,
+           key: str = "sql", filters: dict | None = None, table: str | None = None):
+    fetch = "duckdb" if duck.ENABLED else fetch or FETCH_DEFAULT
+    with metrics.query_scope(key, filters, tabla=table, transporte=fetch) as ev:
+        if duck.ENABLED:
+            df = duck.query(sql, params)
+            ev["filas"] = len(df)
+            return df
+        t0 = time.perf_counter()
+        with get_engine().connect() as conn:  # el engine se crea con la primera consulta
+            metrics.add_pool_wait((time.perf_counter() - t0) * 1000)
+            statement_timeout(conn, timeout_ms)
+            if fetch == "arrow":
+                df = read_sql_arrow(conn, sql, params)
+            else:
+                df = pd.read_sql(text(sql), conn, params=params)
+        ev["filas"] = len(df)
+        if ev["bytes"] is None:
+            ev["bytes"] = int(df.memory_usage(index=False).sum())
+        return df
+
+def _run(sql_key: str, filters: dict, extra_params: dict | None = None, fetch: str | None = None):
+    q = QUERIES[sql_key]
+    table = _route(sql_key, filters)
+    # Los rollups guardan los atributos; el hecho se filtra por clave
+    keys = None if table else dimindex.safe_resolve(filters)
+    sql, params = build_sql(sql_key, filters, table, keys)
     if extra_params:
         params = {**params, **extra_params}
-    with engine.connect() as conn:
-        return pd.read_sql(text(sql), conn, params=params)
-    
-@st.cache_data(ttl=300)
-def trend(filters):                return _run("trend", filters)
-@st.cache_data(ttl=300)
-def top_products(filters, n=10):   return _run("top_products", filters, {"limit": n})
-@st.cache_data(ttl=300)
-def city_store(filters):           return _run("city_store", filters)
-@st.cache_data(ttl=300)
-def pay_mix(filters):              return _run("pay_mix", filters)
-@st.cache_data(ttl=300)
-def delivery_status(filters):      return _run("delivery_status", filters)
-@st.cache_data(ttl=300)
-def top_clients(filters, n=15):    return _run("top_clients", filters, {"limit": n})
-@st.cache_data(ttl=300)
-def top_couriers(filters, n=20):   return _run("top_couriers", filters, {"limit": n})
-@st.cache_data(ttl=300)
-def clients_by_city(filters):      return _run("clients_by_city", filters)
-
-@st.cache_data(ttl=300)
-def parse_delivery_minutes(filters):
-    # Si luego quieres consultar directo, crea una SQL específica. Aquí reuso city_store() solo para filtros.
-    where_sql, params = where_and_params(
-        filters.get("years"), filters.get("months"),
-        filters.get("ciudades"), filters.get("categorias"), filters.get("metodos")
-    )
-    sql = f"""
-    SELECT hv.tiempo_entrega
-    FROM hechos_ventas hv
-    JOIN dim_fecha df ON hv.fecha_key = df.fecha_key
-    JOIN dim_tienda dt ON hv.tienda_key = dt.tienda_key
-    JOIN dim_producto dp ON hv.producto_key = dp.producto_key
-    JOIN dim_pago dpg ON hv.pago_key = dpg.pago_key
-    {where_sql}
+    return _query(sql, params, q.get("timeout_ms"), fetch or q.get("fetch"),
+                  key=sql_key, filters=filters, table=table)
+
+@cached
+def cube(filters):
+    """Resultado agrupado (GROUPING SETS) con todos los paneles para un juego de filtros."""
+    return _run("cube", filters)
+
+# Columnas enteras por definición (agrupación y conteos) tal como salen de CUBE_PANELS;
+# las medidas (ingreso) quedan float64 aunque justo vengan sin decimales
+INT_COLUMNS = {"grupo", "ano", "mes", "unidades", "cantidad_total", "transacciones",
+               "entregas", "pedidos", "clientes_unicos"}
+
+def _int_columns(df):
+    """Columnas de INT_COLUMNS en float64 sin nulos -> int64."""
+    for c in INT_COLUMNS.intersection(df.columns):
+        if df[c].dtype == "float64" and df[c].notna().all():
+            df[c] = df[c].astype("int64")
+    return df
+
+def _from_cube(sql_key: str, filters: dict, limit: int | None = None):
+    spec = CUBE_PANELS[sql_key]
+    df = cube(filters)
+    part = df[df["grupo"] == cube_mask(CUBE_SETS[sql_key])]
+    if sql_key in CUBE_INNER:
+        # Equivale al JOIN interno: fuera el grupo de ventas sin cliente/repartidor
+        part = part.dropna(subset=list(CUBE_SETS[sql_key]), how="all")
+    part = part[[src for src, _ in spec["cols"]]].rename(columns=dict(spec["cols"]))
+    # Las columnas de agrupación vienen con NULL en los demás conjuntos -> recuperamos enteros
+    part = _int_columns(part)
+    by, asc = zip(*spec["sort"])
+    part = part.sort_values(list(by), ascending=list(asc), kind="stable")
+    if limit is not None:
+        part = part.head(limit)
+    return part.reset_index(drop=True)
+
+def _panel(sql_key: str, filters: dict, limit: int | None = None):
+    if CUBE_MODE:
+        return _from_cube(sql_key, filters, limit)
+    return _run(sql_key, filters, {"limit": limit} if limit is not None else None)
+
+@cached
+def trend(filters, grano=None):
+    """
+    Tendencia por día, semana o mes (None = según el rango de fechas, ver
+    timeseries.grain_for). Siempre trae "periodo" (inicio del intervalo).
+    """
+    grano = grano or grain_for(filters.get("date_from"), filters.get("date_to"))
+    # El cubo solo agrupa por mes; día y semana van siempre como consulta propia
+    df = _panel("trend", filters) if grano == "mes" else _run(f"trend_{grano}", filters)
+    return with_period(df)
+
+@cached
+def top_products(filters, n=10):   return _panel("top_products", filters, n)
+@cached
+def city_store(filters):           return _panel("city_store", filters)
+
+@cached
+def city_store_top_k(filters, k=12):
+    """
+    city_store con las k tiendas de mayor ingreso por ciudad y el resto sumado en
+    una fila "Otros" por ciudad (columnas extra: n, otros). Se pliega en el servidor:
+    el tamaño del resultado no depende de la cantidad de tiendas.
+    """
+    if CUBE_MODE:
+        return city_store(filters)  # el cubo ya trae todas las tiendas; el gráfico pliega en pandas
+    table = _route("city_store", filters)
+    keys = None if table else dimindex.safe_resolve(filters)
+    sql, params = build_top_k_sql("city_store", filters, "ciudad", "nombre_tienda", "ingreso", table, keys)
+    # Mismo transporte que city_store (arrow): numeric llega como float64, no como Decimal
+    q = QUERIES["city_store"]
+    df = _query(sql, {**params, "top_k": k}, q.get("timeout_ms"), q.get("fetch"),
+                key="city_store_top_k", filters=filters, table=table)
+    # SUM sobre la suma por tienda vuelve como numeric (float64)
+    df["unidades"] = df["unidades"].fillna(0).astype("int64")
+    return df
+
+@cached
+def pay_mix(filters):              return _panel("pay_mix", filters)
+@cached
+def delivery_status(filters):      return _panel("delivery_status", filters)
+@cached
+def top_clients(filters, n=15):    return _panel("top_clients", filters, n)
+@cached
+def top_couriers(filters, n=20):   return _panel("top_couriers", filters, n)
+@cached
+def clients_by_city(filters):      return _panel("clients_by_city", filters)
+
+# Tiempos de entrega: histograma y estadísticos se calculan en la base (pocas filas de vuelta)
+@cached
+def delivery_minutes_hist(filters, bins=30):
+    sql, params = build_hist_sql("delivery_minutes", filters, bins, dimindex.safe_resolve(filters))
+    return _query(sql, params, key="delivery_minutes_hist", filters=filters)
+
+@cached
+def delivery_minutes_stats(filters):
+    return _run("delivery_minutes_stats", filters)
+
+# ---------------------------------------------------------------------------
+# Carga concurrente de paneles
+# ---------------------------------------------------------------------------
+_executor = None
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="qd-prefetch")
+    return _executor
+
+def _with_ctx(ctx, fn, args):
+    # Los hilos del pool heredan el contexto de la sesión de Streamlit (si lo hay)
+    if ctx is not None:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx
+        add_script_run_ctx(threading.current_thread(), ctx)
+    return fn(*args)
+
+def prefetch(calls: dict) -> dict:
+    """
+    Ejecuta en paralelo calls = {nombre: (función, *args)} y devuelve {nombre: resultado}.
+    La latencia de la pestaña pasa a ser la de la consulta más lenta, no la suma.
     """
-    with engine.connect() as conn:
-        df = pd.read_sql(text(sql), conn, params=params)
-    mins = []
-    for v in df["tiempo_entrega"].dropna().astype(str):
-        m = re.search(r"(\d+)", v)
-        if m:
-            try: mins.append(int(m.group(1)))
-            except: pass
-    return pd.Series(mins, name="minutos")
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+    except ImportError:
+        ctx = None
+    futures = {name: _pool().submit(_with_ctx, ctx, fn, args) for name, (fn, *args) in calls.items()}
+    return {name: f.result() for name, f in futures.items()}
@@ -0,0 +1,78 @@
+# src/timeseries.py
+"""
+Series de tiempo de la tendencia: granularidad automática según el rango de
+fechas y reducción de puntos con LTTB (largest-triangle-three-buckets) para
+que los gráficos nunca reciban más de MAX_POINTS puntos. LTTB descarta filas,
+así que sirve para líneas; las barras de cantidades se suman por tramos
+(rebucket) para que sigan cuadrando con el total.
+"""
+from __future__ import annotations
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+GRAINS = ("dia", "semana", "mes")
+GRAIN_LABELS = {"dia": "día", "semana": "semana", "mes": "mes"}
+MAX_POINTS = int(os.getenv("QD_TREND_MAX_POINTS", "400"))
+# Rango máximo (días) para cada granularidad automática
+AUTO_DAYS = {"dia": 62, "semana": 366}
+
+def grain_for(date_from: date | None, date_to: date | None) -> str:
+    """Granularidad para un rango: día hasta ~2 meses, semana hasta un año, si no mes."""
+    if not date_from or not date_to:
+        return "mes"
+    dias = (pd.Timestamp(date_to) - pd.Timestamp(date_from)).days + 1
+    for grain, limite in AUTO_DAYS.items():
+        if dias <= limite:
+            return grain
+    return "mes"
+
+def with_period(df: pd.DataFrame) -> pd.DataFrame:
+    """Agrega "periodo" (inicio del intervalo, datetime64) si la serie viene por ano/mes."""
+    if "periodo" in df.columns:
+        return df.assign(periodo=pd.to_datetime(df["periodo"]))
+    return df.assign(periodo=pd.to_datetime(pd.DataFrame({"year": df["ano"], "month": df["mes"], "day": 1})))
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """Índices de los n puntos que conserva LTTB (siempre el primero y el último)."""
+    size = len(x)
+    if n >= size or n < 3:
+        return np.arange(size)
+    every = (size - 2) / (n - 2)
+    idx = np.empty(n, dtype=np.int64)
+    idx[0], idx[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+        # Promedio del bucket siguiente (el último punto para el último bucket)
+        nlo, nhi = hi, min(int((i + 2) * every) + 1, size)
+        if nlo >= nhi:
+            nlo, nhi = size - 1, size
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        # Punto del bucket que forma el triángulo de mayor área con el elegido antes y ese promedio
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        idx[i + 1] = a
+    return idx
+
+def downsample(df: pd.DataFrame, y: str, n: int = MAX_POINTS, x: str = "periodo") -> pd.DataFrame:
+    """Filas de df (ordenado por x) que conserva LTTB sobre la columna y."""
+    if len(df) <= n:
+        return df
+    d = df.sort_values(x, kind="stable")
+    xs = pd.to_datetime(d[x]).to_numpy("datetime64[ns]").astype(np.int64).astype(float)
+    ys = d[y].astype(float).fillna(0).to_numpy()
+    return d.iloc[lttb_indices(xs, ys, n)].reset_index(drop=True)
+
+def rebucket(df: pd.DataFrame, y: list[str], n: int = MAX_POINTS, x: str = "periodo") -> pd.DataFrame:
+    """
+    df (ordenado por x) en a lo sumo n tramos de filas consecutivas: suma las
+    columnas y y toma la primera fila del tramo en las demás (x = inicio del tramo).
+    """
+    if len(df) <= n:
+        return df
+    d = df.sort_values(x, kind="stable").reset_index(drop=True)
+    tramo = np.arange(len(d)) // -(-len(d) // n)
+    return d.groupby(tramo).agg({c: "sum" if c in y else "first" for c in d.columns}).reset_index(drop=True)
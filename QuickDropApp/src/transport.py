@@ -0,0 +1,75 @@
+# src/transport.py
+"""
+Lectura de resultados vía COPY -> Arrow.
+
+pd.read_sql arma un objeto Python por celda (Decimal para cada numeric).
+Aquí el servidor serializa el resultado con COPY ... TO STDOUT (CSV) y el
+lector multihilo de Arrow lo convierte directo a columnas: numéricos como
+float64/int64 y textos como string respaldado por Arrow.
+
+Los tipos no se adivinan del CSV: salen de la descripción del resultado
+(SELECT ... LIMIT 0, una vez por SQL), así un texto como "00123" o "2024-01"
+sigue siendo texto.
+"""
+from __future__ import annotations
+import io
+import time
+
+import pandas as pd
+from sqlalchemy import text
+from src import metrics
+
+# OID de Postgres -> tipo Arrow; el resto (texto incluido) va como string.
+# Enteros siempre int64, como los devuelve pd.read_sql
+_OIDS = {16: "bool_", 20: "int64", 21: "int64", 23: "int64", 700: "float64", 701: "float64",
+         1082: "date32"}
+_types_cache: dict[str, dict] = {}
+
+def arrow_types(cur, sql: str, params: dict, decimal: bool = False) -> dict:
+    """
+    {columna: tipo Arrow} del resultado de sql (sin traer filas). numeric va
+    como float64, o como decimal128(p, s) con decimal=True (exportaciones).
+    """
+    import pyarrow as pa
+    cur.execute(f"SELECT * FROM ({sql}) q LIMIT 0", params)
+    out = {}
+    for c in cur.description:
+        if c.type_code == 1700:  # numeric
+            out[c.name] = pa.decimal128(c.precision, c.scale or 0) if decimal and c.precision else pa.float64()
+        elif c.type_code in (1114, 1184):
+            out[c.name] = pa.timestamp("us", tz="UTC" if c.type_code == 1184 else None)
+        else:
+            out[c.name] = getattr(pa, _OIDS[c.type_code])() if c.type_code in _OIDS else pa.string()
+    return out
+
+def _types_mapper(t):
+    import pyarrow as pa
+    if pa.types.is_string(t) or pa.types.is_large_string(t):
+        return pd.StringDtype("pyarrow")
+    return None  # numéricos/fechas -> dtypes numpy (float64, int64, datetime64)
+
+def read_sql_arrow(conn, sql: str, params: dict) -> pd.DataFrame:
+    """Como pd.read_sql(text(sql), conn, params) pero vía COPY + Arrow."""
+    compiled = text(sql.strip().rstrip(";")).compile(dialect=conn.dialect)
+    # COPY no admite parámetros del lado servidor: psycopg los enlaza en el cliente
+    copy_sql = f"COPY ({compiled.string}) TO STDOUT (FORMAT CSV, HEADER)"
+    buf = io.BytesIO()
+    t0 = time.perf_counter()
+    with conn.connection.driver_connection.cursor() as cur:
+        bound = compiled.construct_params(params)
+        types = _types_cache.get(compiled.string)
+        if types is None:
+            if len(_types_cache) > 512:
+                _types_cache.clear()
+            types = _types_cache[compiled.string] = arrow_types(cur, compiled.string, bound)
+        with cur.copy(copy_sql, bound) as copy:
+            for chunk in copy:
+                buf.write(chunk)
+    # El COPY no pasa por los hooks de cursor del engine: se informa aquí
+    metrics.add_db_time((time.perf_counter() - t0) * 1000, buf.tell())
+    buf.seek(0)
+    import pyarrow.csv as pacsv  # a pedido: pyarrow no entra en el arranque de la app
+    table = pacsv.read_csv(buf, convert_options=pacsv.ConvertOptions(
+        column_types=types, true_values=["t"], false_values=["f"],
+        strings_can_be_null=True, quoted_strings_can_be_null=False))
+    return table.to_pandas(types_mapper=_types_mapper, split_blocks=True, self_destruct=True)
@@ -1,59 +1,84 @@
 # src/ui/components/charts.py
-import plotly.graph_objects as go
-import plotly.express as px
+import os
+import numpy as np
+import pandas as pd
+from src.timeseries import GRAIN_LABELS, with_period
+from src.ui.theme import plotly_express
 
-def line_ingreso_por_mes(df):
-    if df.empty: 
+# Tiendas por ciudad en el treemap; el resto se agrupa en "Otros"
+TREEMAP_TOP_K = int(os.getenv("QD_TREEMAP_TOP_K", "12"))
+
+# df: serie de services.trend (ya reducida con timeseries.downsample); x = periodo
+def line_ingreso_por_mes(df, grano="mes"):
+    if df.empty:
         return None
-    d = df.copy()
-    d["anio_mes"] = d["ano"].astype(str) + "-" + d["mes"].astype(str)
-    fig = px.line(d, x="anio_mes", y="ingreso_total", markers=True, title="Ingreso total por mes")
+    d = with_period(df)
+    fig = plotly_express().line(d, x="periodo", y="ingreso_total", markers=len(d) <= 60,
+                  title=f"Ingreso total por {GRAIN_LABELS[grano]}")
     return fig
 
-def bar_unidades_por_mes(df):
+def bar_unidades_por_mes(df, grano="mes"):
     if df.empty:
         return None
-    d = df.copy()
-    d["anio_mes"] = d["ano"].astype(str) + "-" + d["mes"].astype(str)
-    fig = px.bar(d, x="anio_mes", y="cantidad_total", title="Unidades por mes")
+    d = with_period(df)
+    fig = plotly_express().bar(d, x="periodo", y="cantidad_total", title=f"Unidades por {GRAIN_LABELS[grano]}")
     return fig
 
-def treemap_city_store_numbers_on_deep(df_cs):
+def top_k_per_group(df, group, value, k, label="nombre_tienda", other="Otros"):
     """
-    df_cs: columnas ['ciudad','nombre_tienda','ingreso']
-    Muestra números solo cuando el nodo tiene parent != "" (o sea, tiendas y niveles profundos).
+    Conserva las k filas de mayor value en cada group y suma el resto en una fila
+    other por grupo (k=None: no pliega). Agrega n (filas sumadas) y otros (fila plegada); si df ya
+    viene plegado del servidor (services.city_store_top_k), sus "Otros" se respetan.
     """
-    if df_cs.empty: 
-        return None
-
-    # Preparamos nodos: ciudades (parents=""), tiendas (parent=ciudad)
-    cities = df_cs["ciudad"].dropna().unique().tolist()
-    labels, parents, values = [], [], []
+    d = df.dropna(subset=[group])
+    if "otros" not in d.columns:
+        d = d.assign(n=1, otros=False)
+    d = d.astype({"otros": bool})
+    rank = d.loc[~d["otros"]].groupby(group)[value].rank(method="first", ascending=False)
+    fold = d["otros"] | rank.reindex(d.index).gt(k) if k else d["otros"]
+    if not fold.any():
+        return d
+    nums = [c for c in d.select_dtypes("number").columns if c != group]
+    tail = d.loc[fold].groupby(group, as_index=False)[nums].sum()
+    tail[label], tail["otros"] = other, True
+    return pd.concat([d.loc[~fold], tail], ignore_index=True)
 
-    # Ciudades
-    for c in cities:
-        labels.append(c); parents.append(""); values.append(float(df_cs.loc[df_cs["ciudad"]==c, "ingreso"].sum()))
+def treemap_city_store_numbers_on_deep(df_cs, top_k=TREEMAP_TOP_K):
+    """
+    df_cs: columnas ['ciudad','nombre_tienda','ingreso'] (opcionalmente ya plegado: n, otros).
+    Ciudades en la raíz y, dentro de cada una, sus top_k tiendas + "Otros" (top_k=None: todas).
+    Muestra números solo en los nodos con parent != "" (tiendas).
+    """
+    if df_cs.empty:
+        return None
+    d = top_k_per_group(df_cs, "ciudad", "ingreso", top_k)
+    if d.empty:
+        return None
 
-    # Tiendas
-    for _, row in df_cs.iterrows():
-        labels.append(row["nombre_tienda"])
-        parents.append(row["ciudad"])
-        values.append(float(row["ingreso"]))
+    # Todo por columnas: totales por ciudad con groupby, etiquetas con operaciones vectorizadas
+    ciudad = d["ciudad"].astype(str)
+    tienda = d["nombre_tienda"].astype(str)
+    otros = d["otros"].to_numpy(dtype=bool)
+    ingreso = d["ingreso"].astype(float)
+    totales = ingreso.groupby(ciudad, sort=False).sum()
+    n_ciudades, n_nodos = len(totales), len(d)
 
-    # Texto condicional: solo números cuando parent != ""
-    text = []
-    for l, p, v in zip(labels, parents, values):
-        if p == "":  # ciudad (nivel raíz)
-            text.append(f"{l}")
-        else:        # tienda
-            text.append(f"{l}<br>${v:,.2f}")
+    ids = np.concatenate([totales.index.to_numpy(), (ciudad + np.where(otros, "/~", "/") + tienda).to_numpy()])
+    labels = np.concatenate([totales.index.to_numpy(),
+                             tienda.where(~otros, "Otros (" + d["n"].astype(str) + " tiendas)").to_numpy()])
+    parents = np.concatenate([np.full(n_ciudades, ""), ciudad.to_numpy()])
+    values = np.concatenate([totales.to_numpy(), ingreso.to_numpy()])
+    # El texto lo arma el navegador: ciudades solo con nombre, tiendas con nombre e ingreso
+    texttemplate = np.concatenate([np.full(n_ciudades, "%{label}"), np.full(n_nodos, "%{label}<br>$%{value:,.2f}")])
 
+    plotly_express()  # template de la app
+    import plotly.graph_objects as go
     fig = go.Figure(go.Treemap(
+        ids=ids,
         labels=labels,
         parents=parents,
         values=values,
-        text=text,              # texto ya resuelto por nodo
-        textinfo="text",        # usamos solo nuestro texto
+        texttemplate=texttemplate,
         hovertemplate="<b>%{label}</b><br>Ingreso: $%{value:,.2f}<extra></extra>",
         branchvalues="total"    # suma de hijos = valor del padre
     ))
@@ -1,10 +1,46 @@
 # src/ui/components/tables.py
-import io
+import html
+import os
 import streamlit as st
+from src import export
+from src.cache import canonical_filters
 
 def download_csv(df, filename, label):
-    if df is None or df.empty: 
+    # Solo para tablas chicas del tablero; lo grande va por download_export
+    if df is None or df.empty:
         return
-    buf = io.StringIO()
-    df.to_csv(buf, index=False)
-    st.download_button(label=label, data=buf.getvalue(), file_name=filename, mime="text/csv")
+    st.download_button(label=label, data=df.to_csv(index=False), file_name=filename, mime="text/csv")
+
+# Tope para entregar una exportación con st.download_button cuando no se puede
+# servir como archivo estático: el botón carga el archivo entero en memoria
+INLINE_MAX_MB = float(os.getenv("QD_EXPORT_INLINE_MAX_MB", "50"))
+
+def download_export(key, filters, filename, label, fmt="csv"):
+    """
+    Exportación completa en el servidor (src/export.py): la consulta se escribe a
+    disco por bloques y la descarga es un enlace al archivo estático, que el
+    servidor envía por bloques sin leerlo a memoria.
+    """
+    state = f"export_{key}_{fmt}"
+    filters = canonical_filters(filters)
+    if st.button(f"Preparar {label}", key=f"btn_{state}"):
+        with st.spinner("Exportando..."):
+            st.session_state[state] = (filters, export.export_query(key, filters, fmt))
+    prev = st.session_state.get(state)
+    if not prev or prev[0] != filters or not prev[1]["path"].exists():
+        return  # sin exportar, o exportado con otros filtros
+    info = prev[1]
+    mb = info["bytes"] / 2**20
+    nombre = filename + export.FORMATS[fmt]["ext"]
+    url = export.static_url(info["path"])
+    if url:
+        st.markdown(f'<a href="{url}" download="{html.escape(nombre)}">Descargar {label} ({mb:.1f} MB)</a>',
+                    unsafe_allow_html=True)
+    elif mb <= INLINE_MAX_MB:
+        with open(info["path"], "rb") as fh:
+            st.download_button(label=f"Descargar {label} ({mb:.1f} MB)", data=fh, file_name=nombre,
+                               mime=info["mime"], key=f"dl_{state}")
+    else:
+        # QD_EXPORT_DIR fuera de static/: no se sirve por el navegador algo tan grande
+        st.warning(f"La exportación pesa {mb:.1f} MB (más de {INLINE_MAX_MB:.0f} MB): "
+                   f"quedó en el servidor en {info['path']}.")
@@ -3,18 +3,32 @@ import streamlit as st
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
-from src.services import trend, top_products, city_store
+from src.services import trend, top_products, city_store, city_store_top_k, prefetch
 from src.ui.components.kpi import inject_css, kpi
-from src.ui.components.tables import download_csv
-from src.ui.components.charts import line_ingreso_por_mes, bar_unidades_por_mes, treemap_city_store_numbers_on_deep
-from src.reporting.pdf import build_dashboard_pdf
+from src.ui.components.tables import download_csv, download_export
+from src.ui.components.charts import (line_ingreso_por_mes, bar_unidades_por_mes,
+                                      treemap_city_store_numbers_on_deep, TREEMAP_TOP_K)
+from src.reporting import jobs
+from src.timeseries import GRAINS, GRAIN_LABELS, downsample, grain_for, rebucket
 
 TZ = ZoneInfo("America/Guayaquil")
 
+def panel_calls(filters: dict, state) -> dict:
+    """Consultas de la vista con los valores de sus widgets (src/warmup.py usa state={})."""
+    return {
+        "trend": (trend, filters, state.get("trend_grano")),
+        "city_store": (city_store, filters),
+        "treemap": (city_store_top_k, filters, state.get("treemapK", TREEMAP_TOP_K)),
+        "top": (top_products, filters, state.get("topN", 10)),
+    }
+
 def render_dashboard(filters: dict):
     inject_css()
 
-    df_trend = trend(filters)
+    # Las consultas de la vista salen juntas (el N del slider ya está en session_state);
+    # los fragmentos de abajo las encuentran en caché en un rerun completo
+    data = prefetch(panel_calls(filters, st.session_state))
+    df_trend = data["trend"]
     total_ingreso  = float(df_trend["ingreso_total"].sum()) if not df_trend.empty else 0.0
     total_unidades = int(df_trend["cantidad_total"].sum()) if not df_trend.empty else 0
     total_tx       = int(df_trend["transacciones"].sum())  if not df_trend.empty else 0
@@ -26,36 +40,89 @@ def render_dashboard(filters: dict):
     with c3: kpi(f"{total_tx:,}", "Transacciones")
     with c4: kpi(f"${ticket:,.2f}", "Ticket promedio")
 
+    _trend(filters)
+
+    st.subheader("Mapa de ingreso por Ciudad/Tienda")
+    df_ct = data["city_store"]
+    st.dataframe(df_ct, use_container_width=True)
+    download_csv(df_ct, "ingreso_ciudad_tienda.csv", "Descargar CSV (Ciudad/Tienda)")
+    _treemap(filters)
+
+    _top_products(filters)
+
+    st.divider()
+    _export(filters)
+
+    st.divider()
+    _pdf(filters)
+
+# Cada sección interactiva es un fragmento: sus widgets solo vuelven a ejecutar la sección
+@st.fragment
+def _trend(filters: dict):
+    auto = grain_for(filters.get("date_from"), filters.get("date_to"))
+    grano = st.selectbox(
+        "Granularidad", [None, *GRAINS], key="trend_grano",
+        format_func=lambda g: f"Automática ({GRAIN_LABELS[auto]})" if g is None else GRAIN_LABELS[g].capitalize(),
+    )
+    grano_efectivo = grano or auto
+    df_trend = trend(filters, grano)
+    # Rangos largos por día: los gráficos reciben a lo sumo MAX_POINTS puntos. La línea
+    # usa LTTB; las barras suman tramos para no perder unidades de los periodos descartados
+    df_plot = downsample(df_trend, "ingreso_total")
+    df_bar = rebucket(df_trend, ["cantidad_total"])
     colA, colB = st.columns((1.2, 1))
     with colA:
-        st.subheader("Tendencia mensual")
+        st.subheader(f"Tendencia por {GRAIN_LABELS[grano_efectivo]}")
         st.dataframe(df_trend, use_container_width=True)
-        fig1 = line_ingreso_por_mes(df_trend)
+        fig1 = line_ingreso_por_mes(df_plot, grano_efectivo)
         if fig1: st.plotly_chart(fig1, use_container_width=True)
     with colB:
-        fig2 = bar_unidades_por_mes(df_trend)
+        fig2 = bar_unidades_por_mes(df_bar, grano_efectivo)
         if fig2: st.plotly_chart(fig2, use_container_width=True)
+    if len(df_plot) < len(df_trend):
+        st.caption(f"Gráficos reducidos a {len(df_plot)} de {len(df_trend)} puntos "
+                   f"(línea con LTTB; barras sumadas en {len(df_bar)} tramos).")
 
-    st.subheader("Mapa de ingreso por Ciudad/Tienda")
-    df_ct = city_store(filters)
-    st.dataframe(df_ct, use_container_width=True)
-    download_csv(df_ct, "ingreso_ciudad_tienda.csv", "Descargar CSV (Ciudad/Tienda)")
-    fig = treemap_city_store_numbers_on_deep(df_ct)
+@st.fragment
+def _treemap(filters: dict):
+    k = st.slider("Tiendas por ciudad", 3, 50, TREEMAP_TOP_K, 1, key="treemapK")
+    fig = treemap_city_store_numbers_on_deep(city_store_top_k(filters, k), top_k=k)
     if fig: st.plotly_chart(fig, use_container_width=True)
 
+@st.fragment
+def _top_products(filters: dict):
     st.subheader("Top productos por ingreso")
     n = st.slider("N", 5, 50, 10, 5, key="topN")
-    df_top = top_products(filters, n=n)
+    df_top = top_products(filters, n)
     st.dataframe(df_top, use_container_width=True)
     download_csv(df_top, "top_productos.csv", "Descargar CSV (Top productos)")
 
-    # ---- Reporte PDF ----
-    st.divider()
+@st.fragment
+def _export(filters: dict):
+    st.subheader("Exportar ventas")
+    st.caption("Todas las ventas que cumplen los filtros actuales, a nivel de detalle de pedido.")
+    fmt = st.radio("Formato", ["csv", "parquet"], horizontal=True, key="export_fmt",
+                   format_func=lambda f: {"csv": "CSV (gzip)", "parquet": "Parquet"}[f])
+    download_export("raw_facts", filters, "ventas_quickdrop", "exportación de ventas", fmt)
+
+@st.fragment
+def _pdf(filters: dict):
     st.subheader("Reporte PDF")
     st.caption("Genera un PDF con los KPIs y gráficos mostrados, respetando los filtros actuales.")
     if st.button("📄 Generar PDF"):
-        try:
-            pdf_bytes = build_dashboard_pdf(filters)
+        jobs.submit(filters)
+    _pdf_job(jobs.job_id(filters))
+
+def _pdf_job(job_id: str):
+    # El reporte se arma en segundo plano; aquí solo se consulta su estado
+    info = jobs.status(job_id)
+    if not info:
+        return
+    if info["estado"] in jobs.PENDING:
+        _pdf_progress(job_id)
+    elif info["estado"] == "listo":
+        pdf_bytes = jobs.result(job_id)
+        if pdf_bytes:
             stamp = datetime.now(TZ).strftime("%Y%m%d_%H%M")
             st.download_button(
                 label="Descargar reporte PDF",
@@ -64,6 +131,16 @@ def render_dashboard(filters: dict):
                 mime="application/pdf"
             )
             st.success("Reporte generado.")
-        except Exception as e:
-            st.error(f"Ocurrió un error generando el PDF: {e}\n\n"
-                     "Verifica que 'kaleido' esté instalado correctamente.")
+    else:
+        st.error(f"Ocurrió un error generando el PDF: {info.get('error')}\n\n"
+                 "Verifica que 'kaleido' esté instalado correctamente.")
+
+@st.fragment(run_every=1)
+def _pdf_progress(job_id: str):
+    # Solo existe mientras el trabajo está pendiente: se vuelve a ejecutar cada segundo
+    # por su cuenta (sin bloquear el script) y, al terminar, una ejecución completa
+    # dibuja el resultado por el camino normal de _pdf_job
+    info = jobs.status(job_id)
+    if not info or info["estado"] not in jobs.PENDING:
+        st.rerun()
+    st.progress(float(info.get("progreso") or 0.0), text=info.get("etapa") or "En cola")
@@ -3,18 +3,29 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
+from src import duck
 from src.config import get_engine
+from src.cache import cached
 
 TZ = ZoneInfo("America/Guayaquil")
 
-@st.cache_data(ttl=300)
+FILTER_SQL = (
+    "SELECT tienda_key, nombre_tienda, ciudad FROM dim_tienda ORDER BY ciudad, nombre_tienda;",
+    "SELECT DISTINCT categoria FROM dim_producto ORDER BY categoria;",
+    "SELECT DISTINCT metodo_pago FROM dim_pago ORDER BY metodo_pago;",
+)
+
+@cached
 def _load_filters():
+    if duck.ENABLED:
+        return tuple(duck.query(sql, {}) for sql in FILTER_SQL)
     engine = get_engine()
     with engine.connect() as conn:
-        df_tienda= pd.read_sql("SELECT tienda_key, nombre_tienda, ciudad FROM dim_tienda ORDER BY ciudad, nombre_tienda;", conn)
-        df_prod  = pd.read_sql("SELECT DISTINCT categoria FROM dim_producto ORDER BY categoria;", conn)
-        df_pago  = pd.read_sql("SELECT DISTINCT metodo_pago FROM dim_pago ORDER BY metodo_pago;", conn)
-    return df_tienda, df_prod, df_pago
+        return tuple(pd.read_sql(sql, conn) for sql in FILTER_SQL)
+
+# Rangos predefinidos del selector (src/warmup.py los precalcula tras cada carga)
+PRESETS = ["Últimos 7 días", "Últimos 30 días", "Últimos 60 días", "Últimos 90 días", "Último año", "Personalizado"]
+DEFAULT_PRESET = 1
 
 def _preset_range(preset: str):
     today = datetime.now(TZ).date()
@@ -38,8 +49,8 @@ def render_filters():
     # Presets de fecha
     preset = st.sidebar.selectbox(
         "Rango de fechas",
-        ["Últimos 7 días", "Últimos 30 días", "Últimos 60 días", "Últimos 90 días", "Último año", "Personalizado"],
-        index=1
+        PRESETS,
+        index=DEFAULT_PRESET
     )
     date_from, date_to = _preset_range(preset)
     if preset == "Personalizado":
@@ -1,15 +1,26 @@
 # src/ui/operations.py
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-from src.services import delivery_status, pay_mix, parse_delivery_minutes
+from src.ui.theme import plotly_express
+from src.services import delivery_status, pay_mix, delivery_minutes_hist, delivery_minutes_stats, prefetch
 from src.ui.components.tables import download_csv
 
+def panel_calls(filters: dict, state) -> dict:
+    """Consultas de la vista con los valores de sus widgets (src/warmup.py usa state={})."""
+    return {
+        "delivery": (delivery_status, filters),
+        "pay": (pay_mix, filters),
+        "stats": (delivery_minutes_stats, filters),
+        "hist": (delivery_minutes_hist, filters, state.get("hist_bins", 30)),
+    }
+
 def render_operations(filters: dict):
+    # El fragmento del histograma encuentra sus consultas en caché en un rerun completo
+    data = prefetch(panel_calls(filters, st.session_state))
+    px = plotly_express()
     col1, col2 = st.columns(2)
     with col1:
         st.subheader("Estados de entrega")
-        df = delivery_status(filters)
+        df = data["delivery"]
         st.dataframe(df, use_container_width=True)
         download_csv(df, "estados_entrega.csv", "Descargar CSV")
         if not df.empty:
@@ -17,19 +28,31 @@ def render_operations(filters: dict):
             st.plotly_chart(fig, use_container_width=True)
     with col2:
         st.subheader("Métodos de pago")
-        df = pay_mix(filters)
+        df = data["pay"]
         st.dataframe(df, use_container_width=True)
         download_csv(df, "metodos_pago.csv", "Descargar CSV")
         if not df.empty:
             fig = px.pie(df, names="metodo_pago", values="ingreso", title="Participación por método de pago")
             st.plotly_chart(fig, use_container_width=True)
 
-    st.subheader("Tiempos de entrega (min, si se pueden inferir)")
-    serie = parse_delivery_minutes(filters)
-    if not serie.empty:
-        dfm = pd.DataFrame({"minutos": serie})
-        fig = px.histogram(dfm, x="minutos", nbins=30, title="Histograma de tiempos de entrega (min)")
+    _delivery_minutes(filters)
+
+@st.fragment
+def _delivery_minutes(filters: dict):
+    st.subheader("Tiempos de entrega (min)")
+    stats = delivery_minutes_stats(filters)
+    n = int(stats["entregas"].iloc[0]) if not stats.empty else 0
+    if n:
+        px = plotly_express()
+        bins = st.slider("Intervalos", 10, 100, 30, 10, key="hist_bins")
+        dfh = delivery_minutes_hist(filters, bins)
+        dfh["minutos"] = (dfh["desde"].astype(float) + dfh["hasta"].astype(float)) / 2
+        fig = px.bar(dfh, x="minutos", y="entregas", hover_data=["desde", "hasta"],
+                     title="Histograma de tiempos de entrega (min)")
+        fig.update_layout(bargap=0)
         st.plotly_chart(fig, use_container_width=True)
-        st.write(f"Promedio: **{serie.mean():.1f}** min, Mediana: **{serie.median():.1f}** min, N={len(serie)}")
+        row = stats.iloc[0]
+        st.write(f"Promedio: **{float(row['promedio']):.1f}** min, Mediana: **{float(row['mediana']):.1f}** min, "
+                 f"P90: **{float(row['p90']):.1f}** min, P95: **{float(row['p95']):.1f}** min, N={n}")
     else:
-        st.info("No se pudo inferir minutos desde `tiempo_entrega`. Considera guardarlo como entero.")
+        st.info("No hay tiempos de entrega (`minutos_entrega`) para los filtros actuales.")
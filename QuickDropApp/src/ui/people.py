@@ -1,31 +1,51 @@
 # src/ui/people.py
 import streamlit as st
-import plotly.express as px
-from src.services import top_clients, clients_by_city, top_couriers
+from src.ui.theme import plotly_express
+from src.services import top_clients, clients_by_city, top_couriers, prefetch
 from src.ui.components.tables import download_csv
 
+def panel_calls(filters: dict, state) -> dict:
+    """Consultas de la vista con los valores de sus widgets (src/warmup.py usa state={})."""
+    return {
+        "clients": (top_clients, filters, state.get("clientsN", 15)),
+        "by_city": (clients_by_city, filters),
+        "couriers": (top_couriers, filters, state.get("couriersN", 20)),
+    }
+
 def render_people(filters: dict):
+    # Los fragmentos encuentran sus consultas en caché en un rerun completo
+    data = prefetch(panel_calls(filters, st.session_state))
     st.subheader("Clientes")
     c1, c2 = st.columns(2)
     with c1:
-        df = top_clients(filters, n=15)
-        st.caption("Top 15 clientes por ingreso")
-        st.dataframe(df, use_container_width=True)
-        download_csv(df, "top_clientes.csv", "Descargar CSV")
+        _top_clients(filters)
     with c2:
-        df2 = clients_by_city(filters)
+        df2 = data["by_city"]
         st.caption("Clientes únicos e ingreso por ciudad")
         st.dataframe(df2, use_container_width=True)
         if not df2.empty:
-            fig = px.bar(df2, x="ciudad", y="clientes_unicos", title="Clientes únicos por ciudad")
+            fig = plotly_express().bar(df2, x="ciudad", y="clientes_unicos", title="Clientes únicos por ciudad")
             st.plotly_chart(fig, use_container_width=True)
 
+    _top_couriers(filters)
+
+@st.fragment
+def _top_clients(filters: dict):
+    n = st.slider("Clientes", 5, 50, 15, 5, key="clientsN")
+    df = top_clients(filters, n)
+    st.caption(f"Top {n} clientes por ingreso")
+    st.dataframe(df, use_container_width=True)
+    download_csv(df, "top_clientes.csv", "Descargar CSV")
+
+@st.fragment
+def _top_couriers(filters: dict):
     st.subheader("Repartidores")
-    df3 = top_couriers(filters, n=20)
+    n = st.slider("Repartidores", 5, 50, 20, 5, key="couriersN")
+    df3 = top_couriers(filters, n)
     st.dataframe(df3, use_container_width=True)
     download_csv(df3, "repartidores.csv", "Descargar CSV")
     if not df3.empty:
-        fig = px.bar(df3, x="nombre_repartidor", y="entregas",
-                     hover_data=["zona","placa_moto","ingreso"], title="Entregas por repartidor (Top 20)")
+        fig = plotly_express().bar(df3, x="nombre_repartidor", y="entregas",
+                     hover_data=["zona","placa_moto","ingreso"], title=f"Entregas por repartidor (Top {n})")
         fig.update_layout(xaxis_tickangle=-35, height=520)
         st.plotly_chart(fig, use_container_width=True)
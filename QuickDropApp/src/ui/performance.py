@@ -0,0 +1,38 @@
+# src/ui/performance.py
+import pandas as pd
+import streamlit as st
+from src.ui.theme import plotly_express
+from src import metrics
+
+def render_performance(_filters=None):  # misma firma que las demás vistas (no usa filtros)
+    events = metrics.snapshot()
+    st.caption(f"Últimos {len(events)} eventos de este proceso (ring buffer de {metrics.SIZE}).")
+    c1, c2 = st.columns([1, 1])
+    with c1:
+        st.download_button("Descargar métricas (Prometheus)", data=metrics.prometheus_text(),
+                           file_name="quickdrop_metrics.txt", mime="text/plain")
+    with c2:
+        if st.button("Vaciar"):
+            metrics.clear()
+            st.rerun()
+    if not events:
+        st.info("Aún no hay consultas registradas.")
+        return
+
+    st.subheader("Consultas por clave")
+    df = pd.DataFrame(metrics.query_summary(events))
+    if not df.empty:
+        st.dataframe(df, use_container_width=True)
+        fig = plotly_express().bar(df.melt(id_vars="clave", value_vars=["p50_ms", "p95_ms"], var_name="percentil", value_name="ms"),
+                     x="clave", y="ms", color="percentil", barmode="group", title="Latencia por consulta")
+        st.plotly_chart(fig, use_container_width=True)
+
+    st.subheader("Caché")
+    dc = pd.DataFrame(metrics.cache_summary(events))
+    if not dc.empty:
+        st.dataframe(dc, use_container_width=True)
+
+    st.subheader("Eventos recientes")
+    recent = pd.DataFrame(events[-200:][::-1])
+    recent["ts"] = pd.to_datetime(recent["ts"], unit="s")
+    st.dataframe(recent, use_container_width=True)
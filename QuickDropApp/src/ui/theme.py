@@ -1,7 +1,6 @@
 # src/ui/theme.py
 from __future__ import annotations
 import streamlit as st
-import plotly.io as pio
 
 PALETTE = {
     "yellow": "#F7C948",   # Primario
@@ -70,25 +69,36 @@ CSS = f"""
 </style>
 """
 
+# Plotly template (tipografía y colorway coherente)
+TEMPLATE = {
+    "layout": {
+        "font": {"family": "Inter, system-ui, Segoe UI, Roboto, sans-serif", "size": 13, "color": PALETTE["gray_900"]},
+        "paper_bgcolor": "rgba(0,0,0,0)",
+        "plot_bgcolor": "rgba(0,0,0,0)",
+        "margin": {"l": 30, "r": 20, "t": 40, "b": 30},
+        "colorway": [
+            PALETTE["yellow"], "#6B7280", "#F59E0B", "#9CA3AF",
+            "#FDE68A", "#4B5563", "#D1D5DB"
+        ],
+        "xaxis": {"gridcolor": PALETTE["gray_200"]},
+        "yaxis": {"gridcolor": PALETTE["gray_200"]},
+        "legend": {"bgcolor": "rgba(255,255,255,0.6)", "bordercolor": PALETTE["gray_200"], "borderwidth": 1}
+    }
+}
+
+_use_template = False  # lo activa la app; el proceso del PDF usa el template por defecto
+
 def apply_global_theme():
-    # Inyecta CSS
+    # Inyecta CSS; el template de Plotly se registra recién con el primer gráfico
+    global _use_template
     st.markdown(CSS, unsafe_allow_html=True)
+    _use_template = True
 
-    # Plotly template (tipografía y colorway coherente)
-    template = {
-        "layout": {
-            "font": {"family": "Inter, system-ui, Segoe UI, Roboto, sans-serif", "size": 13, "color": PALETTE["gray_900"]},
-            "paper_bgcolor": "rgba(0,0,0,0)",
-            "plot_bgcolor": "rgba(0,0,0,0)",
-            "margin": {"l": 30, "r": 20, "t": 40, "b": 30},
-            "colorway": [
-                PALETTE["yellow"], "#6B7280", "#F59E0B", "#9CA3AF",
-                "#FDE68A", "#4B5563", "#D1D5DB"
-            ],
-            "xaxis": {"gridcolor": PALETTE["gray_200"]},
-            "yaxis": {"gridcolor": PALETTE["gray_200"]},
-            "legend": {"bgcolor": "rgba(255,255,255,0.6)", "bordercolor": PALETTE["gray_200"], "borderwidth": 1}
-        }
-    }
-    pio.templates["quickdrop_yellow_gray"] = template
-    pio.templates.default = "quickdrop_yellow_gray"
+def plotly_express():
+    """plotly.express importado a pedido (no en el arranque), con el template de la app."""
+    import plotly.express as px
+    import plotly.io as pio
+    if _use_template and pio.templates.default != "quickdrop_yellow_gray":
+        pio.templates["quickdrop_yellow_gray"] = TEMPLATE
+        pio.templates.default = "quickdrop_yellow_gray"
+    return px
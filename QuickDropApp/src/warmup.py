@@ -0,0 +1,133 @@
+# src/warmup.py
+"""
+Precalentamiento de la caché para los rangos predefinidos del selector.
+
+Después de cada carga (nueva generación) el primer usuario pagaba las
+consultas completas de la vista por defecto. Aquí se calculan de antemano,
+con los mismos argumentos que usan las vistas al abrir (panel_calls de cada
+vista con los valores iniciales de sus widgets), así que caen en las mismas
+claves de src/cache.py:
+
+- las opciones de filtros (_load_filters) y el índice de dimensiones;
+- cada vista para cada rango de PRESETS sin filtros por atributo;
+- opcionalmente, lo mismo para cada una de las N ciudades con más ingreso.
+
+Con QD_WARMUP=1 la app arranca un hilo que repite el calentamiento al iniciar
+el proceso, cuando cambia la generación de carga y cuando cambia el día (los
+rangos son relativos a hoy). Con la caché en disco, los demás workers del host
+encuentran el resultado.
+
+Uso (desde QuickDropApp/):
+    python -m src.warmup                    # todas las vistas y rangos
+    python -m src.warmup --vista Dashboard --ciudades 5
+"""
+from __future__ import annotations
+import argparse
+import os
+import threading
+import time
+from datetime import datetime
+
+from src import dimindex
+from src.cache import GENERATION_POLL, canonical_filters, load_generation
+
+ENABLED = os.getenv("QD_WARMUP", "0") == "1"
+# Ciudades con más ingreso que también se precalculan (0 = ninguna)
+TOP_CITIES = int(os.getenv("QD_WARMUP_CITIES", "0"))
+
+def _views() -> dict:
+    from src.ui import dashboards, operations, people
+    return {
+        "Dashboard": dashboards.panel_calls,
+        "Operaciones": operations.panel_calls,
+        "Clientes & Repartidores": people.panel_calls,
+    }
+
+def preset_filters() -> list[dict]:
+    """Filtros que produce la barra lateral para cada rango predefinido, sin atributos."""
+    from src.ui.filters import PRESETS, DEFAULT_PRESET, _preset_range
+    out = []
+    # El rango por defecto primero: es el de la página de entrada
+    for preset in [PRESETS[DEFAULT_PRESET]] + [p for i, p in enumerate(PRESETS) if i != DEFAULT_PRESET]:
+        date_from, date_to = _preset_range(preset)
+        if date_from and date_to:  # "Personalizado" no tiene rango propio
+            out.append(canonical_filters({"date_from": date_from, "date_to": date_to}))
+    return out
+
+def top_cities(filters: dict, n: int) -> list[str]:
+    """Las n ciudades con más ingreso para los filtros (sale de city_store, ya en caché)."""
+    if n <= 0:
+        return []
+    from src.services import city_store
+    df = city_store(filters)
+    if df.empty:
+        return []
+    return df.groupby("ciudad")["ingreso"].sum().nlargest(n).index.tolist()
+
+def warm(views: list[str] | None = None, cities: int = TOP_CITIES) -> dict:
+    """Calcula y guarda en caché las vistas pedidas; devuelve un resumen."""
+    from src.services import prefetch
+    from src.ui.filters import _load_filters
+    t0 = time.perf_counter()
+    _load_filters()
+    if dimindex.ENABLED:
+        dimindex.load_index()
+    calls = _views()
+    views = views or list(calls)
+    presets = preset_filters()
+    # Las ciudades se eligen con el rango más amplio y se combinan con cada rango
+    amplio = max(presets, key=lambda f: f["date_to"] - f["date_from"], default=None)
+    nombres = top_cities(amplio, cities) if amplio else []
+    filters_list = presets + [{**f, "ciudades": [c]} for c in nombres for f in presets]
+    consultas = 0
+    for filters in filters_list:
+        for view in views:
+            panels = calls[view](filters, {})
+            prefetch(panels)
+            consultas += len(panels)
+    return {"generacion": load_generation(), "filtros": len(filters_list), "ciudades": nombres,
+            "consultas": consultas, "segundos": round(time.perf_counter() - t0, 1)}
+
+# ---------------------------------------------------------------------------
+# Hilo en segundo plano
+# ---------------------------------------------------------------------------
+_thread = None
+_thread_lock = threading.Lock()
+last: dict | None = None  # resumen del último calentamiento (o {"error": ...})
+
+def _loop(interval: float):
+    global last
+    from src.ui.filters import TZ
+    hecho = None
+    while True:
+        estado = (load_generation(), datetime.now(TZ).date())
+        if estado != hecho:
+            try:
+                last = warm()
+                hecho = estado
+            except Exception as e:  # sin base por ahora: se reintenta en la próxima vuelta
+                last = {"error": str(e)}
+        time.sleep(interval)
+
+def start(interval: float = GENERATION_POLL):
+    """Arranca (una vez por proceso) el hilo que recalienta tras cada carga y cada cambio de día."""
+    global _thread
+    with _thread_lock:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_loop, args=(interval,), name="qd-warmup", daemon=True)
+        _thread.start()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Precalienta la caché con los rangos predefinidos")
+    ap.add_argument("--vista", action="append", choices=list(_views()), help="vistas a calentar (todas por defecto)")
+    ap.add_argument("--ciudades", type=int, default=TOP_CITIES, help="también las N ciudades con más ingreso")
+    args = ap.parse_args(argv)
+    r = warm(args.vista, args.ciudades)
+    print(f"generación {r['generacion']}: {r['consultas']} consultas para {r['filtros']} juegos de filtros "
+          f"en {r['segundos']} s")
+    if r["ciudades"]:
+        print("  ciudades: " + ", ".join(r["ciudades"]))
+
+if __name__ == "__main__":
+    main()
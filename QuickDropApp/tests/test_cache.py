@@ -0,0 +1,55 @@
+# tests/test_cache.py
+from datetime import date, datetime
+
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("streamlit")
+from src import cache  # noqa: E402
+from src.cache import canonical_filters, make_key  # noqa: E402
+
+def test_canonical_filters_quita_vacios_y_ordena():
+    f = {"ciudades": ["Quito", "Loja", "Quito"], "categorias": [], "metodos": None,
+         "date_from": datetime(2024, 1, 1, 10, 30), "date_to": ""}
+    assert canonical_filters(f) == {"ciudades": ["Loja", "Quito"], "date_from": date(2024, 1, 1)}
+
+def test_canonical_filters_equivalentes():
+    a = canonical_filters({"ciudades": ("Loja", "Quito"), "metodos": []})
+    b = canonical_filters({"metodos": None, "ciudades": {"Quito", "Loja"}})
+    assert a == b
+    assert canonical_filters(None) == {}
+
+def top(filters, n=10):
+    return filters, n
+
+def test_make_key_normaliza_por_firma():
+    f = {"ciudades": ["Quito"]}
+    claves = {
+        make_key("top", (f, 10), {}, 1, top),
+        make_key("top", (f,), {"n": 10}, 1, top),
+        make_key("top", (f,), {}, 1, top),
+        make_key("top", (), {"filters": f, "n": 10}, 1, top),
+    }
+    assert len(claves) == 1
+    assert make_key("top", (f, 5), {}, 1, top) not in claves
+
+def test_make_key_depende_de_la_generacion_y_el_nombre():
+    f = {"date_from": date(2024, 1, 1)}
+    base = make_key("top", (f,), {}, 1, top)
+    assert make_key("top", (f,), {}, 2, top) != base
+    assert make_key("otro", (f,), {}, 1, top) != base
+    assert make_key("top", (f,), {}, 1, top) == base
+
+def test_cached_libera_el_candado_si_falla(monkeypatch):
+    monkeypatch.setattr(cache, "_store", cache.MemoryLRU(2**20))
+    monkeypatch.setattr(cache, "load_generation", lambda: 1)
+    monkeypatch.setattr(cache.metrics, "cache_event", lambda *a, **k: None)
+
+    @cache.cached
+    def falla(x):
+        raise RuntimeError("sin base")
+
+    with pytest.raises(RuntimeError):
+        falla(1)
+    assert cache._key_locks == {}
@@ -0,0 +1,37 @@
+# tests/test_charts.py
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("numpy")
+pytest.importorskip("streamlit")
+from src.ui.components.charts import top_k_per_group  # noqa: E402
+
+def _tiendas():
+    return pd.DataFrame({
+        "ciudad":        ["Quito"] * 4 + ["Loja"] * 2,
+        "nombre_tienda": ["A", "B", "C", "D", "E", "F"],
+        "ingreso":       [40.0, 30.0, 20.0, 10.0, 5.0, 1.0],
+        "unidades":      [4, 3, 2, 1, 5, 1],
+    })
+
+def test_pliega_el_resto_en_otros():
+    d = top_k_per_group(_tiendas(), "ciudad", "ingreso", 2)
+    quito = d[d["ciudad"] == "Quito"].set_index("nombre_tienda")
+    assert list(quito.index) == ["A", "B", "Otros"]
+    assert quito.loc["Otros", "ingreso"] == 30.0
+    assert quito.loc["Otros", "n"] == 2 and quito.loc["Otros", "otros"]
+    assert set(d.loc[d["ciudad"] == "Loja", "nombre_tienda"]) == {"E", "F"}
+
+def test_conserva_totales():
+    df = _tiendas()
+    d = top_k_per_group(df, "ciudad", "ingreso", 1)
+    assert d.groupby("ciudad")["ingreso"].sum().to_dict() == df.groupby("ciudad")["ingreso"].sum().to_dict()
+
+def test_sin_k_no_pliega():
+    assert len(top_k_per_group(_tiendas(), "ciudad", "ingreso", None)) == 6
+
+def test_respeta_otros_ya_plegados():
+    df = pd.DataFrame({"ciudad": ["Quito", "Quito"], "nombre_tienda": ["A", "Otros"],
+                       "ingreso": [10.0, 50.0], "n": [1, 7], "otros": [False, True]})
+    d = top_k_per_group(df, "ciudad", "ingreso", 1)
+    assert d.set_index("nombre_tienda").loc["Otros", "n"] == 7
@@ -0,0 +1,13 @@
+# tests/test_cube.py
+from src.queries import build_sql
+
+def test_left_join_para_dimensiones_opcionales():
+    sql, _ = build_sql("cube", {})
+    assert "LEFT JOIN dim_cliente dc" in sql and "LEFT JOIN dim_repartidor dr" in sql
+    assert "JOIN dim_tienda dt" in sql and "LEFT JOIN dim_tienda" not in sql
+
+def test_cubo_con_grouping_sets():
+    sql, _ = build_sql("cube", {})
+    assert "GROUP BY GROUPING SETS ((df.ano, df.mes), (dp.categoria, dp.nombre_producto)" in sql
+    assert "GROUPING(df.ano, df.mes," in sql and "AS grupo" in sql
+    assert sql.count("(") - sql.count(")") == 0
@@ -0,0 +1,51 @@
+# tests/test_migrate.py
+import re
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("streamlit")
+pytest.importorskip("dotenv")
+from src import migrate  # noqa: E402
+
+def test_archivos_numerados_y_en_orden():
+    stems = [f.stem for f in migrate._files()]
+    numeros = [int(re.match(r"(\d{3})_", s).group(1)) for s in stems]
+    assert numeros == list(range(1, len(stems) + 1))  # sin huecos ni duplicados
+    assert stems == sorted(stems)
+
+class FakeConn:
+    def __init__(self, log, ya):
+        self.log, self.ya = log, ya
+        self.connection = self
+
+    def cursor(self):
+        return self
+
+    def execute(self, stmt, params=None):
+        if params:  # INSERT INTO schema_migrations
+            self.ya.add(params["v"])
+        elif isinstance(stmt, str):  # el archivo de la migración
+            self.log.append(stmt)
+        return self
+
+    def scalars(self):
+        return list(self.ya)
+
+class FakeEngine:
+    def __init__(self, ya):
+        self.log, self.ya = [], set(ya)
+
+    @contextmanager
+    def begin(self):
+        yield FakeConn(self.log, self.ya)
+
+def test_aplica_solo_pendientes_en_orden(monkeypatch):
+    stems = [f.stem for f in migrate._files()]
+    engine = FakeEngine(stems[:2])
+    monkeypatch.setattr(migrate, "get_engine", lambda: engine)
+    assert migrate.migrate() == stems[2:]
+    assert engine.log == [migrate.MIGRATIONS_DIR.joinpath(s + ".sql").read_text(encoding="utf-8")
+                          for s in stems[2:]]
+    assert migrate.migrate() == []
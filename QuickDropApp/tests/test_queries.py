@@ -0,0 +1,57 @@
+# tests/test_queries.py
+from datetime import date
+
+from src.queries import QUERIES, build_sql, build_top_k_sql, rollup_needs
+
+ENERO = {"date_from": date(2024, 1, 1), "date_to": date(2024, 1, 31)}
+
+def test_sin_filtros_solo_une_lo_que_selecciona():
+    sql, params = build_sql("trend", {})
+    assert "JOIN dim_fecha df" in sql
+    assert "dim_tienda" not in sql and "dim_pago" not in sql
+    assert params == {}
+
+def test_union_omitida_conserva_el_join_interno():
+    # Sin unir tienda/producto/pago, las ventas con esas claves nulas siguen fuera
+    sql, _ = build_sql("trend", ENERO)
+    for col in ("hv.tienda_key", "hv.producto_key", "hv.pago_key"):
+        assert f"{col} IS NOT NULL" in sql
+    sql, _ = build_sql("pay_mix", ENERO)
+    assert "JOIN dim_pago dpg" in sql and "hv.pago_key IS NOT NULL" not in sql
+    assert "hv.tienda_key IS NOT NULL" in sql
+
+def test_rango_de_fechas_va_por_fecha_key():
+    sql, params = build_sql("trend", ENERO)
+    assert "hv.fecha_key >= :date_from AND hv.fecha_key <= :date_to" in sql
+    assert params == {"date_from": 20240101, "date_to": 20240131}
+
+def test_filtro_por_atributo_une_la_dimension():
+    sql, params = build_sql("trend", {**ENERO, "ciudades": ["Quito"]})
+    assert "JOIN dim_tienda dt" in sql
+    assert "dt.ciudad = ANY(:ciudades)" in sql
+    assert params["ciudades"] == ["Quito"]
+
+def test_filtro_por_clave_no_une_la_dimension():
+    sql, params = build_sql("trend", {"ciudades": ["Quito"]}, keys={"ciudades": [3, 7]})
+    assert "dim_tienda" not in sql
+    assert "hv.tienda_key = ANY(:tienda_keys)" in sql
+    assert params == {"tienda_keys": [3, 7]}
+
+def test_top_k_pliega_en_el_servidor():
+    sql, _ = build_top_k_sql("city_store", {}, "ciudad", "nombre_tienda", "ingreso")
+    assert "ROW_NUMBER() OVER (PARTITION BY ciudad ORDER BY ingreso DESC, nombre_tienda)" in sql
+    assert "GROUP BY ciudad, rn" in sql and ":top_k" in sql
+
+def test_limit_opcional():
+    assert QUERIES["top_products"].get("limit")
+    assert build_sql("top_products", {})[0].rstrip(";").endswith("LIMIT :limit")
+    assert "LIMIT" not in build_sql("top_products", {}, limit=False)[0]
+
+def test_rollup_lee_la_tabla_agregada():
+    sql, _ = build_sql("trend_semana", {}, table="agg_ventas_dia")
+    assert "FROM agg_ventas_dia r" in sql and "hechos_ventas" not in sql
+    assert "date_trunc('week', r.fecha)::date AS periodo" in sql
+
+def test_rollup_needs():
+    assert rollup_needs("trend_semana", {}) == {"fecha"}
+    assert rollup_needs("trend", {"ciudades": ["Quito"]}) == {"ano", "mes", "ciudad"}
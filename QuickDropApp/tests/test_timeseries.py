@@ -0,0 +1,53 @@
+# tests/test_timeseries.py
+from datetime import date
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+from src.timeseries import downsample, grain_for, lttb_indices, rebucket, with_period  # noqa: E402
+
+def test_grain_for():
+    assert grain_for(None, None) == "mes"
+    assert grain_for(date(2024, 1, 1), date(2024, 1, 31)) == "dia"
+    assert grain_for(date(2024, 1, 1), date(2024, 6, 30)) == "semana"
+    assert grain_for(date(2022, 1, 1), date(2024, 1, 1)) == "mes"
+
+def test_lttb_conserva_extremos_y_n_puntos():
+    x = np.arange(1000, dtype=float)
+    y = np.sin(x / 20)
+    idx = lttb_indices(x, y, 50)
+    assert len(idx) == 50
+    assert idx[0] == 0 and idx[-1] == 999
+    assert (np.diff(idx) > 0).all()
+
+def test_lttb_conserva_picos():
+    y = np.zeros(500)
+    y[123], y[321] = 100.0, -100.0
+    idx = lttb_indices(np.arange(500, dtype=float), y, 20)
+    assert 123 in idx and 321 in idx
+
+def test_lttb_no_reduce_series_cortas():
+    assert list(lttb_indices(np.arange(5.0), np.arange(5.0), 10)) == [0, 1, 2, 3, 4]
+
+def test_downsample_ordena_y_recorta():
+    df = pd.DataFrame({"periodo": pd.date_range("2024-01-01", periods=800)[::-1],
+                       "ingreso_total": np.arange(800.0)})
+    out = downsample(df, "ingreso_total", n=100)
+    assert len(out) == 100
+    assert out["periodo"].is_monotonic_increasing
+    assert downsample(df, "ingreso_total", n=1000) is df
+
+def test_rebucket_conserva_totales():
+    df = pd.DataFrame({"periodo": pd.date_range("2024-01-01", periods=730)[::-1],
+                       "cantidad_total": np.arange(730), "ingreso_total": np.ones(730)})
+    out = rebucket(df, ["cantidad_total"], n=100)
+    assert len(out) <= 100
+    assert out["cantidad_total"].sum() == df["cantidad_total"].sum()
+    assert out["periodo"].iloc[0] == pd.Timestamp("2024-01-01")
+    assert out["periodo"].is_monotonic_increasing
+    assert rebucket(df, ["cantidad_total"], n=1000) is df
+
+def test_with_period_desde_ano_mes():
+    df = with_period(pd.DataFrame({"ano": [2024, 2024], "mes": [1, 12]}))
+    assert list(df["periodo"]) == [pd.Timestamp("2024-01-01"), pd.Timestamp("2024-12-01")]
@@ -0,0 +1,436 @@
+# QuickDropETL/etl_incremental.py
+"""
+Carga incremental del DW QuickDrop desde el OLTP (reemplaza la recarga
+completa de "QuickDrop Data Warehouse Dimensiones/Hechos.ktr").
+
+- Cada tabla fuente tiene una marca de agua (etl_watermark en el DW) sobre su
+  columna actualizado_en (sql/oltp_actualizado_en.sql); solo se leen las filas
+  nuevas o modificadas desde la última corrida.
+- Dimensiones: upsert por clave natural (SCD tipo 1), vía staging + COPY.
+- Hechos: se recargan completos los pedidos afectados (borrar + COPY), así que
+  volver a procesar una ventana es idempotente. Las claves sustitutas se
+  resuelven con mapas en memoria; fecha_key es AAAAMMDD. Un pedido borrado
+  en el OLTP no deja rastro: solo desaparece del DW con --completo.
+- Un pedido sin pago, sin entrega o con producto/tienda/cliente que no está en
+  la dimensión apunta a un miembro explícito ("Sin pago", "Sin entrega",
+  "Desconocido"; clave natural negativa) en vez de dejar la clave en NULL.
+  Los hechos cargados antes con claves NULL se corrigen con --completo.
+- Todo va en una sola transacción del DW que además incrementa etl_generacion:
+  la app ve la carga entera o nada, y sus cachés se invalidan de una vez. La
+  transacción toma un advisory lock (ETL_LOCK): si otra carga está en curso,
+  esta sale sin tocar nada en vez de duplicar hechos.
+- --completo vacía el hecho con TRUNCATE, que retiene ACCESS EXCLUSIVE sobre
+  hechos_ventas hasta el commit: la app queda esperando durante toda la carga.
+  Conviene correrlo fuera de horario; el modo incremental no bloquea lecturas.
+
+Requisitos en el DW: QuickDropApp/migrations hasta 004 (python -m src.migrate).
+
+Uso (desde QuickDropETL/):
+    python etl_incremental.py              # incremental según etl_watermark
+    python etl_incremental.py --completo   # recarga todos los hechos
+    python etl_incremental.py --rollups    # además refresca los rollups de la app
+    python etl_incremental.py --snapshot   # además exporta el snapshot Parquet (QD_BACKEND=duckdb)
+    python etl_incremental.py --warmup     # además precalienta la caché de la app
+
+Pruebas (upsert de dimensiones, primera corrida incluida) contra una base descartable:
+    QD_TEST_DW="dbname=scratch user=postgres" python -m pytest -q
+
+Conexión: el DW usa las mismas variables que la app (PG_HOST, PG_PORT, PG_DB,
+PG_USER, PG_PASS, PG_SCHEMA); el OLTP usa OLTP_* y toma de PG_* lo que falte
+(salvo el esquema).
+"""
+from __future__ import annotations
+import argparse
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import psycopg
+from psycopg import IsolationLevel
+from psycopg.conninfo import make_conninfo
+from dotenv import load_dotenv
+
+load_dotenv()
+
+APP_DIR = Path(__file__).resolve().parent.parent / "QuickDropApp"
+# Pedidos por lote al extraer/cargar hechos
+BATCH = int(os.getenv("QD_ETL_BATCH", "20000"))
+# Se vuelve a leer este margen antes de la marca: cubre transacciones del OLTP
+# que confirmaron tarde con un actualizado_en anterior a la marca guardada
+OVERLAP = timedelta(seconds=int(os.getenv("QD_ETL_OVERLAP_SECS", "300")))
+INICIO = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Clave de pg_try_advisory_xact_lock: una sola carga a la vez por DW
+ETL_LOCK = int(os.getenv("QD_ETL_LOCK", "51445401"))
+
+FUENTES = ["cliente", "tienda", "categoria", "producto", "repartidor",
+           "pedido", "detalle_pedido", "entrega", "pago"]
+FUENTES_HECHOS = ["pedido", "detalle_pedido", "entrega", "pago"]
+
+def _ventana(col: str, fuente: str) -> str:
+    return f"({col} > %(desde_{fuente})s AND {col} <= %(hasta_{fuente})s)"
+
+# La primera columna de "cols" es la clave natural
+DIMENSIONES = {
+    "dim_cliente": {
+        "key": "cliente_key",
+        "cols": ["id_cliente", "nombre_cliente", "correo", "ciudad", "fecha_registro"],
+        "sql": f"""
+            SELECT id_cliente, nombre, correo, ciudad, fecha_registro
+            FROM cliente WHERE {_ventana("actualizado_en", "cliente")}
+        """,
+    },
+    "dim_tienda": {
+        "key": "tienda_key",
+        "cols": ["id_tienda", "nombre_tienda", "tipo", "ciudad", "estado_tienda"],
+        "sql": f"""
+            SELECT id_tienda, nombre, tipo, ciudad, estado
+            FROM tienda WHERE {_ventana("actualizado_en", "tienda")}
+        """,
+    },
+    "dim_producto": {
+        "key": "producto_key",
+        "cols": ["id_producto", "nombre_producto", "descripcion", "precio_base", "categoria"],
+        # Renombrar una categoría cambia la dimensión de todos sus productos
+        "sql": f"""
+            SELECT p.id_producto, p.nombre, p.descripcion, p.precio, c.nombre
+            FROM producto p
+            JOIN categoria c ON p.id_categoria = c.id_categoria
+            WHERE {_ventana("p.actualizado_en", "producto")} OR {_ventana("c.actualizado_en", "categoria")}
+        """,
+    },
+    "dim_repartidor": {
+        "key": "repartidor_key",
+        "cols": ["id_repartidor", "nombre_repartidor", "zona", "placa_moto"],
+        "sql": f"""
+            SELECT id_repartidor, nombre, zona, placa_moto
+            FROM repartidor WHERE {_ventana("actualizado_en", "repartidor")}
+        """,
+    },
+}
+
+# Miembros explícitos para lo que HECHOS_SQL trae con LEFT JOIN vacío; la clave
+# natural es negativa (no existe en el OLTP) y las columnas van en el orden de "cols"
+DESCONOCIDO, SIN_ENTREGA = -1, -2
+MIEMBROS = {
+    "dim_cliente":    [(DESCONOCIDO, "Desconocido", None, "Desconocida", None)],
+    "dim_tienda":     [(DESCONOCIDO, "Desconocida", None, "Desconocida", None)],
+    "dim_producto":   [(DESCONOCIDO, "Desconocido", None, None, "Desconocida")],
+    "dim_repartidor": [(DESCONOCIDO, "Desconocido", "Desconocida", None),
+                       (SIN_ENTREGA, "Sin entrega", "Sin entrega", None)],
+}
+SIN_PAGO = ("Sin pago", "Sin pago")  # (metodo_pago, estado_pago) en dim_pago
+ESTADO_SIN_ENTREGA = "Sin entrega"
+
+# Mismo grano y columnas que Extraer_Hechos_OLTP (Hechos.ktr) + el pedido/detalle de origen
+HECHOS_SQL = """
+    SELECT
+        pe.id_pedido,
+        dpd.id_detalle,
+        pe.fecha_pedido::date AS fecha,
+        pe.id_cliente,
+        t.id_tienda,
+        dpd.id_producto,
+        r.id_repartidor,
+        pa.metodo_pago,
+        pa.estado_pago,
+        dpd.cantidad,
+        dpd.precio_unitario,
+        (dpd.cantidad * dpd.precio_unitario) AS subtotal,
+        pa.total AS total_pago,
+        (e.fecha_entrega - pe.fecha_pedido)::text AS tiempo_entrega,
+        CAST(EXTRACT(EPOCH FROM (e.fecha_entrega - pe.fecha_pedido)) / 60 AS INTEGER) AS minutos_entrega,
+        e.estado_entrega
+    FROM pedido pe
+    JOIN detalle_pedido dpd ON pe.id_pedido = dpd.id_pedido
+    LEFT JOIN pago pa       ON pe.id_pedido = pa.id_pedido
+    LEFT JOIN entrega e     ON pe.id_pedido = e.id_pedido
+    LEFT JOIN repartidor r  ON e.id_repartidor = r.id_repartidor
+    LEFT JOIN producto pro  ON dpd.id_producto = pro.id_producto
+    LEFT JOIN tienda t      ON pro.id_tienda = t.id_tienda
+"""
+
+PEDIDOS_AFECTADOS_SQL = " UNION ".join(
+    f"SELECT id_pedido FROM {f} WHERE {_ventana('actualizado_en', f)}" for f in FUENTES_HECHOS
+)
+
+HECHOS_COLS = ["id_pedido", "id_detalle", "fecha_key", "cliente_key", "producto_key", "tienda_key",
+               "repartidor_key", "pago_key", "cantidad", "precio_unitario", "subtotal", "total_pago",
+               "tiempo_entrega", "minutos_entrega", "estado_entrega"]
+
+# ---------------------------------------------------------------------------
+# Conexiones
+# ---------------------------------------------------------------------------
+def _conninfo(prefix: str) -> str:
+    def env(k, default=None):
+        return os.getenv(f"{prefix}_{k}") or os.getenv(f"PG_{k}") or default
+    kw = dict(host=env("HOST", "localhost"), port=env("PORT", "5432"), dbname=env("DB"),
+              user=env("USER"), password=env("PASS", ""), application_name="quickdrop-etl")
+    schema = os.getenv(f"{prefix}_SCHEMA")  # sin fallback: el esquema del DW no aplica al OLTP
+    if schema:
+        kw["options"] = f"-c search_path={schema}"
+    return make_conninfo(**kw)
+
+def connect_dw():
+    return psycopg.connect(_conninfo("PG"))
+
+def connect_oltp():
+    conn = psycopg.connect(_conninfo("OLTP"))
+    # Una sola foto del OLTP: las marcas y lo extraído son consistentes entre sí
+    conn.isolation_level = IsolationLevel.REPEATABLE_READ
+    conn.read_only = True
+    return conn
+
+# ---------------------------------------------------------------------------
+# Marcas de agua
+# ---------------------------------------------------------------------------
+def read_watermarks(dw) -> dict:
+    if dw.execute("SELECT to_regclass('etl_watermark')").fetchone()[0] is None:
+        sys.exit("Falta etl_watermark en el DW: aplica las migraciones (cd QuickDropApp && python -m src.migrate)")
+    return dict(dw.execute("SELECT fuente, marca FROM etl_watermark").fetchall())
+
+def _ventanas(oltp, marcas: dict, completo: bool) -> dict:
+    """Parámetros desde_<fuente>/hasta_<fuente> de esta corrida."""
+    params = {}
+    for f in FUENTES:
+        hasta = oltp.execute(f"SELECT max(actualizado_en) FROM {f}").fetchone()[0]
+        marca = None if completo else marcas.get(f)
+        desde = marca - OVERLAP if marca else INICIO
+        params[f"desde_{f}"] = desde
+        params[f"hasta_{f}"] = hasta or desde
+    return params
+
+def save_watermarks(dw, params: dict):
+    with dw.cursor() as cur:
+        cur.executemany("""
+            INSERT INTO etl_watermark (fuente, marca) VALUES (%s, %s)
+            ON CONFLICT (fuente) DO UPDATE SET marca = EXCLUDED.marca, actualizado_en = now()
+        """, [(f, params[f"hasta_{f}"]) for f in FUENTES if params[f"hasta_{f}"] > INICIO])
+
+def bump_generation(dw) -> int:
+    """Mismo contrato que src.cache.bump_generation en la app; 0 si falta migrations/003."""
+    if dw.execute("SELECT to_regclass('etl_generacion')").fetchone()[0] is None:
+        return 0
+    return dw.execute("""
+        UPDATE etl_generacion SET generacion = generacion + 1, actualizado_en = now()
+        WHERE id = 1 RETURNING generacion
+    """).fetchone()[0]
+
+# ---------------------------------------------------------------------------
+# Dimensiones
+# ---------------------------------------------------------------------------
+def upsert_dimension(oltp, dw, name: str, params: dict) -> int:
+    spec = DIMENSIONES[name]
+    cols = spec["cols"]
+    nat, attrs = cols[0], cols[1:]
+    rows = oltp.execute(spec["sql"], params).fetchall()
+    if not rows:
+        return 0
+    stg = f"stg_{name}"
+    collist = ", ".join(cols)
+    with dw.cursor() as cur:
+        # Solo las columnas que se copian: con (LIKE ...) la clave sustituta (serial NOT NULL)
+        # quedaba sin default en el staging y el COPY fallaba por la restricción
+        cur.execute(f"CREATE TEMP TABLE {stg} ON COMMIT DROP AS SELECT {collist} FROM {name} WITH NO DATA")
+        with cur.copy(f"COPY {stg} ({collist}) FROM STDIN") as cp:
+            for r in rows:
+                cp.write_row(r)
+        sets = ", ".join(f"{c} = s.{c}" for c in attrs)
+        cur.execute(f"UPDATE {name} d SET {sets} FROM {stg} s WHERE d.{nat} = s.{nat}")
+        cur.execute(f"""
+            INSERT INTO {name} ({collist})
+            SELECT {collist} FROM {stg} s
+            WHERE NOT EXISTS (SELECT 1 FROM {name} d WHERE d.{nat} = s.{nat})
+        """)
+    return len(rows)
+
+def asegurar_miembros(dw):
+    """Inserta los miembros de MIEMBROS que aún no estén en su dimensión."""
+    with dw.cursor() as cur:
+        for name, filas in MIEMBROS.items():
+            cols = DIMENSIONES[name]["cols"]
+            hay = {k for (k,) in cur.execute(f"SELECT {cols[0]} FROM {name} WHERE {cols[0]} < 0").fetchall()}
+            nuevas = [f for f in filas if f[0] not in hay]
+            if nuevas:
+                cur.executemany(f"INSERT INTO {name} ({', '.join(cols)}) "
+                                f"VALUES ({', '.join(['%s'] * len(cols))})", nuevas)
+
+def _pago(metodo, estado) -> tuple:
+    # Pedido sin fila en pago -> miembro "Sin pago"
+    return SIN_PAGO if (metodo, estado) == (None, None) else (metodo, estado)
+
+def key_map(dw, name: str) -> dict:
+    """clave natural -> clave sustituta (si una carga previa duplicó, gana la última)."""
+    nat, key = DIMENSIONES[name]["cols"][0], DIMENSIONES[name]["key"]
+    return dict(dw.execute(f"SELECT {nat}, max({key}) FROM {name} GROUP BY {nat}").fetchall())
+
+class Claves:
+    """Mapas en memoria para resolver claves sustitutas de los hechos."""
+
+    def __init__(self, dw):
+        self.dw = dw
+        asegurar_miembros(dw)
+        self.maps = {name: key_map(dw, name) for name in DIMENSIONES}
+        self.fechas = {k for (k,) in dw.execute("SELECT fecha_key FROM dim_fecha")}
+        self.pagos = {(m, e): k for k, m, e in
+                      dw.execute("SELECT max(pago_key), metodo_pago, estado_pago FROM dim_pago GROUP BY 2, 3")}
+        # Migración 005 de la app: hechos_ventas particionada por año
+        self.particionado = dw.execute("SELECT to_regproc('qd_asegurar_particion') IS NOT NULL").fetchone()[0]
+        self.anos = set()
+
+    def asegurar(self, rows):
+        """Agrega a dim_fecha / dim_pago lo que traigan los hechos y aún no exista."""
+        nuevas = sorted({r[2] for r in rows if r[2] and int(r[2].strftime("%Y%m%d")) not in self.fechas})
+        if nuevas:
+            self.dw.execute("""
+                INSERT INTO dim_fecha (fecha_key, fecha, ano, mes, dia, trimestre, dia_semana)
+                SELECT TO_CHAR(f, 'YYYYMMDD')::int, f, EXTRACT(YEAR FROM f), EXTRACT(MONTH FROM f),
+                       EXTRACT(DAY FROM f), EXTRACT(QUARTER FROM f), TRIM(TO_CHAR(f, 'Day'))
+                FROM unnest(%s::date[]) AS f
+                ON CONFLICT DO NOTHING
+            """, (nuevas,))
+            self.fechas.update(int(f.strftime("%Y%m%d")) for f in nuevas)
+        anos = {r[2].year for r in rows if r[2]} - self.anos
+        if anos and self.particionado:
+            for a in sorted(anos):
+                self.dw.execute("SELECT qd_asegurar_particion(%s)", (a,))
+        self.anos |= anos
+        pares = {_pago(r[7], r[8]) for r in rows} - self.pagos.keys()
+        if pares:
+            metodos, estados = zip(*pares)
+            for k, m, e in self.dw.execute("""
+                INSERT INTO dim_pago (metodo_pago, estado_pago)
+                SELECT * FROM unnest(%s::varchar[], %s::varchar[])
+                RETURNING pago_key, metodo_pago, estado_pago
+            """, (list(metodos), list(estados))):
+                self.pagos[(m, e)] = k
+
+    def clave(self, name: str, nat, vacio: int = DESCONOCIDO) -> int:
+        """Clave sustituta de nat; sin origen (nat NULL) -> miembro vacio, sin fila -> Desconocido."""
+        m = self.maps[name]
+        if nat is not None and nat in m:
+            return m[nat]
+        return m[vacio if nat is None else DESCONOCIDO]
+
+    def fila(self, r) -> tuple:
+        (id_pedido, id_detalle, fecha, id_cliente, id_tienda, id_producto, id_repartidor,
+         metodo, estado_pago, cantidad, precio, subtotal, total, tiempo, minutos, estado_entrega) = r
+        return (
+            id_pedido, id_detalle,
+            int(fecha.strftime("%Y%m%d")) if fecha else None,
+            self.clave("dim_cliente", id_cliente),
+            self.clave("dim_producto", id_producto),
+            self.clave("dim_tienda", id_tienda),
+            self.clave("dim_repartidor", id_repartidor, SIN_ENTREGA),
+            self.pagos[_pago(metodo, estado_pago)],
+            cantidad, precio, subtotal, total, tiempo, minutos,
+            ESTADO_SIN_ENTREGA if estado_entrega is None else estado_entrega,
+        )
+
+# ---------------------------------------------------------------------------
+# Hechos
+# ---------------------------------------------------------------------------
+def _lotes_completo(oltp):
+    with oltp.cursor(name="qd_hechos") as cur:
+        cur.itersize = BATCH
+        cur.execute(HECHOS_SQL + " ORDER BY pe.id_pedido")
+        while rows := cur.fetchmany(BATCH):
+            yield None, rows
+
+def _lotes_incremental(oltp, params: dict):
+    ids = [i for (i,) in oltp.execute(PEDIDOS_AFECTADOS_SQL, params)]
+    for i in range(0, len(ids), BATCH):
+        lote = ids[i:i + BATCH]
+        yield lote, oltp.execute(HECHOS_SQL + " WHERE pe.id_pedido = ANY(%s)", (lote,)).fetchall()
+
+def load_facts(dw, lotes, claves: Claves) -> tuple[int, int]:
+    """Borra los pedidos de cada lote en el hecho y los vuelve a escribir con COPY."""
+    pedidos = filas = 0
+    with dw.cursor() as cur:
+        for ids, rows in lotes:
+            if ids is not None:
+                cur.execute("DELETE FROM hechos_ventas WHERE id_pedido = ANY(%s)", (ids,))
+                pedidos += len(ids)
+            else:
+                pedidos += len({r[0] for r in rows})
+            claves.asegurar(rows)
+            with cur.copy(f"COPY hechos_ventas ({', '.join(HECHOS_COLS)}) FROM STDIN") as cp:
+                for r in rows:
+                    cp.write_row(claves.fila(r))
+            filas += len(rows)
+    return pedidos, filas
+
+# ---------------------------------------------------------------------------
+# Corrida
+# ---------------------------------------------------------------------------
+def run(completo: bool = False) -> dict:
+    t0 = time.perf_counter()
+    with connect_dw() as dw, connect_oltp() as oltp:
+        # Se libera con el commit (o el rollback si la corrida falla)
+        if not dw.execute("SELECT pg_try_advisory_xact_lock(%s)", (ETL_LOCK,)).fetchone()[0]:
+            sys.exit("Otra carga del DW está en curso (advisory lock ocupado); no se hace nada")
+        marcas = read_watermarks(dw)
+        # Sin marca de los hechos (primera corrida tras Pentaho) -> carga completa
+        completo = completo or any(f not in marcas for f in FUENTES_HECHOS)
+        params = _ventanas(oltp, marcas, completo)
+
+        resumen = {"modo": "completo" if completo else "incremental"}
+        for name in DIMENSIONES:
+            resumen[name] = upsert_dimension(oltp, dw, name, params)
+
+        claves = Claves(dw)
+        if completo:
+            # ACCESS EXCLUSIVE hasta el commit: la app espera toda la carga (ver docstring)
+            dw.execute("TRUNCATE hechos_ventas")
+            lotes = _lotes_completo(oltp)
+        else:
+            lotes = _lotes_incremental(oltp, params)
+        resumen["pedidos"], resumen["hechos"] = load_facts(dw, lotes, claves)
+
+        save_watermarks(dw, params)
+        resumen["generacion"] = bump_generation(dw)
+        dw.commit()
+        if completo:
+            dw.execute("ANALYZE hechos_ventas")
+            dw.commit()
+    resumen["segundos"] = round(time.perf_counter() - t0, 1)
+    return resumen
+
+def refresh_rollups():
+    # Los rollups quedan atrasados tras la carga (la app cae al hecho hasta refrescarlos)
+    subprocess.run([sys.executable, "-m", "src.rollups", "refresh"], cwd=APP_DIR, check=True)
+
+def snapshot_duckdb():
+    # Snapshot Parquet para la app con QD_BACKEND=duckdb
+    subprocess.run([sys.executable, "-m", "src.duck", "snapshot"], cwd=APP_DIR, check=True)
+
+def warmup_cache():
+    # Deja en caché la vista por defecto y los rangos predefinidos de la generación nueva
+    subprocess.run([sys.executable, "-m", "src.warmup"], cwd=APP_DIR, check=True)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Carga incremental del DW QuickDrop")
+    ap.add_argument("--completo", action="store_true", help="recarga todos los hechos e ignora las marcas")
+    ap.add_argument("--rollups", action="store_true", help="refresca los rollups de la app al terminar")
+    ap.add_argument("--snapshot", action="store_true", help="exporta el snapshot Parquet de la app (QD_BACKEND=duckdb)")
+    ap.add_argument("--warmup", action="store_true", help="precalienta la caché de la app (después de rollups/snapshot)")
+    args = ap.parse_args(argv)
+
+    r = run(completo=args.completo)
+    print(f"carga {r['modo']}: {r['pedidos']} pedidos, {r['hechos']} hechos en {r['segundos']} s "
+          f"({r['hechos'] / max(r['segundos'], 0.1):,.0f} filas/s), generación {r['generacion']}")
+    for name in DIMENSIONES:
+        print(f"  {name:<15} {r[name]:>8} filas")
+    if args.rollups:
+        refresh_rollups()
+    else:
+        print("Rollups pendientes: cd QuickDropApp && python -m src.rollups refresh")
+    if args.snapshot:
+        snapshot_duckdb()
+    if args.warmup:
+        warmup_cache()
+
+if __name__ == "__main__":
+    main()
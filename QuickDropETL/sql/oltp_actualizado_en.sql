@@ -0,0 +1,44 @@
+-- Columnas de auditoría en el OLTP para la carga incremental del DW.
+-- Correr una vez sobre la base relacional, antes de la primera corrida de
+-- etl_incremental.py. Es idempotente.
+--
+-- Cada tabla fuente lleva actualizado_en, que un trigger mantiene en cada
+-- INSERT/UPDATE. Borrar un detalle, una entrega o un pago "toca" al pedido
+-- para que el ETL vuelva a cargar ese pedido completo.
+
+CREATE OR REPLACE FUNCTION qd_marcar_actualizado() RETURNS trigger AS $$
+BEGIN
+    NEW.actualizado_en := clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION qd_tocar_pedido() RETURNS trigger AS $$
+BEGIN
+    UPDATE pedido SET actualizado_en = clock_timestamp() WHERE id_pedido = OLD.id_pedido;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['cliente', 'tienda', 'categoria', 'producto', 'repartidor',
+                             'pedido', 'detalle_pedido', 'entrega', 'pago']
+    LOOP
+        EXECUTE format('ALTER TABLE %I ADD COLUMN IF NOT EXISTS actualizado_en TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()', t);
+        EXECUTE format('CREATE INDEX IF NOT EXISTS %I ON %I (actualizado_en)', t || '_actualizado_en_idx', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_actualizado_en', t);
+        EXECUTE format('CREATE TRIGGER %I BEFORE INSERT OR UPDATE ON %I
+                        FOR EACH ROW EXECUTE FUNCTION qd_marcar_actualizado()', t || '_actualizado_en', t);
+    END LOOP;
+
+    FOREACH t IN ARRAY ARRAY['detalle_pedido', 'entrega', 'pago']
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_toca_pedido', t);
+        EXECUTE format('CREATE TRIGGER %I AFTER DELETE ON %I
+                        FOR EACH ROW EXECUTE FUNCTION qd_tocar_pedido()', t || '_toca_pedido', t);
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,67 @@
+# QuickDropETL/tests/test_upsert_dimension.py
+"""
+upsert_dimension contra un Postgres de pruebas (primera corrida y reproceso).
+
+Necesita una base descartable: QD_TEST_DW con un conninfo de libpq, p. ej.
+    QD_TEST_DW="dbname=scratch user=postgres" python -m pytest -q   (desde QuickDropETL/)
+Las tablas se crean en un esquema temporal que se borra al terminar.
+"""
+import os
+from datetime import date
+
+import pytest
+
+psycopg = pytest.importorskip("psycopg")
+pytest.importorskip("dotenv")
+DSN = os.getenv("QD_TEST_DW")
+pytestmark = pytest.mark.skipif(not DSN, reason="QD_TEST_DW no definido")
+
+from etl_incremental import upsert_dimension  # noqa: E402
+
+class FakeOltp:
+    """Solo lo que usa upsert_dimension: execute(sql, params).fetchall()."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, sql, params):
+        return self
+
+    def fetchall(self):
+        return self.rows
+
+@pytest.fixture
+def dw():
+    schema = f"qd_test_{os.getpid()}"
+    with psycopg.connect(DSN) as conn:
+        conn.execute(f"CREATE SCHEMA {schema}")
+        conn.execute(f"SET search_path = {schema}")
+        # Mismo DDL que "QuickDrop DW sql.sql": clave sustituta serial NOT NULL
+        conn.execute("""
+            CREATE TABLE dim_cliente (
+                cliente_key SERIAL PRIMARY KEY, id_cliente INT, nombre_cliente VARCHAR(100),
+                correo VARCHAR(100), ciudad VARCHAR(50), fecha_registro DATE)
+        """)
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+            conn.execute(f"DROP SCHEMA {schema} CASCADE")
+            conn.commit()
+
+def test_primera_corrida_inserta(dw):
+    rows = [(1, "Ana", "ana@x.ec", "Quito", date(2024, 1, 5)),
+            (2, "Luis", "luis@x.ec", "Loja", date(2024, 2, 1))]
+    assert upsert_dimension(FakeOltp(rows), dw, "dim_cliente", {}) == 2
+    got = dw.execute("SELECT cliente_key, id_cliente, ciudad FROM dim_cliente ORDER BY id_cliente").fetchall()
+    assert [(i, c) for _, i, c in got] == [(1, "Quito"), (2, "Loja")]
+    assert all(k is not None for k, _, _ in got)
+
+def test_reproceso_actualiza_sin_duplicar(dw):
+    upsert_dimension(FakeOltp([(1, "Ana", "ana@x.ec", "Quito", date(2024, 1, 5))]), dw, "dim_cliente", {})
+    dw.commit()  # el staging es ON COMMIT DROP: la segunda corrida lo vuelve a crear
+    upsert_dimension(FakeOltp([(1, "Ana", "ana@x.ec", "Cuenca", date(2024, 1, 5))]), dw, "dim_cliente", {})
+    assert dw.execute("SELECT id_cliente, ciudad FROM dim_cliente").fetchall() == [(1, "Cuenca")]
+
+def test_lote_vacio(dw):
+    assert upsert_dimension(FakeOltp([]), dw, "dim_cliente", {}) == 0
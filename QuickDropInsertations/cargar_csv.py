@@ -0,0 +1,197 @@
+# QuickDropInsertations/cargar_csv.py
+"""
+Carga los CSV de csv_quickdrop/ en el OLTP con COPY FROM STDIN.
+
+- Tablas en orden de dependencias; cada archivo se envía en bloques, sin
+  parsear en Python (la primera línea da las columnas del COPY).
+- Acepta un archivo por tabla (clientes.csv) o varios fragmentos
+  (clientes-00000.csv, ... o .parquet, como los deja generar_datos_csv.py).
+- Por defecto quita PK/UNIQUE/FK e índices de las tablas antes de cargar y los
+  recrea al final (una sola pasada de ordenamiento por índice en vez de
+  mantenerlos fila a fila). Todo va en una transacción: si algo falla, el
+  esquema y los datos quedan como estaban.
+- Con --truncar vacía las tablas y reinicia las secuencias para que los ids
+  coincidan con el orden de los CSV, y usa COPY ... FREEZE.
+
+Uso (desde QuickDropInsertations/):
+    python cargar_csv.py --truncar
+    python cargar_csv.py --dir otra_carpeta --sin-diferir
+
+Conexión: variables OLTP_HOST, OLTP_PORT, OLTP_DB, OLTP_USER, OLTP_PASS
+(las que falten se toman de PG_*).
+"""
+from __future__ import annotations
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import psycopg
+from psycopg.conninfo import make_conninfo
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# tabla -> nombre base de sus CSV, en orden de dependencias
+TABLAS = {
+    "cliente": "clientes",
+    "tienda": "tiendas",
+    "categoria": "categorias",
+    "producto": "productos",
+    "pedido": "pedidos",
+    "detalle_pedido": "detalle_pedido",
+    "repartidor": "repartidores",
+    "entrega": "entregas",
+    "pago": "pagos",
+}
+
+BLOQUE = 1 << 20  # bytes por write al COPY
+
+def _conninfo() -> str:
+    def env(k, default=None):
+        return os.getenv(f"OLTP_{k}") or os.getenv(f"PG_{k}") or default
+    return make_conninfo(host=env("HOST", "localhost"), port=env("PORT", "5432"), dbname=env("DB"),
+                         user=env("USER"), password=env("PASS", ""), application_name="quickdrop-carga")
+
+def archivos(carpeta: Path, base: str) -> list[Path]:
+    return (sorted(carpeta.glob(f"{base}.csv")) + sorted(carpeta.glob(f"{base}-*.csv"))
+            + sorted(carpeta.glob(f"{base}-*.parquet")))
+
+# ---------------------------------------------------------------------------
+# Restricciones e índices diferidos
+# ---------------------------------------------------------------------------
+def capturar_esquema(cur, tablas: list[str]) -> dict:
+    """Definiciones de restricciones e índices sueltos de las tablas, para recrearlos tras la carga."""
+    cur.execute("""
+        SELECT c.conrelid::regclass::text, c.conname, c.contype, pg_get_constraintdef(c.oid)
+        FROM pg_constraint c
+        WHERE c.conrelid = ANY(%s::regclass[]) AND c.contype IN ('p', 'u', 'f')
+    """, (tablas,))
+    cons = cur.fetchall()
+    cur.execute("""
+        SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid)
+        FROM pg_index i
+        WHERE i.indrelid = ANY(%s::regclass[])
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+    """, (tablas,))
+    return {
+        "fk":      [c for c in cons if c[2] == "f"],
+        "claves":  [c for c in cons if c[2] in ("p", "u")],
+        "indices": cur.fetchall(),
+    }
+
+def quitar_esquema(cur, esquema: dict):
+    # Primero las FK: las PK/UNIQUE referenciadas no se pueden quitar antes
+    for tabla, nombre, _, _ in esquema["fk"] + esquema["claves"]:
+        cur.execute(f'ALTER TABLE {tabla} DROP CONSTRAINT "{nombre}"')
+    for nombre, _ in esquema["indices"]:
+        cur.execute(f"DROP INDEX {nombre}")
+
+def recrear_esquema(cur, esquema: dict):
+    for tabla, nombre, _, definicion in esquema["claves"] + esquema["fk"]:
+        cur.execute(f'ALTER TABLE {tabla} ADD CONSTRAINT "{nombre}" {definicion}')
+    for _, definicion in esquema["indices"]:
+        cur.execute(definicion)
+
+# ---------------------------------------------------------------------------
+# Carga
+# ---------------------------------------------------------------------------
+def copiar(cur, tabla: str, ruta: Path, freeze: bool) -> int:
+    if ruta.suffix == ".parquet":
+        return copiar_parquet(cur, tabla, ruta, freeze)
+    with open(ruta, "rb") as fh:
+        cols = fh.readline().decode("utf-8").strip().lstrip("\ufeff")
+        opts = "FORMAT csv, FREEZE true" if freeze else "FORMAT csv"
+        with cur.copy(f"COPY {tabla} ({cols}) FROM STDIN WITH ({opts})") as cp:
+            while bloque := fh.read(BLOQUE):
+                cp.write(bloque)
+    return cur.rowcount
+
+def copiar_parquet(cur, tabla: str, ruta: Path, freeze: bool) -> int:
+    # Se convierte a CSV por lotes de filas y se envía por el mismo COPY
+    import io
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(ruta)
+    cols = ", ".join(pf.schema_arrow.names)
+    opts = "FORMAT csv, FREEZE true" if freeze else "FORMAT csv"
+    with cur.copy(f"COPY {tabla} ({cols}) FROM STDIN WITH ({opts})") as cp:
+        for batch in pf.iter_batches(batch_size=100_000):
+            buf = io.BytesIO()
+            pacsv.write_csv(batch, buf, pacsv.WriteOptions(include_header=False))
+            cp.write(buf.getvalue())
+    return cur.rowcount
+
+def ajustar_secuencias(cur, tablas: list[str]):
+    # Con ids explícitos en los CSV, las secuencias SERIAL deben seguir desde el máximo
+    cur.execute("""
+        SELECT a.attrelid::regclass::text, a.attname, pg_get_serial_sequence(a.attrelid::regclass::text, a.attname)
+        FROM pg_attribute a
+        WHERE a.attrelid = ANY(%s::regclass[]) AND a.attnum > 0 AND NOT a.attisdropped
+    """, (tablas,))
+    for tabla, col, seq in cur.fetchall():
+        if seq:
+            cur.execute(f"SELECT setval(%s, COALESCE(max({col}), 0) + 1, false) FROM {tabla}", (seq,))
+
+def cargar(carpeta: Path, truncar: bool = False, diferir: bool = True) -> list[tuple]:
+    tablas = list(TABLAS)
+    faltan = [base for base in TABLAS.values() if not archivos(carpeta, base)]
+    if faltan:
+        sys.exit(f"No hay CSV para: {', '.join(faltan)} (en {carpeta})")
+
+    reporte = []
+    with psycopg.connect(_conninfo()) as conn, conn.cursor() as cur:
+        if truncar:
+            cur.execute(f"TRUNCATE {', '.join(tablas)} RESTART IDENTITY CASCADE")
+        esquema = capturar_esquema(cur, tablas) if diferir else None
+        if esquema:
+            quitar_esquema(cur, esquema)
+        for t in tablas:
+            # Los triggers de usuario (p. ej. actualizado_en) no aportan nada en una carga masiva
+            cur.execute(f"ALTER TABLE {t} DISABLE TRIGGER USER")
+
+        for tabla, base in TABLAS.items():
+            t0, filas = time.perf_counter(), 0
+            for ruta in archivos(carpeta, base):
+                filas += copiar(cur, tabla, ruta, freeze=truncar)
+            reporte.append((tabla, filas, time.perf_counter() - t0))
+
+        for t in tablas:
+            cur.execute(f"ALTER TABLE {t} ENABLE TRIGGER USER")
+        ajustar_secuencias(cur, tablas)
+        if esquema:
+            t0 = time.perf_counter()
+            recrear_esquema(cur, esquema)
+            reporte.append(("(índices y FK)", None, time.perf_counter() - t0))
+        conn.commit()
+
+        conn.autocommit = True
+        t0 = time.perf_counter()
+        cur.execute(f"ANALYZE {', '.join(tablas)}")
+        reporte.append(("(analyze)", None, time.perf_counter() - t0))
+    return reporte
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Carga masiva de los CSV de QuickDrop en el OLTP")
+    ap.add_argument("--dir", default=str(Path(__file__).resolve().parent / "csv_quickdrop"),
+                    help="carpeta con los CSV (por defecto csv_quickdrop/)")
+    ap.add_argument("--truncar", action="store_true", help="vacía las tablas y reinicia los ids antes de cargar")
+    ap.add_argument("--sin-diferir", action="store_true", help="mantiene índices y FK durante la carga")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    reporte = cargar(Path(args.dir), truncar=args.truncar, diferir=not args.sin_diferir)
+    total = 0
+    for tabla, filas, seg in reporte:
+        if filas is None:
+            print(f"{tabla:<16} {'':>12} {seg:8.2f} s")
+        else:
+            total += filas
+            print(f"{tabla:<16} {filas:>12,} {seg:8.2f} s {filas / max(seg, 1e-6):>12,.0f} filas/s")
+    seg = time.perf_counter() - t0
+    print(f"{'total':<16} {total:>12,} {seg:8.2f} s {total / max(seg, 1e-6):>12,.0f} filas/s")
+
+if __name__ == "__main__":
+    main()
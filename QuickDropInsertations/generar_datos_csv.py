@@ -1,150 +1,389 @@
-import csv
-import random
-from faker import Faker
-from datetime import datetime, timedelta
+# QuickDropInsertations/generar_datos_csv.py
+"""
+Generador de datos sintéticos para el OLTP de QuickDrop.
+
+- Volumen configurable con --escala (1 = el dataset original de 500 filas por tabla).
+  Pedidos y clientes crecen lineal; tiendas, productos y repartidores con la raíz.
+- Reproducible: --semilla fija los pools de Faker y cada fragmento usa su propio
+  RNG derivado de (semilla, tabla, fragmento), así que el resultado no depende de
+  --workers.
+- Faker solo genera pools de valores al inicio; las filas se arman muestreando
+  esos pools con NumPy, por lotes, en un pool de procesos.
+- Perfiles de carga (--perfil): "uniforme" reproduce el script original (FK al
+  azar, últimos 30 días); "realista" concentra ventas en pocas tiendas/productos
+  (Zipf), reparte varios años con estacionalidad semanal, horaria y de feriados,
+  y hace crecer la base de clientes (un pedido solo usa clientes ya registrados).
+- Salida en fragmentos <tabla>-00000.csv|parquet (pyarrow) que cargar_csv.py
+  lee en orden, por defecto en csv_generado/ (fuera de git). csv_quickdrop/
+  guarda el dataset original versionado y nunca se limpia. Los ids de
+  cliente/tienda/categoría/producto/repartidor/pedido van explícitos y son
+  contiguos (1..N): toda FK apunta a un id existente.
+
+Uso (desde QuickDropInsertations/):
+    python generar_datos_csv.py                         # ~500 filas por tabla
+    python generar_datos_csv.py --escala 5000 --workers 8
+    python generar_datos_csv.py --formato parquet --semilla 7
+    python generar_datos_csv.py --escala 2000 --perfil realista --anos 5
+    python cargar_csv.py --dir csv_generado --truncar     # cargar lo generado
+"""
+from __future__ import annotations
+import argparse
 import os
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from faker import Faker
+
+TIPOS_TIENDA = ['Restaurante', 'Farmacia', 'Papelería', 'Ferretería', 'Ropa', 'Tecnología', 'MiniMarket']
+CATEGORIAS = ['Comida', 'Salud', 'Oficina', 'Electrónica', 'Hogar', 'Mascotas', 'Libros', 'Ropa', 'Bebidas', 'Limpieza']
+ESTADO_PEDIDOS = ['pendiente', 'aceptado', 'entregado', 'cancelado']
+ESTADO_ENTREGA = ['en camino', 'entregado', 'fallido']
+METODOS_PAGO = ['efectivo', 'tarjeta', 'transferencia']
+ESTADO_PAGO = ['pendiente', 'pagado', 'fallido']
+DOMINIOS = ['example.com', 'example.net', 'example.org']
+LETRAS = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+
+POOL = 5000        # valores distintos por atributo de texto
+N_CIUDADES = 40    # pocas ciudades: los filtros del dashboard siguen siendo usables
+BASE = 500
+
+# Perfiles de carga. zipf = exponente de popularidad (None = uniforme);
+# crecimiento = tasa anual de crecimiento del volumen de pedidos y de clientes
+PERFILES = {
+    "uniforme": {"dias": 30, "zipf": None, "semanal": False, "feriados": False,
+                 "crecimiento": 0.0, "clientes_iniciales": 1.0},
+    "realista": {"dias": 3 * 365, "zipf": 1.1, "semanal": True, "feriados": True,
+                 "crecimiento": 0.6, "clientes_iniciales": 0.05},
+}
+# Lunes..domingo
+PESO_SEMANA = np.array([0.85, 0.85, 0.9, 0.95, 1.15, 1.35, 1.05])
+# 0..23 h: picos de almuerzo y cena
+PESO_HORA = np.array([0.3, 0.2, 0.1, 0.1, 0.1, 0.2, 0.4, 0.7, 0.9, 1.0, 1.1, 1.6,
+                      2.4, 2.3, 1.5, 1.1, 1.0, 1.2, 1.7, 2.3, 2.4, 1.8, 1.0, 0.6])
+# (mes, día) -> multiplicador
+FERIADOS = {(1, 1): 0.6, (2, 14): 1.5, (5, 10): 1.4, (10, 31): 1.3, (12, 24): 1.8, (12, 25): 0.7, (12, 31): 1.6}
+
+# Orden de las tablas = índice usado para derivar las semillas
+TABLAS = ["clientes", "tiendas", "productos", "repartidores", "pedidos"]
+DERIVADAS = ["detalle_pedido", "entregas", "pagos"]  # se generan junto con cada lote de pedidos
+
+def tamanos(escala: float) -> dict:
+    raiz = max(escala, 1) ** 0.5
+    return {
+        "clientes":     max(1, round(BASE * escala)),
+        "tiendas":      max(1, round(BASE * raiz)),
+        "productos":    max(1, round(BASE * raiz)),
+        "repartidores": max(1, round(BASE * raiz)),
+        "pedidos":      max(1, round(BASE * escala)),
+    }
+
+def _ascii(s: str) -> str:
+    return unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode().lower()
+
+def pools(semilla: int) -> dict:
+    """Valores de texto pre-generados con Faker (una sola vez, en el proceso principal)."""
+    Faker.seed(semilla)
+    fake = Faker('es_ES')
+    nombres = [fake.name() for _ in range(POOL)]
+    ciudades = set()
+    while len(ciudades) < N_CIUDADES:
+        ciudades.add(fake.city())
+    return {
+        "nombres":     np.array(nombres),
+        "usuarios":    np.array([".".join(_ascii(n).split()[:2]) for n in nombres]),
+        "apellidos":   np.array([fake.last_name() for _ in range(POOL)]),
+        "telefonos":   np.array([fake.phone_number() for _ in range(POOL)]),
+        "direcciones": np.array([fake.address().replace("\n", ", ") for _ in range(POOL)]),
+        "calles":      np.array([fake.street_address() for _ in range(POOL)]),
+        "palabras":    np.array([fake.word().capitalize() for _ in range(POOL)]),
+        "frases":      np.array([fake.sentence() for _ in range(POOL)]),
+        "ciudades":    np.array(sorted(ciudades)),
+    }
+
+# ---------------------------------------------------------------------------
+# Distribuciones del perfil (se calculan una vez y viajan a los workers en _CTX)
+# ---------------------------------------------------------------------------
+def zipf_cdf(n: int, s: float) -> np.ndarray:
+    w = 1.0 / np.arange(1, n + 1) ** s
+    return np.cumsum(w) / w.sum()
+
+def _popularidad(rng, n: int, s: float | None):
+    """(cdf por rango, permutación rango -> id-1); None si el perfil es uniforme."""
+    if not s:
+        return None
+    return zipf_cdf(n, s), rng.permutation(n)
+
+def pesos_dias(inicio: np.datetime64, n_dias: int, perfil: dict) -> np.ndarray:
+    fechas = inicio + np.arange(n_dias)
+    w = np.ones(n_dias)
+    dow = (fechas.astype(np.int64) + 3) % 7  # 1970-01-01 fue jueves; 0 = lunes
+    mes = fechas.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    dia = (fechas - fechas.astype("datetime64[M]")).astype(np.int64) + 1
+    if perfil["semanal"]:
+        w *= PESO_SEMANA[dow]
+    if perfil["feriados"]:
+        for (m, d), f in FERIADOS.items():
+            w[(mes == m) & (dia == d)] *= f
+        w[mes == 12] *= 1.25
+        w[(mes == 11) & (dow == 4) & (dia >= 23) & (dia <= 29)] *= 2.0  # black friday
+    return w * np.exp(perfil["crecimiento"] * np.arange(n_dias) / 365)
+
+def clientes_acumulados(n_clientes: int, n_dias: int, perfil: dict) -> np.ndarray:
+    """Clientes registrados al cierre de cada día (crece con el volumen de pedidos)."""
+    base = max(1, round(n_clientes * perfil["clientes_iniciales"]))
+    w = np.exp(perfil["crecimiento"] * np.arange(n_dias) / 365)
+    acum = base + np.floor((n_clientes - base) * np.cumsum(w) / w.sum()).astype(np.int64)
+    acum[-1] = n_clientes
+    return acum
+
+def distribuciones(semilla: int, tam: dict, perfil: dict, hasta: np.datetime64) -> dict:
+    rng = np.random.default_rng([semilla, 98])
+    n_dias = perfil["dias"]
+    inicio = hasta.astype("datetime64[D]") - n_dias
+    w = pesos_dias(inicio, n_dias, perfil)
+    return {
+        "inicio":        inicio,
+        "dias_cdf":      np.cumsum(w) / w.sum(),
+        "horas_cdf":     np.cumsum(PESO_HORA) / PESO_HORA.sum() if perfil["semanal"] else None,
+        "clientes_acum": clientes_acumulados(tam["clientes"], n_dias, perfil),
+        "productos":     _popularidad(rng, tam["productos"], perfil["zipf"]),
+        "tiendas":       _popularidad(rng, tam["tiendas"], perfil["zipf"]),
+        "ciudades":      _popularidad(rng, N_CIUDADES, perfil["zipf"] and 1.0),
+    }
+
+# ---------------------------------------------------------------------------
+# Generación por lote (corre en los workers)
+# ---------------------------------------------------------------------------
+_CTX: dict = {}
+
+def _init(ctx: dict):
+    _CTX.update(ctx)
+
+def _rng(tabla: str, lote: int):
+    return np.random.default_rng(np.random.SeedSequence([_CTX["semilla"], TABLAS.index(tabla), lote]))
+
+def _pick(rng, valores, n):
+    valores = np.asarray(valores)
+    return valores[rng.integers(0, len(valores), n)]
+
+def _popular(rng, clave: str, total: int, n: int) -> np.ndarray:
+    """Índices 0..total-1 según la popularidad del perfil (Zipf) o uniformes."""
+    pop = _CTX["dist"][clave]
+    if pop is None:
+        return rng.integers(0, total, n)
+    cdf, perm = pop
+    return perm[np.minimum(np.searchsorted(cdf, rng.random(n)), total - 1)]
+
+def _ciudad(rng, n):
+    ciudades = _CTX["pools"]["ciudades"]
+    return ciudades[_popular(rng, "ciudades", len(ciudades), n)]
+
+def _clientes(rng, ids):
+    p, n, dist = _CTX["pools"], len(ids), _CTX["dist"]
+    # El id hace único al correo sin el costo de fake.unique
+    correo = np.char.add(np.char.add(np.char.add(_pick(rng, p["usuarios"], n), "."), ids.astype(str)),
+                         np.char.add("@", _pick(rng, DOMINIOS, n)))
+    return {"clientes": {
+        "id_cliente":     ids,
+        "nombre":         _pick(rng, p["nombres"], n),
+        "correo":         correo,
+        "telefono":       _pick(rng, p["telefonos"], n),
+        "direccion":      _pick(rng, p["direcciones"], n),
+        "ciudad":         _ciudad(rng, n),
+        # Los ids crecen con la fecha de registro: el cliente i existe desde el primer día con acum >= i
+        "fecha_registro": dist["inicio"] + np.searchsorted(dist["clientes_acum"], ids),
+    }}
+
+def _tiendas(rng, ids):
+    p, n = _CTX["pools"], len(ids)
+    return {"tiendas": {
+        "id_tienda": ids,
+        "nombre":    np.char.add("Tienda ", _pick(rng, p["apellidos"], n)),
+        "tipo":      _pick(rng, TIPOS_TIENDA, n),
+        "direccion": _pick(rng, p["calles"], n),
+        "ciudad":    _ciudad(rng, n),
+        "estado":    np.ones(n, dtype=bool),
+    }}
+
+def _productos(rng, ids):
+    p, n, tam = _CTX["pools"], len(ids), _CTX["tamanos"]
+    return {"productos": {
+        "id_producto":  ids,
+        "nombre":       _pick(rng, p["palabras"], n),
+        "descripcion":  _pick(rng, p["frases"], n),
+        "precio":       _CTX["precios"][ids - 1],
+        "stock":        rng.integers(5, 101, n),
+        # Con Zipf, pocas tiendas concentran la mayor parte del catálogo
+        "id_tienda":    _popular(rng, "tiendas", tam["tiendas"], n) + 1,
+        "id_categoria": rng.integers(1, len(CATEGORIAS) + 1, n),
+    }}
+
+def _repartidores(rng, ids):
+    p, n = _CTX["pools"], len(ids)
+    placa = np.char.add(np.char.add(_pick(rng, LETRAS, n), rng.integers(100, 1000, n).astype(str)),
+                        _pick(rng, LETRAS, n))
+    return {"repartidores": {
+        "id_repartidor": ids,
+        "nombre":        _pick(rng, p["nombres"], n),
+        "telefono":      _pick(rng, p["telefonos"], n),
+        "zona":          _ciudad(rng, n),
+        "placa_moto":    placa,
+        "disponible":    np.ones(n, dtype=bool),
+    }}
+
+def _pedidos(rng, ids):
+    """Pedidos del lote con su detalle, entrega y pago (consistentes entre sí)."""
+    n, tam, precios, dist = len(ids), _CTX["tamanos"], _CTX["precios"], _CTX["dist"]
+    dia = np.minimum(np.searchsorted(dist["dias_cdf"], rng.random(n)), len(dist["dias_cdf"]) - 1)
+    if dist["horas_cdf"] is not None:
+        hora = np.minimum(np.searchsorted(dist["horas_cdf"], rng.random(n)), 23)
+        segundos = hora * 3600 + rng.integers(0, 3600, n)
+    else:
+        segundos = rng.integers(0, 86400, n)
+    fecha_pedido = (dist["inicio"] + dia).astype("datetime64[s]") + segundos.astype("timedelta64[s]")
+    # Solo clientes ya registrados el día del pedido
+    id_cliente = 1 + np.floor(rng.random(n) * dist["clientes_acum"][dia]).astype(np.int64)
+
+    # 1 a 6 líneas por pedido (media ~2)
+    lineas = np.minimum(1 + rng.poisson(1.0, n), 6)
+    fila = np.repeat(np.arange(n), lineas)
+    id_producto = _popular(rng, "productos", tam["productos"], len(fila)) + 1
+    cantidad = rng.integers(1, 6, len(fila))
+    precio_unitario = precios[id_producto - 1]
+    total = np.round(np.bincount(fila, weights=cantidad * precio_unitario, minlength=n), 2)
+
+    minutos = np.clip(rng.lognormal(np.log(35), 0.5, n), 5, 24 * 60).astype(np.int64)
+    return {
+        "pedidos": {
+            "id_pedido":    ids,
+            "id_cliente":   id_cliente,
+            "fecha_pedido": fecha_pedido,
+            "estado":       _pick(rng, ESTADO_PEDIDOS, n),
+        },
+        "detalle_pedido": {
+            "id_pedido":       ids[fila],
+            "id_producto":     id_producto,
+            "cantidad":        cantidad,
+            "precio_unitario": precio_unitario,
+        },
+        "entregas": {
+            "id_pedido":      ids,
+            "id_repartidor":  rng.integers(1, tam["repartidores"] + 1, n),
+            "fecha_entrega":  fecha_pedido + (minutos * 60).astype("timedelta64[s]"),
+            "estado_entrega": _pick(rng, ESTADO_ENTREGA, n),
+        },
+        "pagos": {
+            "id_pedido":   ids,
+            "metodo_pago": _pick(rng, METODOS_PAGO, n),
+            "total":       total,
+            "estado_pago": _pick(rng, ESTADO_PAGO, n),
+        },
+    }
+
+GENERADORES = {
+    "clientes": _clientes, "tiendas": _tiendas, "productos": _productos,
+    "repartidores": _repartidores, "pedidos": _pedidos,
+}
+
+def escribir(cols: dict, ruta: Path, formato: str):
+    tabla = pa.table(cols)
+    if formato == "parquet":
+        pq.write_table(tabla, ruta)
+    else:
+        pacsv.write_csv(tabla, ruta)
+
+def _tarea(tabla: str, lote: int, inicio: int, n: int) -> dict:
+    ids = np.arange(inicio, inicio + n, dtype=np.int64)
+    salida, formato = _CTX["salida"], _CTX["formato"]
+    filas = {}
+    for nombre, cols in GENERADORES[tabla](_rng(tabla, lote), ids).items():
+        escribir(cols, salida / f"{nombre}-{lote:05d}.{formato}", formato)
+        filas[nombre] = len(next(iter(cols.values())))
+    return filas
+
+# ---------------------------------------------------------------------------
+# Orquestación
+# ---------------------------------------------------------------------------
+SALIDA = Path(__file__).resolve().parent / "csv_generado"
+
+def limpiar(salida: Path):
+    """
+    Quita fragmentos previos (cargar_csv.py toma todos los de cada tabla). Se
+    niega si la carpeta tiene archivos sin fragmentar (<tabla>.csv): son datos
+    que no dejó este generador, como el dataset versionado de csv_quickdrop/.
+    """
+    bases = TABLAS + DERIVADAS + ["categorias"]
+    ajenos = [r for base in bases for r in salida.glob(f"{base}.*")]
+    if ajenos:
+        raise SystemExit(f"{salida} tiene datos que no son de este generador ({ajenos[0].name}, ...): "
+                         "usa otra --salida")
+    for base in bases:
+        for ruta in salida.glob(f"{base}-*.*"):
+            ruta.unlink()
+
+def generar(escala=1.0, semilla=42, workers=None, formato="csv", salida=SALIDA,
+            lote=250_000, hasta: date | None = None, perfil: dict | str = "uniforme") -> dict:
+    salida = Path(salida)
+    salida.mkdir(parents=True, exist_ok=True)
+    limpiar(salida)
+
+    perfil = PERFILES[perfil] if isinstance(perfil, str) else perfil
+    tam = tamanos(escala)
+    hasta = np.datetime64(hasta or date.today(), "s")
+    precios = np.round(np.random.default_rng([semilla, 99]).uniform(1.0, 100.0, tam["productos"]), 2)
+    ctx = {
+        "semilla": semilla, "tamanos": tam, "precios": precios, "pools": pools(semilla),
+        "dist": distribuciones(semilla, tam, perfil, hasta), "salida": salida, "formato": formato,
+    }
+
+    escribir({"id_categoria": np.arange(1, len(CATEGORIAS) + 1), "nombre": np.array(CATEGORIAS)},
+             salida / f"categorias-00000.{formato}", formato)
+    totales = {"categorias": len(CATEGORIAS)}
+
+    tareas = [(tabla, i, inicio + 1, min(lote, tam[tabla] - inicio))
+              for tabla in TABLAS
+              for i, inicio in enumerate(range(0, tam[tabla], lote))]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init, initargs=(ctx,)) as pool:
+        for fut in as_completed([pool.submit(_tarea, *t) for t in tareas]):
+            for nombre, n in fut.result().items():
+                totales[nombre] = totales.get(nombre, 0) + n
+    return totales
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Genera datos sintéticos para el OLTP de QuickDrop")
+    ap.add_argument("--escala", type=float, default=1.0, help="factor de volumen (1 = 500 pedidos)")
+    ap.add_argument("--semilla", type=int, default=42)
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    ap.add_argument("--formato", choices=["csv", "parquet"], default="csv")
+    ap.add_argument("--salida", default=str(SALIDA), help="carpeta de salida (por defecto csv_generado/)")
+    ap.add_argument("--lote", type=int, default=250_000, help="filas por fragmento")
+    ap.add_argument("--hasta", type=date.fromisoformat, default=None,
+                    help="fin del historial AAAA-MM-DD, excluido (por defecto hoy)")
+    ap.add_argument("--perfil", choices=list(PERFILES), default="uniforme")
+    ap.add_argument("--anos", type=float, help="años de historial (sobrescribe el perfil)")
+    ap.add_argument("--zipf", type=float, help="exponente de popularidad; 0 = uniforme (sobrescribe el perfil)")
+    args = ap.parse_args(argv)
+
+    perfil = dict(PERFILES[args.perfil])
+    if args.anos is not None:
+        perfil["dias"] = max(1, round(args.anos * 365))
+    if args.zipf is not None:
+        perfil["zipf"] = args.zipf or None
+
+    t0 = time.perf_counter()
+    totales = generar(args.escala, args.semilla, args.workers, args.formato, args.salida,
+                      args.lote, args.hasta, perfil)
+    seg = time.perf_counter() - t0
+    for nombre, n in totales.items():
+        print(f"{nombre:<16} {n:>12,}")
+    print(f"✅ {sum(totales.values()):,} filas en {seg:.1f} s en '{args.salida}'")
 
-fake = Faker('es_ES')
-carpeta_salida = "csv_quickdrop"
-os.makedirs(carpeta_salida, exist_ok=True)
-
-# ================================================
-# 1. CLIENTES (500)
-# ================================================
-clientes_ids = list(range(1, 501))
-with open(f"{carpeta_salida}/clientes.csv", "w", newline='', encoding="utf-8") as archivo:
-    writer = csv.writer(archivo)
-    writer.writerow(['nombre', 'correo', 'telefono', 'direccion', 'ciudad', 'fecha_registro'])
-    for _ in clientes_ids:
-        writer.writerow([
-            fake.name(),
-            fake.unique.email(),
-            fake.phone_number(),
-            fake.address().replace("\n", ", "),
-            fake.city(),
-            datetime.now().date()
-        ])
-
-# ================================================
-# 2. TIENDAS (500)
-# ================================================
-tipos_tienda = ['Restaurante', 'Farmacia', 'Papelería', 'Ferretería', 'Ropa', 'Tecnología', 'MiniMarket']
-tiendas_ids = list(range(1, 501))
-with open(f"{carpeta_salida}/tiendas.csv", "w", newline='', encoding="utf-8") as archivo:
-    writer = csv.writer(archivo)
-    writer.writerow(['nombre', 'tipo', 'direccion', 'ciudad', 'estado'])
-    for _ in tiendas_ids:
-        writer.writerow([
-            f"Tienda {fake.last_name()}",
-            random.choice(tipos_tienda),
-            fake.street_address(),
-            fake.city(),
-            True
-        ])
-
-# ================================================
-# 3. CATEGORÍAS (FIJO: 10)
-# ================================================
-categorias = ['Comida', 'Salud', 'Oficina', 'Electrónica', 'Hogar', 'Mascotas', 'Libros', 'Ropa', 'Bebidas', 'Limpieza']
-categorias_ids = list(range(1, len(categorias)+1))
-with open(f"{carpeta_salida}/categorias.csv", "w", newline='', encoding="utf-8") as archivo:
-    writer = csv.writer(archivo)
-    writer.writerow(['nombre'])
-    for nombre in categorias:
-        writer.writerow([nombre])
-
-# ================================================
-# 4. PRODUCTOS (500)
-# ================================================
-productos_ids = list(range(1, 501))
-with open(f"{carpeta_salida}/productos.csv", "w", newline='', encoding="utf-8") as archivo:
-    writer = csv.writer(archivo)
-    writer.writerow(['nombre', 'descripcion', 'precio', 'stock', 'id_tienda', 'id_categoria'])
-    for _ in productos_ids:
-        writer.writerow([
-            fake.word().capitalize(),
-            fake.sentence(),
-            round(random.uniform(1.0, 100.0), 2),
-            random.randint(5, 100),
-            random.choice(tiendas_ids),
-            random.choice(categorias_ids)
-        ])
-
-# ================================================
-# 5. REPARTIDORES (500)
-# ================================================
-repartidores_ids = list(range(1, 501))
-with open(f"{carpeta_salida}/repartidores.csv", "w", newline='', encoding="utf-8") as archivo:
-    writer = csv.writer(archivo)
-    writer.writerow(['nombre', 'telefono', 'zona', 'placa_moto', 'disponible'])
-    for _ in repartidores_ids:
-        writer.writerow([
-            fake.name(),
-            fake.phone_number(),
-            fake.city(),
-            f"{fake.random_uppercase_letter()}{random.randint(100,999)}{fake.random_uppercase_letter()}",
-            True
-        ])
-
-# ================================================
-# 6. PEDIDOS (500)
-# ================================================
-pedidos_ids = list(range(1, 501))
-estado_pedidos = ['pendiente', 'aceptado', 'entregado', 'cancelado']
-with open(f"{carpeta_salida}/pedidos.csv", "w", newline='', encoding="utf-8") as archivo:
-    writer = csv.writer(archivo)
-    writer.writerow(['id_cliente', 'fecha_pedido', 'estado'])
-    for _ in pedidos_ids:
-        writer.writerow([
-            random.choice(clientes_ids),
-            datetime.now() - timedelta(days=random.randint(0, 30)),
-            random.choice(estado_pedidos)
-        ])
-
-# ================================================
-# 7. DETALLE_PEDIDO (500)
-# ================================================
-with open(f"{carpeta_salida}/detalle_pedido.csv", "w", newline='', encoding="utf-8") as archivo:
-    writer = csv.writer(archivo)
-    writer.writerow(['id_pedido', 'id_producto', 'cantidad', 'precio_unitario'])
-    for _ in range(500):
-        producto_id = random.choice(productos_ids)
-        writer.writerow([
-            random.choice(pedidos_ids),
-            producto_id,
-            random.randint(1, 5),
-            round(random.uniform(1.0, 100.0), 2)
-        ])
-
-# ================================================
-# 8. ENTREGAS (500)
-# ================================================
-estado_entrega = ['en camino', 'entregado', 'fallido']
-with open(f"{carpeta_salida}/entregas.csv", "w", newline='', encoding="utf-8") as archivo:
-    writer = csv.writer(archivo)
-    writer.writerow(['id_pedido', 'id_repartidor', 'fecha_entrega', 'estado_entrega'])
-    for pid in pedidos_ids:
-        writer.writerow([
-            pid,
-            random.choice(repartidores_ids),
-            datetime.now() - timedelta(days=random.randint(0, 10)),
-            random.choice(estado_entrega)
-        ])
-
-# ================================================
-# 9. PAGOS (500)
-# ================================================
-metodos_pago = ['efectivo', 'tarjeta', 'transferencia']
-estado_pago = ['pendiente', 'pagado', 'fallido']
-with open(f"{carpeta_salida}/pagos.csv", "w", newline='', encoding="utf-8") as archivo:
-    writer = csv.writer(archivo)
-    writer.writerow(['id_pedido', 'metodo_pago', 'total', 'estado_pago'])
-    for pid in pedidos_ids:
-        writer.writerow([
-            pid,
-            random.choice(metodos_pago),
-            round(random.uniform(5.0, 300.0), 2),
-            random.choice(estado_pago)
-        ])
-
-print("✅ TODOS los archivos CSV fueron generados en la carpeta 'csv_quickdrop'")
+if __name__ == "__main__":
+    main()